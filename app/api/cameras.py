@@ -1,17 +1,21 @@
 from datetime import datetime
 import time
 import cv2
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response, Header, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
 from typing import List, Optional, Dict, Any
 import asyncio
 import logging
 import base64
+import json
 
 from app.database import get_db
 from app.models.camera import Camera, CameraCreate, CameraUpdate, CameraResponse, CameraStreamInfo
 from app.core.camera_manager import get_camera_manager
+from app.core.live_view import MJPEG_BOUNDARY, clamp_live_view_params, iter_jpeg_frames, mjpeg_part
+from app.services.recording_manager import get_recording_manager
 from app.config import settings
 
 router = APIRouter()
@@ -147,9 +151,16 @@ async def get_camera_stream_info(
         "features": stats["features"]
     }
 
+def _not_modified(etag: str) -> Response:
+    """304 response for a poller whose snapshot is still current"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
 @router.get("/{camera_id}/snapshot")
 async def get_camera_snapshot(
     camera_id: int,
+    quality: int = Query(90, ge=10, le=100),
+    width: Optional[int] = Query(None, ge=16, le=4096),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
     """Get the latest snapshot from a camera (processed frame with detections)"""
@@ -161,16 +172,29 @@ async def get_camera_snapshot(
     # Get camera manager
     camera_manager = await get_camera_manager()
     
-    # Get latest frame
-    jpeg_frame = await camera_manager.get_jpeg_frame(camera_id)
-    if jpeg_frame is None:
+    # Frame unchanged since the client's copy
+    etag = camera_manager.match_jpeg_etag(camera_id, if_none_match, quality, width)
+    if etag:
+        return _not_modified(etag)
+    
+    # Get latest frame (encoded once per frame and variant, shared by all viewers)
+    snapshot = await camera_manager.get_jpeg_snapshot(camera_id, quality, width)
+    if snapshot is None:
         raise HTTPException(status_code=503, detail="Camera stream not available")
     
-    return Response(content=jpeg_frame, media_type="image/jpeg")
+    jpeg_frame, etag = snapshot
+    return Response(
+        content=jpeg_frame,
+        media_type="image/jpeg",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
 
 @router.get("/{camera_id}/snapshot/base64")
 async def get_camera_snapshot_base64(
     camera_id: int,
+    quality: int = Query(90, ge=10, le=100),
+    width: Optional[int] = Query(None, ge=16, le=4096),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
     """Get the latest snapshot from a camera as base64 encoded string"""
@@ -182,20 +206,66 @@ async def get_camera_snapshot_base64(
     # Get camera manager
     camera_manager = await get_camera_manager()
     
+    # Frame unchanged since the client's copy
+    etag = camera_manager.match_jpeg_etag(camera_id, if_none_match, quality, width)
+    if etag:
+        return _not_modified(etag)
+    
     # Get latest frame
-    jpeg_frame = await camera_manager.get_jpeg_frame(camera_id)
-    if jpeg_frame is None:
+    snapshot = await camera_manager.get_jpeg_snapshot(camera_id, quality, width)
+    if snapshot is None:
         raise HTTPException(status_code=503, detail="Camera stream not available")
     
+    jpeg_frame, etag = snapshot
+    
     # Convert to base64
     base64_frame = base64.b64encode(jpeg_frame).decode('utf-8')
     
-    return {
-        "camera_id": camera_id,
-        "timestamp": datetime.now().isoformat(),
-        "content_type": "image/jpeg",
-        "data": base64_frame
-    }
+    return Response(
+        content=json.dumps({
+            "camera_id": camera_id,
+            "timestamp": datetime.now().isoformat(),
+            "content_type": "image/jpeg",
+            "etag": etag,
+            "data": base64_frame
+        }),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+@router.get("/{camera_id}/mjpeg")
+async def get_camera_mjpeg(
+    camera_id: int,
+    fps: Optional[float] = Query(None, gt=0),
+    quality: Optional[int] = Query(None, ge=10, le=100),
+    width: Optional[int] = Query(None, ge=16, le=4096)
+):
+    """
+    Live MJPEG stream of a camera (multipart/x-mixed-replace)
+    
+    Each frame is encoded once and shared by all viewers; slow viewers skip
+    frames. FPS and quality are capped by MJPEG_MAX_FPS and MJPEG_MAX_QUALITY.
+    """
+    # No database session here: it would stay open for the life of the stream
+    camera_manager = await get_camera_manager()
+    if camera_id not in camera_manager.cameras:
+        raise HTTPException(status_code=404, detail="Camera not found or not active")
+    
+    if not await camera_manager.ensure_camera_connected(camera_id):
+        raise HTTPException(status_code=503, detail="Camera stream not available")
+    
+    processor = camera_manager.cameras[camera_id]
+    fps, quality = clamp_live_view_params(fps, quality)
+    
+    async def stream():
+        async for jpeg_frame, _ in iter_jpeg_frames(processor, fps, quality, width):
+            yield mjpeg_part(jpeg_frame)
+    
+    return StreamingResponse(
+        stream(),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-cache, no-store", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{camera_id}/status")
 async def get_camera_status(
@@ -361,6 +431,9 @@ async def add_camera_to_manager(camera_id: int):
             
             if not success:
                 logger.error(f"Failed to add camera {camera_id} to manager")
+            
+            recording_manager = await get_recording_manager()
+            await recording_manager.sync_camera(camera)
     except Exception as e:
         logger.exception(f"Error adding camera to manager: {str(e)}")
 
@@ -380,12 +453,19 @@ async def update_camera_in_manager(camera_id: int):
             
             if not success:
                 logger.error(f"Failed to update camera {camera_id} in manager")
+            
+            recording_manager = await get_recording_manager()
+            await recording_manager.sync_camera(camera)
     except Exception as e:
         logger.exception(f"Error updating camera in manager: {str(e)}")
 
 async def remove_camera_from_manager(camera_id: int):
     """Remove a camera from the camera manager"""
     try:
+        # Stop recording first; the recorder may read the camera's ingest relay
+        recording_manager = await get_recording_manager()
+        await recording_manager.stop_camera(camera_id)
+        
         # Remove from camera manager
         camera_manager = await get_camera_manager()
         success = await camera_manager.remove_camera(camera_id)
@@ -456,10 +536,10 @@ async def test_camera_connection(
                     "age": time.time() - timestamp
                 }
                 
-                # Convert to JPEG for test
-                _, jpeg_data = cv2.imencode(".jpg", frame)
-                jpeg_size = len(jpeg_data.tobytes())
-                frame_info["jpeg_size"] = jpeg_size
+                # Convert to JPEG for test (served from the shared snapshot cache)
+                snapshot = await camera_manager.get_jpeg_snapshot(camera_id)
+                if snapshot is not None:
+                    frame_info["jpeg_size"] = len(snapshot[0])
             else:
                 frame_error = "No frame available"
         except Exception as e:
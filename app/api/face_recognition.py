@@ -17,12 +17,17 @@ from app.models.camera import Camera
 from app.models.person import Person, PersonCreate, PersonUpdate, PersonResponse, FaceDetection
 from app.models.event import Event, EventType, PersonStatistics
 from app.config import settings
-from app.core.face_recognition import FaceRecognizer
+from app.core.face_recognition import FaceRecognizer, forget_person, publish_person_details
 from app.core.camera_manager import get_camera_manager
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+async def _get_face_recognizer() -> FaceRecognizer:
+    """Get the face recognizer shared by the cameras, or a standalone one"""
+    camera_manager = await get_camera_manager()
+    return camera_manager.shared_face_recognizer or FaceRecognizer()
+
 @router.get("/persons", response_model=List[PersonResponse])
 async def get_persons(
     skip: int = 0, 
@@ -70,8 +75,8 @@ async def create_person(
             # Read the image
             img = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
             
-            # Initialize face recognizer
-            face_recognizer = FaceRecognizer()
+            # Register with the live recognizer so cameras see the face immediately
+            face_recognizer = await _get_face_recognizer()
             
             # Register the face
             success = await face_recognizer.register_face(img, db_person.id)
@@ -121,6 +126,12 @@ async def update_person(
     await db.commit()
     await db.refresh(person)
     
+    # Recognizers pick up the new name without waiting for a sync
+    publish_person_details(person.id, {
+        "name": person.name,
+        "image_path": person.face_image_path
+    })
+    
     return person
 
 @router.delete("/persons/{person_id}")
@@ -142,6 +153,9 @@ async def delete_person(
     await db.delete(person)
     await db.commit()
     
+    # Stop matching the person's face
+    forget_person(person_id)
+    
     return {"message": f"Person {person_id} deleted successfully"}
 
 @router.get("/persons/{person_id}/face")
@@ -191,16 +205,18 @@ async def update_person_face(
         
         # Clear existing face encoding to force re-encoding
         person.face_encoding = None
+        person.face_encoding_blob = None
         
         await db.commit()
+        forget_person(person.id)
         
         # Register face in the face recognizer
         try:
             # Read the image
             img = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
             
-            # Initialize face recognizer
-            face_recognizer = FaceRecognizer()
+            # Register with the live recognizer so cameras see the face immediately
+            face_recognizer = await _get_face_recognizer()
             
             # Register the face
             success = await face_recognizer.register_face(img, person.id)
@@ -4,9 +4,11 @@ import os
 import subprocess
 import time
 import sys
-from typing import Dict, Optional, List, Tuple
+import json
+from typing import Dict, Optional, List, Tuple, Any
 import uuid
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Response, Request
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 import asyncio
@@ -14,6 +16,9 @@ import asyncio
 from app.database import get_db
 from app.models.camera import Camera
 from app.config import settings
+from app.core.camera_manager import get_camera_manager
+from app.services.hls_segment_store import HlsSegmentStore, PLAYLIST_SUFFIXES
+from app.services.ll_hls import LowLatencyPlaylist, PlaylistState
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -48,6 +53,26 @@ camera_connections: Dict[int, List[str]] = {}
 # Maps camera_id to session_id
 active_camera_streams: Dict[int, str] = {}
 
+# Playlists and segments of sessions that do not touch the disk
+segment_store = HlsSegmentStore()
+
+# Content types for files served through the API
+HLS_CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".mpd": "application/dash+xml",
+    ".ts": "video/mp2t",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4"
+}
+
+# Cached ffprobe results, {rtsp_url: (probe time, video stream info)}
+_probe_cache: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+PROBE_CACHE_TTL = 600
+
+# H.264 profiles every HLS player can decode without re-encoding
+COPY_COMPATIBLE_PROFILES = {"baseline", "constrained baseline", "main", "high"}
+COPY_COMPATIBLE_PIX_FMTS = {"yuv420p", "yuvj420p"}
+
 # Session housekeeping task
 async def cleanup_expired_sessions():
     """Periodic task to clean up expired HLS sessions"""
@@ -83,9 +108,9 @@ async def cleanup_process(session_id: str):
             process.terminate()
             # Wait up to 3 seconds for termination
             try:
-                await asyncio.sleep(3)
-                # Check if process is still running
-                if process.poll() is None:
+                try:
+                    await asyncio.wait_for(process.wait(), 3)
+                except asyncio.TimeoutError:
                     # Force kill if still running
                     process.kill()
             except Exception as e:
@@ -115,6 +140,9 @@ async def cleanup_process(session_id: str):
             if not camera_connections[camera_id]:
                 del camera_connections[camera_id]
     
+    # Drop in-memory files
+    segment_store.close_session(session_id)
+    
     # Clean up HLS files if they exist
     try:
         session_dir = os.path.join(settings.HLS_DIR, session_id)
@@ -155,6 +183,10 @@ async def read_ffmpeg_output(process, session_id):
                 log_file.write(f"[{prefix}] {decoded_line}\n")
                 log_file.flush()
                 
+                # FFmpeg rewrites the playlist after every segment
+                if "Opening '" in decoded_line and ".m3u8" in decoded_line:
+                    notify_playlist_update(session_id)
+                
                 ffmpeg_logger.debug(f"[{session_id}] {prefix}: {decoded_line}")
         
         # Create tasks to read stdout and stderr
@@ -170,55 +202,474 @@ async def read_ffmpeg_output(process, session_id):
         ffmpeg_logger.info(f"[{session_id}] {completion_msg}")
 
 
-async def start_hls_stream(camera_id: int, rtsp_url: str, session_id: str) -> bool:
-    """Start an HLS stream using FFmpeg to convert RTSP to HLS"""
+async def probe_video_stream(rtsp_url: str) -> Optional[Dict[str, Any]]:
+    """
+    Probe the first video stream of a source with ffprobe
+    
+    Returns:
+        Stream info (codec_name, profile, pix_fmt, width, height) or None if probing failed
+    """
+    cached = _probe_cache.get(rtsp_url)
+    if cached and time.time() - cached[0] < PROBE_CACHE_TTL:
+        return cached[1]
+    
+    command = [settings.FFPROBE_PATH, '-v', 'error']
+    if rtsp_url.startswith("rtsp://"):
+        command += ['-rtsp_transport', 'tcp']
+    command += [
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=codec_name,profile,pix_fmt,width,height',
+        '-of', 'json',
+        rtsp_url
+    ]
+    
+    info = None
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), 10)
+        except asyncio.TimeoutError:
+            process.kill()
+            logger.warning(f"ffprobe timed out for {rtsp_url}")
+            return None
+        
+        streams = json.loads(stdout or b"{}").get("streams", [])
+        if streams:
+            info = streams[0]
+        else:
+            logger.warning(f"ffprobe found no video stream: {stderr.decode('utf-8', errors='replace').strip()}")
+    except Exception as e:
+        logger.warning(f"Could not probe {rtsp_url}: {str(e)}")
+        return None
+    
+    _probe_cache[rtsp_url] = (time.time(), info)
+    return info
+
+
+def is_copy_compatible(info: Optional[Dict[str, Any]]) -> bool:
+    """Whether a probed video stream can go into HLS without re-encoding"""
+    if not info or info.get("codec_name") != "h264":
+        return False
+    profile = (info.get("profile") or "").lower()
+    pix_fmt = info.get("pix_fmt")
+    return profile in COPY_COMPATIBLE_PROFILES and (pix_fmt is None or pix_fmt in COPY_COMPATIBLE_PIX_FMTS)
+
+
+async def choose_video_mode(rtsp_url: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Decide whether to stream-copy or transcode a source
+    
+    Returns:
+        Tuple of ("copy" or "transcode", probed stream info)
+    """
+    mode = settings.HLS_VIDEO_MODE.lower()
+    if mode == "transcode":
+        return "transcode", None
+    
+    info = await probe_video_stream(rtsp_url)
+    if mode == "copy" or is_copy_compatible(info):
+        return "copy", info
+    return "transcode", info
+
+
+def input_args(source_url: str) -> List[str]:
+    """FFmpeg input options for a camera URL or its local ingest relay"""
+    if source_url.startswith("rtsp://"):
+        return [
+            '-rtsp_transport', 'tcp',     # Use TCP for RTSP (more reliable)
+            '-i', source_url,             # Input RTSP URL
+        ]
+    return ['-i', source_url]
+
+
+def video_encoding_args(video_mode: str) -> List[str]:
+    """FFmpeg video options for a mode"""
+    if video_mode == "copy":
+        return [
+            '-c:v', 'copy',               # Camera already sends H.264: repackage only
+        ]
+    
+    return [
+        '-c:v', 'libx264',            # Re-encode with H.264
+        '-profile:v', 'baseline',     # Use baseline profile for compatibility
+        '-level', '3.0',              # H.264 level
+        '-preset', 'ultrafast',       # Fast encoding
+        '-tune', 'zerolatency',       # Minimize latency
+        '-r', '15',                   # Output frame rate
+        '-g', '30',                   # GOP size
+        '-sc_threshold', '0',         # Disable scene detection
+        '-b:v', '1000k',              # Video bitrate
+        '-bufsize', '1500k',          # Buffer size
+        '-maxrate', '1500k',          # Max bitrate
+    ]
+
+
+def abr_ladder(renditions: int, source_info: Optional[Dict[str, Any]]) -> List[Tuple[Optional[int], str]]:
+    """
+    Renditions of an ABR session, lowest first
+    
+    Rungs of HLS_ABR_LADDER below the source height are used from the lowest
+    up, and the source resolution is always the top rendition.
+    
+    Args:
+        renditions: Number of renditions configured for the camera
+        source_info: Probed stream info, or None if unknown
+    
+    Returns:
+        List of (height, or None for the source resolution, bitrate)
+    """
+    source_height = (source_info or {}).get("height")
+    rungs = []
+    for entry in settings.HLS_ABR_LADDER.split(","):
+        height, _, bitrate = entry.strip().partition(":")
+        if not height.isdigit() or not bitrate:
+            continue
+        if source_height and int(height) >= source_height:
+            continue
+        rungs.append((int(height), bitrate))
+    rungs.sort()
+    return rungs[:max(0, renditions - 1)] + [(None, settings.HLS_ABR_SOURCE_BITRATE)]
+
+
+def _scale_bitrate(bitrate: str, factor: float) -> str:
+    """Multiply an FFmpeg bitrate such as "600k" """
+    unit = bitrate[-1] if bitrate[-1].lower() in ("k", "m") else ""
+    value = float(bitrate[:-1] if unit else bitrate)
+    return f"{int(value * factor)}{unit}"
+
+
+def abr_encoding_args(ladder: List[Tuple[Optional[int], str]]) -> List[str]:
+    """
+    FFmpeg video options for an ABR ladder
+    
+    The source is decoded once: a filter graph splits the decoded frames and
+    scales one copy per rendition. Every rendition uses the same frame rate
+    and GOP, so segment boundaries line up and players can switch at any
+    segment.
+    """
+    count = len(ladder)
+    graph = [f"[0:v]fps=15,split={count}" + "".join(f"[s{i}]" for i in range(count))]
+    for i, (height, _) in enumerate(ladder):
+        graph.append(f"[s{i}]{f'scale=-2:{height}' if height else 'null'}[v{i}]")
+    
+    args = ['-filter_complex', ";".join(graph)]
+    for i, (_, bitrate) in enumerate(ladder):
+        args += [
+            '-map', f'[v{i}]',
+            f'-b:v:{i}', bitrate,
+            f'-maxrate:v:{i}', _scale_bitrate(bitrate, 1.5),
+            f'-bufsize:v:{i}', _scale_bitrate(bitrate, 1.5),
+        ]
+    return args + [
+        '-c:v', 'libx264',            # Re-encode every rendition with H.264
+        '-profile:v', 'baseline',     # Use baseline profile for compatibility
+        '-preset', 'ultrafast',       # Fast encoding
+        '-tune', 'zerolatency',       # Minimize latency
+        '-g', '30',                   # GOP size (same for all renditions)
+        '-keyint_min', '30',          # Keyframes only at GOP boundaries
+        '-sc_threshold', '0',         # Disable scene detection
+    ]
+
+
+def _process_cpu_seconds(pid: int) -> Optional[float]:
+    """User + system CPU time of a process (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the command name, which may contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def session_cpu_percent(session_id: str) -> Optional[float]:
+    """
+    CPU usage of a session's FFmpeg process since the previous call
+    (since start on the first call), as a percentage of one core
+    """
+    process = active_processes.get(session_id)
+    session = hls_sessions.get(session_id)
+    if process is None or session is None or process.returncode is not None:
+        return None
+    
+    cpu_seconds = _process_cpu_seconds(process.pid)
+    if cpu_seconds is None:
+        return None
+    
+    now = time.time()
+    last_time, last_cpu = session.get("cpu_sample", (session["start_time"], 0.0))
+    session["cpu_sample"] = (now, cpu_seconds)
+    if now - last_time < 0.5:
+        return session.get("cpu_percent")
+    
+    session["cpu_percent"] = 100.0 * (cpu_seconds - last_cpu) / (now - last_time)
+    return session["cpu_percent"]
+
+
+def hls_output_args(
+    output_base: str,
+    low_latency: bool,
+    upload: bool = False,
+    variants: int = 1
+) -> Tuple[List[str], str, str]:
+    """
+    FFmpeg output options for a session
+    
+    Args:
+        output_base: Session directory, or the ingest URL when uploading to memory
+        low_latency: Produce fMP4 parts for LL-HLS (playlists are rewritten when served)
+        upload: Send every file with HTTP PUT instead of writing it
+        variants: Number of ABR renditions (video streams) in the output
+    
+    Returns:
+        Tuple of (options, playlist players load, media playlist to watch for readiness)
+    """
+    upload_args = ['-method', 'PUT', '-http_persistent', '1'] if upload else []
+    
+    if low_latency:
+        # LL-HLS: the DASH muxer streams every segment as fMP4 fragments of
+        # HLS_PART_TIME and writes LHLS playlists (prefetch hints) per segment;
+        # get_live_file turns those into LL-HLS with the fragments as parts.
+        # ABR renditions become representations of the one adaptation set
+        # (media_0, media_1, ...)
+        return [
+            '-f', 'dash',
+            '-ldash', '1',
+            '-lhls', '1',
+            '-streaming', '1',
+            '-hls_playlist', '1',
+            '-seg_duration', str(settings.HLS_SEGMENT_TIME),
+            '-frag_type', 'duration',
+            '-frag_duration', str(settings.HLS_PART_TIME),
+            '-window_size', str(settings.HLS_LIST_SIZE),
+            '-extra_window_size', '2',
+            '-remove_at_exit', '1',
+            '-use_template', '1',
+            '-use_timeline', '0',
+            '-adaptation_sets', 'id=0,streams=v',
+            *upload_args,
+            f"{output_base}/manifest.mpd"
+        ], "master.m3u8", "media_0.m3u8"
+    
+    if variants > 1:
+        # One media playlist per rendition (0.m3u8, 1.m3u8, ...) plus a master playlist
+        return [
+            '-f', 'hls',
+            '-hls_time', '2',
+            '-hls_list_size', str(settings.HLS_LIST_SIZE),
+            '-hls_flags', 'delete_segments+append_list+temp_file+independent_segments',
+            '-hls_segment_type', 'mpegts',
+            '-hls_segment_filename', f"{output_base}/%v_%d.ts",
+            '-master_pl_name', 'master.m3u8',
+            '-var_stream_map', " ".join(f"v:{i}" for i in range(variants)),
+            *upload_args,
+            f"{output_base}/%v.m3u8"
+        ], "master.m3u8", "0.m3u8"
+    
+    return [
+        '-f', 'hls',                  # HLS output format
+        '-hls_time', '2',             # Segment length in seconds
+        '-hls_list_size', str(settings.HLS_LIST_SIZE),  # Number of segments in playlist
+        '-hls_flags', 'delete_segments+append_list+temp_file',
+        '-hls_segment_type', 'mpegts', # Use MPEG-TS segment type
+        '-hls_segment_filename', f"{output_base}/%d.ts",  # Segment filename pattern
+        *upload_args,
+        f"{output_base}/index.m3u8"   # Output playlist path
+    ], "index.m3u8", "index.m3u8"
+
+
+def notify_playlist_update(session_id: str):
+    """Wake everything waiting on a session's playlist (readiness and blocking reloads)"""
+    session = hls_sessions.get(session_id)
+    if session is None:
+        return
+    event = session.get("playlist_event")
+    session["playlist_event"] = asyncio.Event()
+    if event is not None:
+        event.set()
+
+
+def playlist_last_msn(playlist: str) -> int:
+    """Media sequence number of the last complete segment in a media playlist, -1 if none"""
+    media_sequence = 0
+    segments = 0
+    for line in playlist.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+            media_sequence = int(line.split(":", 1)[1])
+        elif line and not line.startswith("#"):
+            segments += 1
+    return media_sequence + segments - 1 if segments else -1
+
+
+def read_session_file(session_id: str, filename: str) -> Optional[bytes]:
+    """Read a playlist or segment from the session's memory store or directory"""
+    if segment_store.has_session(session_id):
+        return segment_store.get(session_id, filename)
+    try:
+        with open(os.path.join(settings.HLS_DIR, session_id, filename), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def read_segment_data(session_id: str, filename: str) -> Tuple[Optional[bytes], bool]:
+    """
+    Read a segment, including one FFmpeg is still writing
+    
+    Returns:
+        Tuple of (data or None, whether the segment is complete)
+    """
+    if segment_store.has_session(session_id):
+        uploading = hls_sessions.get(session_id, {}).get("uploading", ())
+        return segment_store.get(session_id, filename), filename not in uploading
+    
+    data = read_session_file(session_id, filename)
+    if data is not None:
+        return data, True
+    # The file muxer writes to a temporary name and renames the finished segment
+    return read_session_file(session_id, f"{filename}.tmp"), False
+
+
+def load_playlist(session_id: str, filename: str) -> Optional[Tuple[bytes, PlaylistState]]:
+    """
+    Read a playlist; low-latency media playlists are rewritten as LL-HLS
+    
+    Returns:
+        Tuple of (playlist, what it lists), or None if it does not exist yet
+    """
+    data = read_session_file(session_id, filename)
+    if data is None:
+        return None
+    
+    text = data.decode("utf-8", errors="replace")
+    ll_playlist = hls_sessions.get(session_id, {}).get("ll_playlist")
+    if ll_playlist is None or not filename.endswith(".m3u8") or "#EXT-X-STREAM-INF" in text:
+        return data, PlaylistState(playlist_last_msn(text), -1, 0)
+    
+    text, state = ll_playlist.render(text, lambda name: read_segment_data(session_id, name)[0])
+    return text.encode("utf-8"), state
+
+
+async def wait_for_playlist(
+    session_id: str,
+    filename: str,
+    min_msn: int,
+    timeout: float,
+    min_part: Optional[int] = None
+) -> Optional[bytes]:
+    """
+    Wait until a media playlist contains segment min_msn (or part min_part of it)
+    
+    Wakes on playlist writes and part uploads, with a short re-check for
+    parts written to disk, which FFmpeg does not log.
+    
+    Returns:
+        Playlist text, or None on timeout / FFmpeg exit
+    """
+    deadline = time.time() + timeout
+    while True:
+        session = hls_sessions.get(session_id)
+        if session is None:
+            return None
+        
+        loaded = load_playlist(session_id, filename)
+        if loaded is not None:
+            playlist, state = loaded
+            if state.last_msn >= min_msn or (
+                min_part is not None and state.partial_msn == min_msn and state.partial_parts > min_part
+            ):
+                return playlist
+        
+        process = active_processes.get(session_id)
+        if process is not None and process.returncode is not None:
+            return None
+        
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return None
+        
+        if session.get("playlist_event") is None:
+            session["playlist_event"] = asyncio.Event()
+        try:
+            await asyncio.wait_for(session["playlist_event"].wait(), min(remaining, 0.25, settings.HLS_PART_TIME / 2))
+        except asyncio.TimeoutError:
+            pass
+
+
+async def start_hls_stream(camera_id: int, rtsp_url: str, session_id: str, renditions: int = 1) -> bool:
+    """
+    Start an HLS stream using FFmpeg to convert RTSP to HLS
+    
+    With more than one rendition the stream becomes an ABR ladder: a single
+    FFmpeg process decodes the camera once and encodes every rendition,
+    listed in a master playlist.
+    """
     try:
-        # Create output directory if it doesn't exist
-        output_dir = settings.HLS_DIR
-        os.makedirs(output_dir, exist_ok=True)
+        # Read the camera's ingest relay when it has one, so the camera is pulled only once
+        camera_manager = await get_camera_manager()
+        source_url = camera_manager.get_stream_source(camera_id, rtsp_url)
         
-        # Create a dedicated directory for this session
-        session_dir = os.path.join(output_dir, session_id)
-        os.makedirs(session_dir, exist_ok=True)
+        low_latency = settings.HLS_LOW_LATENCY
+        in_memory = settings.HLS_MEMORY_STORE
+        ingest_token = uuid.uuid4().hex
         
-        # Define playlist path inside the session directory
-        playlist_path = os.path.join(session_dir, "index.m3u8")
+        if in_memory:
+            # FFmpeg uploads every file to this API; nothing is written to disk
+            # Low-latency playlists also keep the DASH muxer's extra window of 2
+            segment_store.open_session(
+                session_id, settings.HLS_LIST_SIZE + 2 if low_latency else settings.HLS_LIST_SIZE
+            )
+            output_base = f"{settings.HLS_INGEST_URL}/api/hls/ingest/{session_id}/{ingest_token}"
+            logger.info(f"HLS session {session_id} kept in memory")
+        else:
+            # Create output directory if it doesn't exist
+            output_dir = settings.HLS_DIR
+            os.makedirs(output_dir, exist_ok=True)
+            
+            # Create a dedicated directory for this session
+            output_base = os.path.join(output_dir, session_id)
+            os.makedirs(output_base, exist_ok=True)
+            logger.info(f"HLS directory: {output_base}")
+            
+            # Access controls for HLS (optional)
+            access_file = os.path.join(output_dir, f"{session_id}.access")
+            with open(access_file, 'w') as f:
+                f.write(session_id)
         
-        # Debug log for file paths
-        logger.info(f"HLS directory: {session_dir}")
-        logger.info(f"Playlist path: {playlist_path}")
         logger.info(f"FFmpeg log will be in: {os.path.join(FFMPEG_LOGS_DIR, f'{session_id}.log')}")
         
-        # Access controls for HLS (optional)
-        access_file = os.path.join(output_dir, f"{session_id}.access")
-        with open(access_file, 'w') as f:
-            f.write(session_id)
+        # Copy the camera's H.264 when players can decode it, transcode otherwise
+        video_mode, source_info = await choose_video_mode(source_url)
+        ladder = []
+        if renditions > 1:
+            # ABR renditions are all encoded; the probe only caps the ladder at the source height
+            source_info = source_info or await probe_video_stream(source_url)
+            ladder = abr_ladder(renditions, source_info)
+            video_mode = "abr"
+            video_args = abr_encoding_args(ladder)
+        else:
+            video_args = video_encoding_args(video_mode)
+        logger.info(
+            f"HLS video mode for camera {camera_id}: {video_mode} "
+            f"(source: {(source_info or {}).get('codec_name', 'unknown')} {(source_info or {}).get('profile', '')})"
+        )
+        
+        output_args, playlist_name, media_playlist = hls_output_args(
+            output_base, low_latency, upload=in_memory, variants=max(1, len(ladder))
+        )
         
-        # Improved FFmpeg command with more explicit transcoding options
         command = [
             settings.FFMPEG_PATH,
             '-loglevel', 'debug',         # Show detailed logs for debugging
-            '-rtsp_transport', 'tcp',     # Use TCP for RTSP (more reliable)
-            '-i', rtsp_url,               # Input RTSP URL
-            '-c:v', 'libx264',            # Re-encode with H.264 instead of copy
-            '-profile:v', 'baseline',     # Use baseline profile for compatibility
-            '-level', '3.0',              # H.264 level
-            '-preset', 'ultrafast',       # Fast encoding
-            '-tune', 'zerolatency',       # Minimize latency
-            '-r', '15',                   # Output frame rate
-            '-g', '30',                   # GOP size 
-            '-sc_threshold', '0',         # Disable scene detection
-            '-b:v', '1000k',              # Video bitrate
-            '-bufsize', '1500k',          # Buffer size
-            '-maxrate', '1500k',          # Max bitrate
+            *input_args(source_url),
+            *video_args,
             '-an',                        # No audio
-            '-f', 'hls',                  # HLS output format
-            '-hls_time', '2',             # Segment length in seconds
-            '-hls_list_size', '3',        # Number of segments in playlist
-            '-hls_flags', 'delete_segments+append_list',
-            '-hls_segment_type', 'mpegts', # Use MPEG-TS segment type
-            '-hls_segment_filename', f"{session_dir}/%d.ts",  # Segment filename pattern
-            playlist_path                 # Output playlist path
+            *output_args
         ]
         
         # Log the exact command for debugging
@@ -245,9 +696,24 @@ async def start_hls_stream(camera_id: int, rtsp_url: str, session_id: str) -> bo
             "camera_id": camera_id,
             "start_time": time.time(),
             "last_activity": time.time(),
-            "playlist_path": playlist_path,
-            "hls_url": f"/static/hls/{session_id}/index.m3u8",  # Updated URL path
-            "rtsp_url": rtsp_url
+            "media_playlist": media_playlist,
+            # Low-latency and in-memory sessions are served by the API
+            "hls_url": (
+                f"/api/hls/live/{session_id}/{playlist_name}" if low_latency or in_memory
+                else f"/static/hls/{session_id}/{playlist_name}"
+            ),
+            "low_latency": low_latency,
+            "in_memory": in_memory,
+            "ingest_token": ingest_token,
+            "playlist_event": asyncio.Event(),
+            "ll_playlist": LowLatencyPlaylist(settings.HLS_PART_TIME) if low_latency else None,
+            "uploading": set(),
+            "first_segment_seconds": None,
+            "rtsp_url": rtsp_url,
+            "source_url": source_url,
+            "video_mode": video_mode,
+            "renditions": [height or (source_info or {}).get("height") or "source" for height, _ in ladder],
+            "source_codec": (source_info or {}).get("codec_name")
         }
         
         # Add to active camera streams
@@ -258,23 +724,18 @@ async def start_hls_stream(camera_id: int, rtsp_url: str, session_id: str) -> bo
             camera_connections[camera_id] = []
         camera_connections[camera_id].append(session_id)
         
-        # Wait a bit for FFmpeg to start
-        await asyncio.sleep(5)  # Increased wait time to 5 seconds
-            
-        # Check if playlist file was created (with retries)
-        retry_count = 0
-        max_retries = 5
-        while not os.path.exists(playlist_path) and retry_count < max_retries:
-            await asyncio.sleep(1)
-            retry_count += 1
-            logger.info(f"Waiting for playlist file to be created (attempt {retry_count}/{max_retries})")
-        
-        if not os.path.exists(playlist_path):
-            logger.error(f"HLS playlist file was not created: {playlist_path}")
+        # Return as soon as the first segment is in the playlist
+        if await wait_for_playlist(session_id, media_playlist, 0, settings.HLS_START_TIMEOUT) is None:
+            logger.error(f"HLS playlist was not created in {settings.HLS_START_TIMEOUT}s: {media_playlist}")
             await cleanup_process(session_id)
             return False
-            
-        logger.info(f"Started HLS stream for camera {camera_id} with session {session_id}")
+        
+        session = hls_sessions[session_id]
+        session["first_segment_seconds"] = time.time() - session["start_time"]
+        logger.info(
+            f"Started HLS stream for camera {camera_id} with session {session_id} "
+            f"(first segment after {session['first_segment_seconds']:.2f}s)"
+        )
         return True
         
     except Exception as e:
@@ -289,6 +750,11 @@ class StreamResponse(BaseModel):
     url: str
     camera_id: int
     start_time: float
+    video_mode: Optional[str] = None
+    cpu_percent: Optional[float] = None
+    low_latency: bool = False
+    first_segment_seconds: Optional[float] = None
+    renditions: Optional[List[Any]] = None
 
 
 @router.post("/start/{camera_id}", response_model=StreamResponse)
@@ -317,23 +783,33 @@ async def start_stream(
                 "session_id": session_id,
                 "url": f"{settings.API_URL}{session['hls_url']}",
                 "camera_id": camera_id,
-                "start_time": session["start_time"]
+                "start_time": session["start_time"],
+                "video_mode": session.get("video_mode"),
+                "cpu_percent": session_cpu_percent(session_id),
+                "low_latency": session.get("low_latency", False),
+                "first_segment_seconds": session.get("first_segment_seconds"),
+                "renditions": session.get("renditions")
             }
     
     # Generate session ID for new stream
     session_id = str(uuid.uuid4())
     
     # Start HLS stream
-    success = await start_hls_stream(camera_id, camera.rtsp_url, session_id)
+    success = await start_hls_stream(camera_id, camera.rtsp_url, session_id, renditions=camera.hls_renditions or 1)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to start stream")
     
     # Return stream information
+    session = hls_sessions[session_id]
     return {
         "session_id": session_id,
-        "url": f"{settings.API_URL}/static/hls/{session_id}/index.m3u8",
+        "url": f"{settings.API_URL}{session['hls_url']}",
         "camera_id": camera_id,
-        "start_time": time.time()
+        "start_time": session["start_time"],
+        "video_mode": session.get("video_mode"),
+        "low_latency": session.get("low_latency", False),
+        "first_segment_seconds": session.get("first_segment_seconds"),
+        "renditions": session.get("renditions")
     }
 
 
@@ -376,10 +852,190 @@ async def stream_status(session_id: str):
         "session_id": session_id,
         "url": f"{settings.API_URL}{session['hls_url']}",
         "camera_id": session["camera_id"],
-        "start_time": session["start_time"]
+        "start_time": session["start_time"],
+        "video_mode": session.get("video_mode"),
+        "cpu_percent": session_cpu_percent(session_id),
+        "low_latency": session.get("low_latency", False),
+        "first_segment_seconds": session.get("first_segment_seconds"),
+        "renditions": session.get("renditions")
     }
 
 
+@router.get("/live/{session_id}/{filename}")
+async def get_live_file(
+    session_id: str,
+    filename: str,
+    request: Request,
+    hls_msn: Optional[int] = Query(None, alias="_HLS_msn", ge=0),
+    hls_part: Optional[int] = Query(None, alias="_HLS_part", ge=0)
+):
+    """
+    Serve a session's playlists and segments
+    
+    Low-latency media playlists are served as LL-HLS. Requests with _HLS_msn
+    (and _HLS_part) are held until that segment (or part) is in the playlist
+    (blocking playlist reload). Parts are byte ranges of their segment, which
+    can be served while the segment is still being written.
+    """
+    session = hls_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Stream session not found")
+    if os.path.basename(filename) != filename or filename.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid file name")
+    
+    session["last_activity"] = time.time()
+    media_type = HLS_CONTENT_TYPES.get(os.path.splitext(filename)[1], "application/octet-stream")
+    
+    if filename.endswith((".m3u8", ".mpd")):
+        if hls_msn is not None:
+            playlist = await wait_for_playlist(
+                session_id, filename, hls_msn, settings.HLS_BLOCKING_RELOAD_TIMEOUT, min_part=hls_part
+            )
+            if playlist is None:
+                raise HTTPException(status_code=503, detail="Segment not available yet")
+        else:
+            loaded = load_playlist(session_id, filename)
+            if loaded is None:
+                raise HTTPException(status_code=404, detail="Playlist not found")
+            playlist = loaded[0]
+        
+        return Response(content=playlist, media_type=media_type, headers={"Cache-Control": "no-cache"})
+    
+    # Segment names are never reused within a session
+    segment_headers = {"Cache-Control": "public, max-age=60, immutable"}
+    
+    range_header = request.headers.get("range")
+    if range_header:
+        # LL-HLS parts: byte ranges of a segment that may still be growing
+        data, complete = read_segment_data(session_id, filename)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Segment not found")
+        byte_range = parse_byte_range(range_header, len(data))
+        if byte_range is None:
+            raise HTTPException(status_code=416, detail="Range not available")
+        start, end = byte_range
+        return Response(
+            content=data[start:end + 1],
+            status_code=206,
+            media_type=media_type,
+            headers={
+                **segment_headers,
+                "Content-Range": f"bytes {start}-{end}/{len(data) if complete else '*'}"
+            }
+        )
+    
+    if session.get("in_memory"):
+        data = segment_store.get(session_id, filename)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Segment not found")
+        return Response(content=data, media_type=media_type, headers=segment_headers)
+    
+    path = os.path.join(settings.HLS_DIR, session_id, filename)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Segment not found")
+    return FileResponse(path, media_type=media_type, headers=segment_headers)
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single-range "bytes=" header within size bytes, None if unsatisfiable"""
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start = max(0, size - int(last))
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _check_ingest(request: Request, session_id: str, token: str, filename: str):
+    """Only the session's own FFmpeg process may upload"""
+    session = hls_sessions.get(session_id)
+    if session is None or not session.get("in_memory") or session.get("ingest_token") != token:
+        raise HTTPException(status_code=404, detail="Stream session not found")
+    if request.client is None or request.client.host not in ("127.0.0.1", "::1", "localhost"):
+        raise HTTPException(status_code=403, detail="Uploads are only accepted locally")
+    if os.path.basename(filename) != filename or filename.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid file name")
+
+
+@router.put("/ingest/{session_id}/{token}/{filename}")
+async def ingest_file(session_id: str, token: str, filename: str, request: Request):
+    """Receive a playlist or segment uploaded by FFmpeg (in-memory sessions)"""
+    _check_ingest(request, session_id, token, filename)
+    
+    session = hls_sessions[session_id]
+    # Low-latency segments are uploaded as they are written; publish every
+    # chunk so their parts can be served before the segment is complete
+    partial = session.get("low_latency") and not filename.endswith(PLAYLIST_SUFFIXES)
+    
+    if partial:
+        session["uploading"].add(filename)
+        try:
+            # Readers see the growing segment; nothing is copied per chunk
+            segment_store.put(session_id, filename, bytearray())
+            async for chunk in request.stream():
+                if chunk:
+                    segment_store.append(session_id, filename, chunk)
+                    notify_playlist_update(session_id)
+        finally:
+            session["uploading"].discard(filename)
+        stored = segment_store.finalize(session_id, filename)
+    else:
+        data = bytearray()
+        async for chunk in request.stream():
+            data.extend(chunk)
+        stored = segment_store.put(session_id, filename, bytes(data))
+    
+    if not stored:
+        raise HTTPException(status_code=404, detail="Stream session not found")
+    
+    if filename.endswith(".m3u8"):
+        notify_playlist_update(session_id)
+    return Response(status_code=201)
+
+
+@router.delete("/ingest/{session_id}/{token}/{filename}")
+async def ingest_delete(session_id: str, token: str, filename: str, request: Request):
+    """Drop a segment FFmpeg has removed from its playlist"""
+    _check_ingest(request, session_id, token, filename)
+    segment_store.delete(session_id, filename)
+    return Response(status_code=204)
+
+
+@router.get("/store")
+async def get_store_stats():
+    """Memory used by in-memory HLS sessions"""
+    return {"enabled": settings.HLS_MEMORY_STORE, **segment_store.get_stats()}
+
+
+@router.get("/sessions")
+async def list_sessions():
+    """List active HLS sessions with their video mode and FFmpeg CPU usage"""
+    return [
+        {
+            "session_id": session_id,
+            "camera_id": session["camera_id"],
+            "start_time": session["start_time"],
+            "video_mode": session.get("video_mode"),
+            "source_codec": session.get("source_codec"),
+            "cpu_percent": session_cpu_percent(session_id),
+            "low_latency": session.get("low_latency", False),
+            "in_memory": session.get("in_memory", False),
+            "first_segment_seconds": session.get("first_segment_seconds"),
+            "renditions": session.get("renditions")
+        }
+        for session_id, session in list(hls_sessions.items())
+    ]
+
+
 # Debug endpoint to get FFmpeg logs for a session
 @router.get("/logs/{session_id}")
 async def get_ffmpeg_logs(session_id: str):
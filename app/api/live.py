@@ -0,0 +1,179 @@
+import asyncio
+import base64
+import json
+import logging
+import struct
+import time
+from typing import Dict, Any, Optional, Tuple
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.core.camera_manager import get_camera_manager
+from app.core.live_view import clamp_live_view_params, compact_detections, iter_jpeg_frames
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+class LiveConnection:
+    """
+    One WebSocket viewer, subscribed to any number of cameras.
+    
+    A producer task per camera pulls frames through the shared JPEG cache and
+    leaves only the newest one in the connection's mailbox. A single sender
+    drains the mailbox, so a slow socket drops older frames (per camera)
+    instead of queueing them.
+    """
+    def __init__(self, websocket: WebSocket, legacy: bool = False):
+        self.websocket = websocket
+        self.legacy = legacy  # JSON "snapshot" messages with base64 data
+        self.producers: Dict[int, asyncio.Task] = {}
+        self.mailbox: Dict[int, Tuple[bytes, Dict[str, Any]]] = {}
+        self.ready = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        
+        # Statistics
+        self.frames_sent = 0
+        self.frames_dropped = 0
+    
+    async def send_json(self, message: Dict[str, Any]):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message))
+    
+    async def subscribe(self, camera_id: int, fps: Optional[float] = None, quality: Optional[int] = None,
+                        width: Optional[int] = None) -> bool:
+        """Start pushing a camera's frames (replaces an existing subscription)"""
+        camera_manager = await get_camera_manager()
+        if camera_id not in camera_manager.cameras or not await camera_manager.ensure_camera_connected(camera_id):
+            await self.send_json({"type": "error", "camera_id": camera_id, "message": "Camera not available"})
+            return False
+        
+        self.unsubscribe(camera_id)
+        processor = camera_manager.cameras[camera_id]
+        fps, quality = clamp_live_view_params(fps, quality)
+        self.producers[camera_id] = asyncio.create_task(self._produce(processor, fps, quality, width))
+        return True
+    
+    def unsubscribe(self, camera_id: int):
+        """Stop pushing a camera's frames"""
+        task = self.producers.pop(camera_id, None)
+        if task:
+            task.cancel()
+        self.mailbox.pop(camera_id, None)
+    
+    async def _produce(self, processor, fps: float, quality: int, width: Optional[int]):
+        try:
+            async for jpeg_frame, etag in iter_jpeg_frames(processor, fps, quality, width):
+                metadata = {
+                    "camera_id": processor.camera_id,
+                    "timestamp": processor.latest_processed_timestamp or time.time(),
+                    "etag": etag,
+                    "detections": compact_detections(processor.get_detection_results())
+                }
+                if processor.camera_id in self.mailbox:
+                    self.frames_dropped += 1
+                self.mailbox[processor.camera_id] = (jpeg_frame, metadata)
+                self.ready.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Error producing live frames for camera {processor.camera_id}: {str(e)}")
+    
+    async def run_sender(self):
+        """Send the newest pending frame of each camera until cancelled"""
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            
+            while self.mailbox:
+                camera_id = next(iter(self.mailbox))
+                jpeg_frame, metadata = self.mailbox.pop(camera_id)
+                
+                async with self._send_lock:
+                    if self.legacy:
+                        await self.websocket.send_text(json.dumps({
+                            "type": "snapshot",
+                            **metadata,
+                            "data": base64.b64encode(jpeg_frame).decode("utf-8")
+                        }))
+                    else:
+                        # Metadata, then the JPEG prefixed with its camera ID (4 bytes, big-endian)
+                        await self.websocket.send_text(json.dumps({"type": "frame", **metadata}))
+                        await self.websocket.send_bytes(struct.pack(">I", camera_id) + jpeg_frame)
+                self.frames_sent += 1
+    
+    async def close(self):
+        for camera_id in list(self.producers.keys()):
+            self.unsubscribe(camera_id)
+
+async def _serve(connection: LiveConnection, initial_camera_id: Optional[int] = None):
+    """Run a connection: the sender task plus the client's control messages"""
+    sender = asyncio.create_task(connection.run_sender())
+    try:
+        if initial_camera_id is not None:
+            await connection.subscribe(initial_camera_id)
+        
+        while True:
+            message = json.loads(await connection.websocket.receive_text())
+            message_type = message.get("type")
+            
+            if message_type == "ping":
+                await connection.send_json({"type": "pong", "time": time.time()})
+            
+            elif message_type == "subscribe":
+                camera_ids = message.get("camera_ids") or [message.get("camera_id")]
+                for camera_id in camera_ids:
+                    if camera_id is None:
+                        continue
+                    if await connection.subscribe(
+                        int(camera_id), message.get("fps"), message.get("quality"), message.get("width")
+                    ):
+                        await connection.send_json({"type": "subscribed", "camera_id": int(camera_id)})
+            
+            elif message_type == "unsubscribe":
+                camera_ids = message.get("camera_ids") or [message.get("camera_id")]
+                for camera_id in camera_ids:
+                    if camera_id is not None:
+                        connection.unsubscribe(int(camera_id))
+            
+            elif message_type == "stats":
+                await connection.send_json({
+                    "type": "stats",
+                    "cameras": sorted(connection.producers.keys()),
+                    "frames_sent": connection.frames_sent,
+                    "frames_dropped": connection.frames_dropped
+                })
+            
+            else:
+                await connection.send_json({"type": "error", "message": f"Unknown message type: {message_type}"})
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Live WebSocket closed with error: {str(e)}")
+    finally:
+        sender.cancel()
+        await connection.close()
+
+@router.websocket("/live/ws")
+async def live_websocket(websocket: WebSocket):
+    """
+    Push frames and detections for any number of cameras over one socket
+    
+    Client messages (JSON):
+        {"type": "subscribe", "camera_ids": [1, 2], "fps": 5, "quality": 70, "width": 640}
+        {"type": "unsubscribe", "camera_ids": [2]}
+        {"type": "ping"} / {"type": "stats"}
+    
+    Server messages: a JSON {"type": "frame", "camera_id", "timestamp", "etag",
+    "detections"} text message followed by a binary message holding the camera
+    ID (4 bytes, big-endian) and the JPEG. Slow clients only ever get the
+    newest frame per camera.
+    """
+    await websocket.accept()
+    await _serve(LiveConnection(websocket))
+
+@router.websocket("/webrtc/snapshot/{camera_id}")
+async def snapshot_websocket(websocket: WebSocket, camera_id: int):
+    """Single-camera push of JSON "snapshot" messages with base64 JPEG data (used by test.py)"""
+    await websocket.accept()
+    await websocket.send_text(json.dumps({"type": "info", "message": f"Streaming camera {camera_id}"}))
+    await _serve(LiveConnection(websocket, legacy=True), initial_camera_id=camera_id)
\ No newline at end of file
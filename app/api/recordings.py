@@ -0,0 +1,70 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, Any, Optional
+import time
+import logging
+
+from app.services.recording_manager import get_recording_manager
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_recording_stats():
+    """Get disk usage, retention and recorder statistics"""
+    recording_manager = await get_recording_manager()
+    return recording_manager.get_stats()
+
+@router.post("/retention", response_model=Dict[str, Any])
+async def run_retention():
+    """Enforce the quota now instead of waiting for the retention loop"""
+    recording_manager = await get_recording_manager()
+    deleted = await recording_manager.enforce_retention()
+    return {"segments_deleted": deleted, "total_bytes": recording_manager.total_bytes}
+
+@router.get("/{camera_id}", response_model=Dict[str, Any])
+async def list_recordings(
+    camera_id: int,
+    start: Optional[float] = Query(None, description="Start time (epoch seconds), default one hour ago"),
+    end: Optional[float] = Query(None, description="End time (epoch seconds), default now")
+):
+    """List a camera's recorded segments that overlap a time range"""
+    recording_manager = await get_recording_manager()
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 3600
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    return {
+        "camera_id": camera_id,
+        "recording": camera_id in recording_manager.recorders,
+        "segments": [
+            {
+                "start_time": start_time,
+                "end_time": end_time,
+                "size": size,
+                "url": recording_manager.segment_url(camera_id, filename)
+            }
+            for start_time, end_time, size, filename in recording_manager.find_segments(camera_id, start, end)
+        ]
+    }
+
+@router.get("/{camera_id}/at", response_model=Dict[str, Any])
+async def get_recording_at(
+    camera_id: int,
+    timestamp: float = Query(..., description="Time to play back (epoch seconds)")
+):
+    """Find the segment containing a point in time and the offset into it"""
+    recording_manager = await get_recording_manager()
+    segment = recording_manager.find_segment_at(camera_id, timestamp)
+    if segment is None:
+        raise HTTPException(status_code=404, detail="No recording at this time")
+    
+    start_time, end_time, size, filename = segment
+    return {
+        "camera_id": camera_id,
+        "start_time": start_time,
+        "end_time": end_time,
+        "offset": timestamp - start_time,
+        "size": size,
+        "url": recording_manager.segment_url(camera_id, filename)
+    }
\ No newline at end of file
@@ -37,6 +37,12 @@ class Settings(BaseSettings):
     # AI models settings
     MODELS_DIR: str = os.getenv("MODELS_DIR", "models")
     DETECTION_MODEL: str = os.getenv("DETECTION_MODEL", "yolo11n.pt")  # Default to YOLOv8 nano
+    DETECTION_BACKEND: str = os.getenv("DETECTION_BACKEND", "auto")  # "auto" (ultralytics, else OpenCV DNN), "onnxruntime", "ultralytics" or "opencv"
+    DETECTION_NMS_THRESHOLD: float = float(os.getenv("DETECTION_NMS_THRESHOLD", "0.45"))  # IoU above which overlapping boxes are merged
+    ONNX_DETECTION_MODEL: str = os.getenv("ONNX_DETECTION_MODEL", "")  # Model for the onnxruntime backend, default <DETECTION_MODEL>_int8.onnx
+    ONNX_INPUT_SIZE: int = int(os.getenv("ONNX_INPUT_SIZE", "640"))  # Used when the model has dynamic input size
+    ONNX_INTRA_OP_THREADS: int = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # Threads within an operator, 0 = one per core
+    ONNX_INTER_OP_THREADS: int = int(os.getenv("ONNX_INTER_OP_THREADS", "1"))  # Operators run in parallel
     FACE_RECOGNITION_MODEL: str = os.getenv("FACE_RECOGNITION_MODEL", "face_recognition_model")
     
     # Video processing settings
@@ -44,12 +50,94 @@ class Settings(BaseSettings):
     TEMPLATE_MATCH_THRESHOLD: float = float(os.getenv("TEMPLATE_MATCH_THRESHOLD", "0.7"))
     FACE_RECOGNITION_THRESHOLD: float = float(os.getenv("FACE_RECOGNITION_THRESHOLD", "0.6"))
     
+    # Face gallery index (exact search below FACE_INDEX_MIN_TRAIN_SIZE, IVF above)
+    FACE_INDEX_IVF: bool = os.getenv("FACE_INDEX_IVF", "True").lower() == "true"
+    FACE_INDEX_MIN_TRAIN_SIZE: int = int(os.getenv("FACE_INDEX_MIN_TRAIN_SIZE", "20000"))
+    FACE_INDEX_NLIST: int = int(os.getenv("FACE_INDEX_NLIST", "0"))  # 0 = sqrt(gallery size)
+    FACE_INDEX_NPROBE: int = int(os.getenv("FACE_INDEX_NPROBE", "8"))  # Higher = better recall, slower
+    FACE_INDEX_PATH: str = os.getenv("FACE_INDEX_PATH", os.path.join(os.getenv("MODELS_DIR", "models"), "face_index.npz"))
+    
+    # Face tracking (reuse identities across frames instead of re-encoding)
+    FACE_TRACKING: bool = os.getenv("FACE_TRACKING", "False").lower() == "true"
+    FACE_TRACK_IOU_THRESHOLD: float = float(os.getenv("FACE_TRACK_IOU_THRESHOLD", "0.3"))
+    FACE_TRACK_REIDENTIFY_FRAMES: int = int(os.getenv("FACE_TRACK_REIDENTIFY_FRAMES", "30"))  # Re-encode a tracked face every N frames
+    FACE_TRACK_MIN_CONFIDENCE: float = float(os.getenv("FACE_TRACK_MIN_CONFIDENCE", "0.5"))  # Re-encode when track confidence decays below this
+    
+    # Batched inference settings (shared object detector)
+    INFERENCE_BATCHING: bool = os.getenv("INFERENCE_BATCHING", "False").lower() == "true"
+    INFERENCE_MAX_BATCH_SIZE: int = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+    INFERENCE_MAX_WAIT_MS: int = int(os.getenv("INFERENCE_MAX_WAIT_MS", "20"))  # Batch collection window
+    
+    # Frame buffering
+    FRAME_RING_SLOTS: int = int(os.getenv("FRAME_RING_SLOTS", "8"))  # Preallocated frame slots per camera
+    CAPTURE_MODE: str = os.getenv("CAPTURE_MODE", "latest")  # "latest" (freshest frame wins) or "fifo" (every frame)
+    RAW_FRAME_QUEUE_SIZE: int = int(os.getenv("RAW_FRAME_QUEUE_SIZE", "30"))  # Queue depth in fifo mode (ring grows to queue + 4 slots)
+    
+    # Motion gating (skip inference on static frames)
+    MOTION_GATING: bool = os.getenv("MOTION_GATING", "False").lower() == "true"
+    MOTION_THRESHOLD: float = float(os.getenv("MOTION_THRESHOLD", "0.005"))  # Fraction of changed pixels
+    MOTION_FORCE_INTERVAL: float = float(os.getenv("MOTION_FORCE_INTERVAL", "5"))  # Seconds between forced detections
+    
+    # Detect every N frames and track boxes with optical flow in between
+    DETECTION_INTERVAL: int = int(os.getenv("DETECTION_INTERVAL", "1"))  # Processed frames per detector run, 1 = detect every frame
+    
+    # Adaptive processing rate under load
+    RATE_CONTROL_ENABLED: bool = os.getenv("RATE_CONTROL_ENABLED", "False").lower() == "true"
+    RATE_CONTROL_MIN_FPS: float = float(os.getenv("RATE_CONTROL_MIN_FPS", "1"))  # Floor per camera
+    RATE_CONTROL_INTERVAL: float = float(os.getenv("RATE_CONTROL_INTERVAL", "2"))  # Seconds between adjustments
+    RATE_CONTROL_HIGH_LOAD: float = float(os.getenv("RATE_CONTROL_HIGH_LOAD", "0.9"))  # Busy fraction of all cores
+    RATE_CONTROL_LOW_LOAD: float = float(os.getenv("RATE_CONTROL_LOW_LOAD", "0.6"))
+    
+    # Capture worker processes (decode outside the API process)
+    CAPTURE_WORKERS_ENABLED: bool = os.getenv("CAPTURE_WORKERS_ENABLED", "False").lower() == "true"
+    CAMERAS_PER_WORKER: int = int(os.getenv("CAMERAS_PER_WORKER", "2"))
+    CAPTURE_WORKER_HEARTBEAT_TIMEOUT: float = float(os.getenv("CAPTURE_WORKER_HEARTBEAT_TIMEOUT", "10"))  # Seconds
+    
+    # Ingest relay (one RTSP pull per camera, re-served locally to analytics and HLS)
+    INGEST_RELAY_ENABLED: bool = os.getenv("INGEST_RELAY_ENABLED", "False").lower() == "true"
+    INGEST_RELAY_CLIENT_QUEUE: int = int(os.getenv("INGEST_RELAY_CLIENT_QUEUE", "256"))  # Chunks (~12 KB each) buffered per consumer
+    
+    # Event clips (pre/post-trigger video cut from the ingest relay's packet ring)
+    EVENT_CLIPS_ENABLED: bool = os.getenv("EVENT_CLIPS_ENABLED", "False").lower() == "true"  # Needs INGEST_RELAY_ENABLED
+    EVENT_CLIP_PRE_SECONDS: float = float(os.getenv("EVENT_CLIP_PRE_SECONDS", "5"))  # Video kept before a trigger
+    EVENT_CLIP_POST_SECONDS: float = float(os.getenv("EVENT_CLIP_POST_SECONDS", "10"))  # Video recorded after a trigger
+    EVENT_CLIP_KEYFRAME_MARGIN: float = float(os.getenv("EVENT_CLIP_KEYFRAME_MARGIN", "2"))  # Extra lead-in so a clip starts at a keyframe
+    
+    # Continuous recording (stream-copied segments with a global disk quota)
+    RECORDING_SEGMENT_SECONDS: int = int(os.getenv("RECORDING_SEGMENT_SECONDS", "60"))  # Length of each segment file
+    RECORDING_QUOTA_GB: float = float(os.getenv("RECORDING_QUOTA_GB", "50"))  # Total size of all cameras' segments
+    RECORDING_MIN_FREE_GB: float = float(os.getenv("RECORDING_MIN_FREE_GB", "2"))  # Free disk space always kept
+    RECORDING_MAX_AGE_DAYS: float = float(os.getenv("RECORDING_MAX_AGE_DAYS", "0"))  # Delete older segments, 0 = quota only
+    RECORDING_RETENTION_INTERVAL: float = float(os.getenv("RECORDING_RETENTION_INTERVAL", "30"))  # Seconds between quota checks
+    
+    # Event writer (batched inserts into the events table)
+    EVENT_QUEUE_SIZE: int = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+    EVENT_BATCH_SIZE: int = int(os.getenv("EVENT_BATCH_SIZE", "200"))
+    EVENT_FLUSH_INTERVAL: float = float(os.getenv("EVENT_FLUSH_INTERVAL", "1.0"))  # Seconds
+    EVENT_COALESCE_SECONDS: float = float(os.getenv("EVENT_COALESCE_SECONDS", "5"))  # One face/template event per camera per window, 0 = off
+    
+    # MJPEG live view (one encode per frame, fanned out to all viewers)
+    MJPEG_MAX_FPS: float = float(os.getenv("MJPEG_MAX_FPS", "10"))  # Upper bound for any viewer
+    MJPEG_QUALITY: int = int(os.getenv("MJPEG_QUALITY", "75"))  # Default JPEG quality
+    MJPEG_MAX_QUALITY: int = int(os.getenv("MJPEG_MAX_QUALITY", "90"))  # Upper bound for any viewer
+    
     # HLS Streaming settings
     FFMPEG_PATH: str = os.getenv("FFMPEG_PATH", "ffmpeg")  # Path to ffmpeg executable
     FFMPEG_BUFFER_SIZE: str = os.getenv("FFMPEG_BUFFER_SIZE", "5000k")
+    FFPROBE_PATH: str = os.getenv("FFPROBE_PATH", "ffprobe")  # Path to ffprobe executable
+    HLS_VIDEO_MODE: str = os.getenv("HLS_VIDEO_MODE", "auto")  # "auto" (copy H.264, else transcode), "copy" or "transcode"
     HLS_SEGMENT_TIME: int = int(os.getenv("HLS_SEGMENT_TIME", "1"))  # Segment time in seconds
     HLS_LIST_SIZE: int = int(os.getenv("HLS_LIST_SIZE", "5"))  # Number of segments in playlist
     HLS_TTL: int = int(os.getenv("HLS_TTL", "3600"))  # Time-to-live for sessions in seconds
+    HLS_ABR_LADDER: str = os.getenv("HLS_ABR_LADDER", "360:600k,720:1800k")  # Scaled ABR renditions as height:bitrate, lowest first
+    HLS_ABR_SOURCE_BITRATE: str = os.getenv("HLS_ABR_SOURCE_BITRATE", "3000k")  # Bitrate of the full-resolution ABR rendition
+    HLS_LOW_LATENCY: bool = os.getenv("HLS_LOW_LATENCY", "False").lower() == "true"  # LL-HLS with partial segments
+    HLS_PART_TIME: float = float(os.getenv("HLS_PART_TIME", "0.25"))  # Partial segment length in seconds (low latency)
+    HLS_START_TIMEOUT: float = float(os.getenv("HLS_START_TIMEOUT", "15"))  # Max wait for the first segment
+    HLS_BLOCKING_RELOAD_TIMEOUT: float = float(os.getenv("HLS_BLOCKING_RELOAD_TIMEOUT", "6"))  # Max hold of a blocking playlist request
+    HLS_MEMORY_STORE: bool = os.getenv("HLS_MEMORY_STORE", "False").lower() == "true"  # Keep segments in RAM instead of on disk
+    HLS_MEMORY_MAX_SEGMENTS: int = int(os.getenv("HLS_MEMORY_MAX_SEGMENTS", "12"))  # Segments kept per rendition (at least the playlist window + 2)
+    HLS_INGEST_URL: str = os.getenv("HLS_INGEST_URL", "http://127.0.0.1:8000")  # How FFmpeg reaches this API locally
     
     # Storage settings
     STATIC_DIR: str = "static"
@@ -57,6 +145,7 @@ class Settings(BaseSettings):
     FACES_DIR: str = f"{STATIC_DIR}/faces"
     SNAPSHOTS_DIR: str = f"{STATIC_DIR}/snapshots"
     RECORDINGS_DIR: str = f"{STATIC_DIR}/recordings"
+    CLIPS_DIR: str = f"{STATIC_DIR}/clips"
     HLS_DIR: str = f"{STATIC_DIR}/hls"
     
     # Email settings for notifications
@@ -85,5 +174,6 @@ os.makedirs(settings.TEMPLATES_DIR, exist_ok=True)
 os.makedirs(settings.FACES_DIR, exist_ok=True)
 os.makedirs(settings.SNAPSHOTS_DIR, exist_ok=True)
 os.makedirs(settings.RECORDINGS_DIR, exist_ok=True)
+os.makedirs(settings.CLIPS_DIR, exist_ok=True)
 os.makedirs(settings.HLS_DIR, exist_ok=True)
 os.makedirs(settings.MODELS_DIR, exist_ok=True)
\ No newline at end of file
@@ -9,6 +9,10 @@ from app.models.camera import Camera
 from app.models.settings import Settings
 from app.core.stream_processor import StreamProcessor
 from app.core.object_detection import ObjectDetector
+from app.core.inference_scheduler import InferenceScheduler
+from app.core.capture_workers import CaptureWorkerPool
+from app.core.ingest_relay import IngestRelay
+from app.core.rate_controller import ProcessingRateController
 from app.core.face_recognition import FaceRecognizer
 from app.core.template_matching import TemplateMatcher
 from app.core.people_counter import PeopleCounter
@@ -29,6 +33,10 @@ class CameraManager:
         # Shared resources for efficiency
         self.shared_object_detector = None
         self.shared_face_recognizer = None
+        self.inference_scheduler = None
+        self.capture_pool = None
+        self.rate_controller = None
+        self.ingest_relays: Dict[int, IngestRelay] = {}
         
         # Status
         self.status = "initializing"
@@ -43,9 +51,24 @@ class CameraManager:
             # Initialize shared object detector if we'll be using it
             self.shared_object_detector = ObjectDetector()
             
+            # Batch detection requests from all cameras through the shared detector
+            if settings.INFERENCE_BATCHING:
+                self.inference_scheduler = InferenceScheduler(self.shared_object_detector)
+                await self.inference_scheduler.start()
+            
+            # Decode camera streams in worker processes instead of API threads
+            if settings.CAPTURE_WORKERS_ENABLED:
+                self.capture_pool = CaptureWorkerPool()
+                await self.capture_pool.start()
+            
             # Initialize shared face recognizer
             self.shared_face_recognizer = FaceRecognizer()
             
+            # Adapt per-camera processing rates to host load
+            if settings.RATE_CONTROL_ENABLED:
+                self.rate_controller = ProcessingRateController(lambda: self.cameras)
+                await self.rate_controller.start()
+            
             # Update status
             self.initialized = True
             self.status = "ready"
@@ -84,10 +107,26 @@ class CameraManager:
                 recognize_faces=camera.recognize_faces,
                 template_matching=camera.template_matching
             )
+            processor.capture_pool = self.capture_pool
+            
+            # Pull the camera once; analytics and HLS read the local relay
+            if settings.INGEST_RELAY_ENABLED:
+                # Keep enough encoded video in memory to cut pre/post-event clips
+                ring_seconds = 0
+                if settings.EVENT_CLIPS_ENABLED:
+                    ring_seconds = (
+                        settings.EVENT_CLIP_PRE_SECONDS + settings.EVENT_CLIP_POST_SECONDS
+                        + settings.EVENT_CLIP_KEYFRAME_MARGIN + 1
+                    )
+                relay = IngestRelay(camera.id, camera.rtsp_url, ring_seconds=ring_seconds)
+                await relay.start()
+                self.ingest_relays[camera.id] = relay
+                processor.ingest_relay = relay
             
             # Assign AI components
             if camera.detect_people:
                 processor.object_detector = self.shared_object_detector or ObjectDetector()
+                processor.inference_scheduler = self.inference_scheduler
             
             if camera.count_people:
                 processor.people_counter = PeopleCounter(camera.id)
@@ -101,6 +140,9 @@ class CameraManager:
             # Connect to the camera stream
             if not await processor.connect():
                 logger.error(f"Failed to connect to camera {camera.id}: {camera.rtsp_url}")
+                relay = self.ingest_relays.pop(camera.id, None)
+                if relay:
+                    await relay.stop()
                 return False
             
             # Add to managed cameras
@@ -142,6 +184,11 @@ class CameraManager:
                 del self.cameras[camera_id]
                 
                 logger.info(f"Removed camera {camera_id} from manager")
+            
+            # Stop pulling the camera once nothing reads it locally
+            relay = self.ingest_relays.pop(camera_id, None)
+            if relay:
+                await relay.stop()
             return True
         except Exception as e:
             logger.exception(f"Error removing camera {camera_id}: {str(e)}")
@@ -184,6 +231,7 @@ class CameraManager:
             # Update AI components
             if camera.detect_people and not processor.object_detector:
                 processor.object_detector = self.shared_object_detector or ObjectDetector()
+                processor.inference_scheduler = self.inference_scheduler
             
             if camera.count_people and not processor.people_counter:
                 processor.people_counter = PeopleCounter(camera.id)
@@ -221,6 +269,46 @@ class CameraManager:
             logger.exception(f"Error getting JPEG frame for camera {camera_id}: {str(e)}")
             return None
     
+    async def get_jpeg_snapshot(
+        self,
+        camera_id: int,
+        quality: int = 90,
+        width: Optional[int] = None
+    ) -> Optional[Tuple[bytes, str]]:
+        """
+        Get the latest frame from a camera as cached JPEG bytes with its ETag
+        
+        Args:
+            camera_id: ID of the camera
+            quality: JPEG quality
+            width: Output width, or None for the original size
+        
+        Returns:
+            Tuple of (JPEG bytes, ETag) or None if not available
+        """
+        if camera_id not in self.cameras:
+            return None
+        
+        return await self.cameras[camera_id].get_latest_jpeg(quality, width)
+    
+    def match_jpeg_etag(
+        self,
+        camera_id: int,
+        if_none_match: Optional[str],
+        quality: int = 90,
+        width: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Check a conditional snapshot request against a camera's latest frame
+        
+        Returns:
+            The ETag if the client's copy is still current, otherwise None
+        """
+        if camera_id not in self.cameras:
+            return None
+        
+        return self.cameras[camera_id].match_jpeg_etag(if_none_match, quality, width)
+    
     async def ensure_camera_connected(self, camera_id: int) -> bool:
         """
         Ensure a camera is connected and processing
@@ -318,6 +406,43 @@ class CameraManager:
         
         return stats
     
+    def get_inference_stats(self) -> Dict[str, Any]:
+        """Get statistics for the shared batched inference scheduler"""
+        if not self.inference_scheduler:
+            return {"running": False}
+        return self.inference_scheduler.get_stats()
+    
+    def get_rate_control_stats(self) -> Dict[str, Any]:
+        """Get statistics for the processing rate controller"""
+        if not self.rate_controller:
+            return {"running": False}
+        return self.rate_controller.get_stats()
+    
+    def get_stream_source(self, camera_id: int, rtsp_url: str) -> str:
+        """
+        URL other consumers (HLS, recording) should open for a camera
+        
+        Returns:
+            The local ingest relay if the camera has one, otherwise rtsp_url
+        """
+        relay = self.ingest_relays.get(camera_id)
+        if relay and relay.running and relay.local_url:
+            return relay.local_url
+        return rtsp_url
+    
+    def get_ingest_relay_stats(self) -> Dict[str, Any]:
+        """Get statistics for the per-camera ingest relays"""
+        return {
+            "enabled": settings.INGEST_RELAY_ENABLED,
+            "relays": {camera_id: relay.get_stats() for camera_id, relay in self.ingest_relays.items()}
+        }
+    
+    def get_capture_worker_stats(self) -> Dict[str, Any]:
+        """Get statistics for the capture worker processes"""
+        if not self.capture_pool:
+            return {"enabled": False}
+        return {"enabled": True, **self.capture_pool.get_stats()}
+    
     async def shutdown(self):
         """Shutdown all cameras and release resources"""
         try:
@@ -325,6 +450,21 @@ class CameraManager:
             for camera_id in list(self.cameras.keys()):
                 await self.remove_camera(camera_id)
             
+            # Stop adapting processing rates
+            if self.rate_controller:
+                await self.rate_controller.stop()
+                self.rate_controller = None
+            
+            # Stop the batched inference loop
+            if self.inference_scheduler:
+                await self.inference_scheduler.stop()
+                self.inference_scheduler = None
+            
+            # Stop capture worker processes
+            if self.capture_pool:
+                await self.capture_pool.shutdown()
+                self.capture_pool = None
+            
             # Release shared resources
             self.shared_object_detector = None
             self.shared_face_recognizer = None
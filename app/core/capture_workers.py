@@ -0,0 +1,702 @@
+import cv2
+import numpy as np
+import os
+import logging
+import asyncio
+import time
+import threading
+import signal
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Header layout (float64): latest slot index, height, width, channels, then
+# one sequence number and one timestamp per slot
+HEADER_FIELDS = 4
+SEQ_OFFSET = HEADER_FIELDS
+
+class SharedFrameSlots:
+    """
+    Ring of frame slots in a shared memory block.
+    
+    Written by a capture worker process and read by the API process. Readers
+    validate each copy against the slot sequence number, so a frame that is
+    overwritten mid-copy is detected and skipped rather than returned torn.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, shape: Tuple[int, ...], num_slots: int, owner: bool):
+        self.shm = shm
+        self.name = shm.name
+        self.shape = tuple(shape)
+        self.num_slots = num_slots
+        self.owner = owner
+        
+        header_size = HEADER_FIELDS + 2 * num_slots
+        self.header = np.ndarray((header_size,), dtype=np.float64, buffer=shm.buf, offset=0)
+        self.frames = np.ndarray(
+            (num_slots,) + self.shape, dtype=np.uint8, buffer=shm.buf, offset=header_size * 8
+        )
+        self._ts_offset = SEQ_OFFSET + num_slots
+        self._next_seq = 0
+    
+    @staticmethod
+    def block_size(shape: Tuple[int, ...], num_slots: int) -> int:
+        """Bytes needed for a block holding num_slots frames of the given shape"""
+        return (HEADER_FIELDS + 2 * num_slots) * 8 + num_slots * int(np.prod(shape))
+    
+    @classmethod
+    def create(cls, name: str, shape: Tuple[int, ...], num_slots: int) -> "SharedFrameSlots":
+        """Create a new block (writer side)"""
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.block_size(shape, num_slots))
+        slots = cls(shm, shape, num_slots, owner=True)
+        slots.header[:] = -1
+        slots.header[1:4] = (shape + (1,))[:3] if len(shape) == 2 else shape[:3]
+        return slots
+    
+    @classmethod
+    def attach(cls, name: str, shape: Tuple[int, ...], num_slots: int) -> "SharedFrameSlots":
+        """Attach to an existing block (reader side)"""
+        shm = shared_memory.SharedMemory(name=name, create=False)
+        try:
+            # The writer owns the block's lifetime; stop this process from unlinking it at exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(shm, shape, num_slots, owner=False)
+    
+    def unlink(self):
+        """
+        Remove the block's name from the reader side
+        
+        Used when the writer was killed and never unlinked it; the memory is
+        freed once every mapping is closed.
+        """
+        try:
+            # attach() dropped the tracker entry, and unlink() removes one
+            from multiprocessing import resource_tracker
+            resource_tracker.register(self.shm._name, "shared_memory")
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+    
+    def begin_write(self) -> Tuple[int, np.ndarray]:
+        """Invalidate the slot after the latest one and return it for writing"""
+        latest = int(self.header[0])
+        index = (latest + 1) % self.num_slots
+        self.header[SEQ_OFFSET + index] = -1
+        return index, self.frames[index]
+    
+    def commit(self, index: int, timestamp: float) -> int:
+        """Publish a written slot as the latest frame"""
+        seq = self._next_seq
+        self._next_seq += 1
+        self.header[self._ts_offset + index] = timestamp
+        self.header[SEQ_OFFSET + index] = seq
+        self.header[0] = index
+        return seq
+    
+    def latest_seq(self) -> int:
+        """Sequence number of the latest frame, -1 if none"""
+        latest = int(self.header[0])
+        if latest < 0:
+            return -1
+        return int(self.header[SEQ_OFFSET + latest])
+    
+    def read_latest(self, out: np.ndarray) -> Optional[Tuple[int, float]]:
+        """
+        Copy the latest frame into out
+        
+        Returns:
+            Tuple of (sequence number, timestamp) or None if no consistent frame was read
+        """
+        for _ in range(3):
+            latest = int(self.header[0])
+            if latest < 0:
+                return None
+            
+            seq = self.header[SEQ_OFFSET + latest]
+            if seq < 0:
+                continue
+            
+            timestamp = float(self.header[self._ts_offset + latest])
+            np.copyto(out, self.frames[latest])
+            
+            # The writer invalidates a slot before reusing it
+            if self.header[SEQ_OFFSET + latest] == seq:
+                return int(seq), timestamp
+        
+        return None
+    
+    def close(self) -> bool:
+        """
+        Release the mapping (and the block, on the writer side)
+        
+        Returns:
+            False if the mapping is still in use and must be closed later
+        """
+        self.header = None
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            return False
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        return True
+
+class _WorkerCamera:
+    """Capture loop for one camera inside a worker process"""
+    def __init__(self, worker_id: int, camera_id: int, rtsp_url: str, fps: int, num_slots: int, status_queue):
+        self.worker_id = worker_id
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.fps = fps
+        self.num_slots = num_slots
+        self.status_queue = status_queue
+        
+        self.capture = None
+        self.slots: Optional[SharedFrameSlots] = None
+        self.frames = 0
+        self.running = False
+        self.thread = None
+        self._allocations = 0
+    
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(
+            target=self._run, daemon=True, name=f"camera_{self.camera_id}_worker_capture"
+        )
+        self.thread.start()
+    
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=5.0)
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+        if self.slots is not None:
+            self.slots.close()
+            self.slots = None
+    
+    def _allocate(self, shape: Tuple[int, ...]):
+        """Create a shared block for the current frame shape and announce it"""
+        old_slots = self.slots
+        self._allocations += 1
+        name = f"cctv_{self.camera_id}_{os.getpid()}_{self._allocations}"
+        self.slots = SharedFrameSlots.create(name, shape, self.num_slots)
+        self.status_queue.put(("attached", self.worker_id, self.camera_id, name, shape, self.num_slots, os.getpid()))
+        
+        # Readers keep their own mapping of the old block until they switch over
+        if old_slots is not None:
+            old_slots.close()
+    
+    def _run(self):
+        frame_interval = 1.0 / max(1, self.fps)
+        last_capture_time = 0
+        consecutive_errors = 0
+        
+        while self.running:
+            try:
+                if self.capture is None or not self.capture.isOpened():
+                    self.capture = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG)
+                    self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 3)
+                    if not self.capture.isOpened():
+                        self.status_queue.put(("error", self.worker_id, self.camera_id, "Failed to open stream"))
+                        self.capture.release()
+                        self.capture = None
+                        time.sleep(2.0)
+                        continue
+                
+                # Throttle capture to desired FPS
+                current_time = time.time()
+                wait = frame_interval - (current_time - last_capture_time)
+                if wait > 0:
+                    time.sleep(wait)
+                    continue
+                
+                # Decode straight into the next shared slot
+                index, buffer = self.slots.begin_write() if self.slots else (None, None)
+                if buffer is not None:
+                    ret, frame = self.capture.read(buffer)
+                else:
+                    ret, frame = self.capture.read()
+                
+                if not ret or frame is None:
+                    consecutive_errors += 1
+                    if consecutive_errors > 30:
+                        self.status_queue.put(("error", self.worker_id, self.camera_id, "Too many read failures, reconnecting"))
+                        self.capture.release()
+                        self.capture = None
+                        consecutive_errors = 0
+                    time.sleep(0.1)
+                    continue
+                
+                consecutive_errors = 0
+                
+                # First frame or a resolution change
+                if buffer is None or frame.shape != self.slots.shape or frame.ctypes.data != buffer.ctypes.data:
+                    if self.slots is None or frame.shape != self.slots.shape:
+                        self._allocate(frame.shape)
+                    index, buffer = self.slots.begin_write()
+                    np.copyto(buffer, frame)
+                
+                self.slots.commit(index, time.time())
+                self.frames += 1
+                last_capture_time = current_time
+            
+            except Exception as e:
+                self.status_queue.put(("error", self.worker_id, self.camera_id, str(e)))
+                time.sleep(0.5)
+
+def _capture_worker_main(worker_id: int, command_queue, status_queue, num_slots: int):
+    """Entry point of a capture worker process"""
+    # The parent process owns shutdown
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    cameras: Dict[int, _WorkerCamera] = {}
+    last_heartbeat = 0
+    running = True
+    
+    while running:
+        try:
+            command = command_queue.get(timeout=0.5)
+        except queue.Empty:
+            command = None
+        
+        if command:
+            action = command[0]
+            if action == "add":
+                camera_id, rtsp_url, fps = command[1:]
+                if camera_id in cameras:
+                    cameras.pop(camera_id).stop()
+                camera = _WorkerCamera(worker_id, camera_id, rtsp_url, fps, num_slots, status_queue)
+                cameras[camera_id] = camera
+                camera.start()
+            elif action == "remove":
+                camera_id = command[1]
+                if camera_id in cameras:
+                    cameras.pop(camera_id).stop()
+            elif action == "stop":
+                running = False
+        
+        current_time = time.time()
+        if current_time - last_heartbeat >= 1.0:
+            status_queue.put((
+                "heartbeat", worker_id, current_time,
+                {camera_id: camera.frames for camera_id, camera in cameras.items()}
+            ))
+            last_heartbeat = current_time
+    
+    for camera in cameras.values():
+        camera.stop()
+
+class SharedMemoryCapture:
+    """
+    cv2.VideoCapture-compatible reader for frames published by a capture worker.
+    Lets StreamProcessor's capture thread run unchanged on top of a worker.
+    """
+    def __init__(self, pool: "CaptureWorkerPool", camera_id: int, fps: int, read_timeout: float = 2.0):
+        self.pool = pool
+        self.camera_id = camera_id
+        self.fps = fps
+        self.read_timeout = read_timeout
+        self._released = False
+        self._slots = None
+        self._last_seq = -1
+    
+    def isOpened(self) -> bool:
+        return not self._released and self.pool.has_camera(self.camera_id)
+    
+    def _wait_for_frame(self) -> Optional[SharedFrameSlots]:
+        """Wait until a frame newer than the last one read is published"""
+        deadline = time.time() + self.read_timeout
+        while not self._released and time.time() < deadline:
+            slots = self.pool.get_slots(self.camera_id)
+            if slots is not None:
+                # The worker restarted or the resolution changed
+                if slots is not self._slots:
+                    self._slots = slots
+                    self._last_seq = -1
+                try:
+                    if slots.latest_seq() > self._last_seq:
+                        return slots
+                except TypeError:
+                    # Block was retired while we were looking at it
+                    continue
+            time.sleep(0.005)
+        return None
+    
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        slots = self._wait_for_frame()
+        if slots is None:
+            return False, None
+        
+        if image is None or image.shape != slots.shape or image.dtype != np.uint8:
+            image = np.empty(slots.shape, dtype=np.uint8)
+        
+        try:
+            result = slots.read_latest(image)
+        except TypeError:
+            return False, None
+        if result is None:
+            return False, None
+        
+        self._last_seq = result[0]
+        return True, image
+    
+    def grab(self) -> bool:
+        slots = self._wait_for_frame()
+        if slots is None:
+            return False
+        self._last_seq = slots.latest_seq()
+        return True
+    
+    def get(self, prop_id: int) -> float:
+        slots = self.pool.get_slots(self.camera_id)
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if slots is not None and prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(slots.shape[1])
+        if slots is not None and prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(slots.shape[0])
+        return 0.0
+    
+    def set(self, prop_id: int, value: float) -> bool:
+        return False
+    
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.pool.release_camera(self.camera_id)
+
+class CaptureWorkerPool:
+    """
+    Runs camera capture and decoding in worker processes, so decoding
+    scales with cores instead of sharing the API process's GIL.
+    
+    Cameras are packed onto workers up to cameras_per_worker each. Frames
+    come back through shared memory. A supervisor restarts workers that
+    die or stop sending heartbeats.
+    """
+    def __init__(
+        self,
+        cameras_per_worker: int = settings.CAMERAS_PER_WORKER,
+        heartbeat_timeout: float = settings.CAPTURE_WORKER_HEARTBEAT_TIMEOUT,
+        num_slots: int = settings.FRAME_RING_SLOTS
+    ):
+        self.cameras_per_worker = max(1, cameras_per_worker)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.num_slots = max(3, num_slots)
+        
+        # Spawn, not fork: the API process runs threads and an event loop
+        self._context = multiprocessing.get_context("spawn")
+        self._status_queue = self._context.Queue()
+        
+        self._lock = threading.Lock()
+        self.workers: Dict[int, Dict[str, Any]] = {}
+        self._camera_workers: Dict[int, int] = {}
+        self._camera_sources: Dict[int, Tuple[str, int]] = {}
+        self._slots: Dict[int, SharedFrameSlots] = {}
+        self._retired: List[SharedFrameSlots] = []
+        self._next_worker_id = 0
+        
+        self.running = False
+        self._listener_thread = None
+        self._supervisor_task = None
+    
+    async def start(self):
+        """Start the status listener and the supervisor"""
+        if self.running:
+            return
+        self.running = True
+        
+        self._listener_thread = threading.Thread(
+            target=self._listen_status, daemon=True, name="capture_worker_status"
+        )
+        self._listener_thread.start()
+        self._supervisor_task = asyncio.create_task(self._supervise())
+        logger.info(f"Capture worker pool started ({self.cameras_per_worker} cameras per worker)")
+    
+    async def shutdown(self):
+        """Stop all workers and release shared memory"""
+        self.running = False
+        
+        if self._supervisor_task:
+            self._supervisor_task.cancel()
+            try:
+                await self._supervisor_task
+            except asyncio.CancelledError:
+                pass
+        
+        with self._lock:
+            workers = list(self.workers.values())
+            self.workers.clear()
+            self._camera_workers.clear()
+            self._camera_sources.clear()
+        
+        reapers = [self._stop_worker(worker) for worker in workers]
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: [reaper.join() for reaper in reapers]
+        )
+        
+        with self._lock:
+            for slots in list(self._slots.values()) + self._retired:
+                slots.close()
+            self._slots.clear()
+            self._retired.clear()
+        
+        logger.info("Capture worker pool shut down")
+    
+    def open_capture(self, camera_id: int, rtsp_url: str, fps: int) -> SharedMemoryCapture:
+        """
+        Assign a camera to a worker and return a capture object reading its frames
+        
+        Args:
+            camera_id: ID of the camera
+            rtsp_url: Stream URL for the worker to open
+            fps: Capture rate
+        """
+        with self._lock:
+            if camera_id in self._camera_workers:
+                worker = self.workers.get(self._camera_workers[camera_id])
+                if worker:
+                    worker["cameras"].discard(camera_id)
+                    worker["command_queue"].put(("remove", camera_id))
+            
+            worker = self._pick_worker()
+            worker["cameras"].add(camera_id)
+            self._camera_workers[camera_id] = worker["worker_id"]
+            self._camera_sources[camera_id] = (rtsp_url, fps)
+            worker["command_queue"].put(("add", camera_id, rtsp_url, fps))
+        
+        logger.info(f"Camera {camera_id} assigned to capture worker {worker['worker_id']}")
+        return SharedMemoryCapture(self, camera_id, fps)
+    
+    def release_camera(self, camera_id: int):
+        """Remove a camera from its worker, stopping the worker if it is now idle"""
+        idle_worker = None
+        with self._lock:
+            worker_id = self._camera_workers.pop(camera_id, None)
+            self._camera_sources.pop(camera_id, None)
+            self._retire_slots(camera_id)
+            
+            worker = self.workers.get(worker_id) if worker_id is not None else None
+            if worker:
+                worker["cameras"].discard(camera_id)
+                worker["command_queue"].put(("remove", camera_id))
+                if not worker["cameras"]:
+                    idle_worker = self.workers.pop(worker_id)
+        
+        if idle_worker:
+            self._stop_worker(idle_worker)
+    
+    def has_camera(self, camera_id: int) -> bool:
+        return camera_id in self._camera_workers
+    
+    def get_slots(self, camera_id: int) -> Optional[SharedFrameSlots]:
+        return self._slots.get(camera_id)
+    
+    def _pick_worker(self) -> Dict[str, Any]:
+        """Find a worker with spare capacity or spawn a new one (lock must be held)"""
+        for worker in self.workers.values():
+            if len(worker["cameras"]) < self.cameras_per_worker:
+                return worker
+        
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        worker = self._spawn_worker(worker_id)
+        self.workers[worker_id] = worker
+        return worker
+    
+    def _spawn_worker(self, worker_id: int, cameras: Optional[set] = None, restarts: int = 0) -> Dict[str, Any]:
+        """Start a worker process"""
+        command_queue = self._context.Queue()
+        process = self._context.Process(
+            target=_capture_worker_main,
+            args=(worker_id, command_queue, self._status_queue, self.num_slots),
+            daemon=True,
+            name=f"capture_worker_{worker_id}"
+        )
+        process.start()
+        logger.info(f"Started capture worker {worker_id} (pid {process.pid})")
+        
+        return {
+            "worker_id": worker_id,
+            "process": process,
+            "command_queue": command_queue,
+            "cameras": set(cameras or ()),
+            "last_heartbeat": time.time(),
+            "frames": {},
+            "restarts": restarts,
+            "errors": 0
+        }
+    
+    def _stop_worker(self, worker: Dict[str, Any], graceful: bool = True) -> threading.Thread:
+        """
+        Stop a worker from a reaper thread, so callers (and the event loop) never wait on join
+        
+        Args:
+            worker: Worker to stop
+            graceful: Ask the worker to stop first; otherwise it was already killed and is only reaped
+        
+        Returns:
+            The reaper thread
+        """
+        reaper = threading.Thread(
+            target=self._reap_worker, args=(worker, graceful), daemon=True,
+            name=f"capture_worker_{worker['worker_id']}_reaper"
+        )
+        reaper.start()
+        return reaper
+    
+    def _reap_worker(self, worker: Dict[str, Any], graceful: bool):
+        """Ask a worker to stop, killing it if it does not exit, and wait for it"""
+        process = worker["process"]
+        try:
+            if graceful:
+                worker["command_queue"].put(("stop",))
+                process.join(timeout=3.0)
+                if process.is_alive():
+                    process.terminate()
+                    process.join(timeout=2.0)
+            if process.is_alive():
+                process.kill()
+            process.join(timeout=2.0)
+        except Exception as e:
+            logger.error(f"Error stopping capture worker {worker['worker_id']}: {str(e)}")
+    
+    def _restart_worker(self, worker_id: int, reason: str):
+        """Replace a dead or hung worker and re-assign its cameras"""
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                return
+            
+            logger.error(f"Restarting capture worker {worker_id}: {reason}")
+            process = worker["process"]
+            if process.is_alive():
+                process.kill()
+            self._stop_worker(worker, graceful=False)
+            
+            # A killed worker never unlinks its blocks
+            for camera_id in worker["cameras"]:
+                self._retire_slots(camera_id, unlink=True)
+            
+            new_worker = self._spawn_worker(worker_id, worker["cameras"], worker["restarts"] + 1)
+            self.workers[worker_id] = new_worker
+            
+            for camera_id in new_worker["cameras"]:
+                rtsp_url, fps = self._camera_sources[camera_id]
+                new_worker["command_queue"].put(("add", camera_id, rtsp_url, fps))
+    
+    def _retire_slots(self, camera_id: int, unlink: bool = False):
+        """
+        Stop handing out a camera's block and close it when no longer in use (lock must be held)
+        
+        Args:
+            camera_id: ID of the camera
+            unlink: Also remove the block, for blocks whose writer was killed
+        """
+        slots = self._slots.pop(camera_id, None)
+        if slots is not None and unlink:
+            slots.unlink()
+        if slots is not None and not slots.close():
+            self._retired.append(slots)
+        
+        # Retry mappings that were busy last time
+        self._retired = [old for old in self._retired if not old.close()]
+    
+    def _listen_status(self):
+        """Thread that consumes worker status messages"""
+        while self.running:
+            try:
+                message = self._status_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            
+            try:
+                kind, worker_id = message[0], message[1]
+                
+                if kind == "heartbeat":
+                    with self._lock:
+                        worker = self.workers.get(worker_id)
+                        if worker:
+                            worker["last_heartbeat"] = message[2]
+                            worker["frames"] = message[3]
+                
+                elif kind == "attached":
+                    _, _, camera_id, name, shape, num_slots, pid = message
+                    with self._lock:
+                        worker = self.workers.get(worker_id)
+                        if worker is not None and worker["process"].pid != pid:
+                            # Announced by a worker that was killed since; nobody else will unlink it
+                            stale = SharedFrameSlots.attach(name, tuple(shape), num_slots)
+                            stale.unlink()
+                            stale.close()
+                            continue
+                        if self._camera_workers.get(camera_id) != worker_id:
+                            continue
+                        slots = SharedFrameSlots.attach(name, tuple(shape), num_slots)
+                        self._retire_slots(camera_id)
+                        self._slots[camera_id] = slots
+                    logger.info(f"Camera {camera_id} frames available from worker {worker_id}: {shape}")
+                
+                elif kind == "error":
+                    _, _, camera_id, error = message
+                    with self._lock:
+                        worker = self.workers.get(worker_id)
+                        if worker:
+                            worker["errors"] += 1
+                    logger.warning(f"Capture worker {worker_id} camera {camera_id}: {error}")
+            
+            except FileNotFoundError:
+                # The block was already replaced by a newer one
+                continue
+            except Exception as e:
+                logger.exception(f"Error handling capture worker status: {str(e)}")
+    
+    async def _supervise(self):
+        """Restart workers that exited or stopped sending heartbeats"""
+        while self.running:
+            try:
+                current_time = time.time()
+                for worker_id, worker in list(self.workers.items()):
+                    if not worker["process"].is_alive():
+                        self._restart_worker(worker_id, f"process exited with code {worker['process'].exitcode}")
+                    elif current_time - worker["last_heartbeat"] > self.heartbeat_timeout:
+                        self._restart_worker(worker_id, "heartbeat timed out")
+            except Exception as e:
+                logger.exception(f"Error supervising capture workers: {str(e)}")
+            
+            await asyncio.sleep(2.0)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get worker pool statistics"""
+        with self._lock:
+            return {
+                "cameras_per_worker": self.cameras_per_worker,
+                "workers": [
+                    {
+                        "worker_id": worker["worker_id"],
+                        "pid": worker["process"].pid,
+                        "alive": worker["process"].is_alive(),
+                        "cameras": sorted(worker["cameras"]),
+                        "frames": worker["frames"],
+                        "restarts": worker["restarts"],
+                        "errors": worker["errors"],
+                        "last_heartbeat": worker["last_heartbeat"]
+                    }
+                    for worker in self.workers.values()
+                ]
+            }
\ No newline at end of file
@@ -0,0 +1,190 @@
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class FaceGallery:
+    """
+    Known face encodings held as one contiguous float32 matrix.
+    
+    Rows are matched against all faces of a frame in a single vectorized
+    distance computation. Persons are added, replaced and removed in place
+    (removal swaps the last row into the freed slot), so the matrix never
+    has to be rebuilt from scratch.
+    """
+    def __init__(self, dim: int = 128, initial_capacity: int = 256):
+        self.dim = dim
+        self._lock = threading.RLock()
+        
+        capacity = max(1, initial_capacity)
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._rows: Dict[int, int] = {}  # {person_id: row}
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __contains__(self, person_id: int) -> bool:
+        return person_id in self._rows
+    
+    @property
+    def ids(self) -> np.ndarray:
+        """Person IDs in row order"""
+        with self._lock:
+            return self._ids[:self._size].copy()
+    
+    @property
+    def matrix(self) -> np.ndarray:
+        """Encodings in row order (copy)"""
+        with self._lock:
+            return self._matrix[:self._size].copy()
+    
+    def get(self, person_id: int) -> Optional[np.ndarray]:
+        """Get the stored encoding for a person"""
+        with self._lock:
+            row = self._rows.get(person_id)
+            if row is None:
+                return None
+            return self._matrix[row].copy()
+    
+    def upsert(self, person_id: int, encoding: np.ndarray):
+        """Add or replace a person's encoding"""
+        vector = np.asarray(encoding, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Expected a {self.dim}-d encoding, got {vector.shape[0]}")
+        
+        with self._lock:
+            row = self._rows.get(person_id)
+            if row is None:
+                if self._size == self._matrix.shape[0]:
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._rows[person_id] = row
+                self._ids[row] = person_id
+            
+            self._matrix[row] = vector
+            self._sq_norms[row] = float(np.dot(vector, vector))
+    
+    def remove(self, person_id: int) -> bool:
+        """
+        Remove a person's encoding
+        
+        Returns:
+            True if the person was in the gallery
+        """
+        with self._lock:
+            row = self._rows.pop(person_id, None)
+            if row is None:
+                return False
+            
+            last = self._size - 1
+            if row != last:
+                # Move the last row into the hole
+                moved_id = int(self._ids[last])
+                self._matrix[row] = self._matrix[last]
+                self._sq_norms[row] = self._sq_norms[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+            
+            self._size = last
+            return True
+    
+    def extend(self, person_ids: np.ndarray, encodings: np.ndarray):
+        """Add or replace many encodings at once"""
+        person_ids = np.asarray(person_ids, dtype=np.int64).reshape(-1)
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        
+        # An id repeated within the batch keeps only its last encoding
+        _, last = np.unique(person_ids[::-1], return_index=True)
+        if len(last) < len(person_ids):
+            keep = np.sort(len(person_ids) - 1 - last)
+            person_ids, encodings = person_ids[keep], encodings[keep]
+        
+        with self._lock:
+            # Existing persons are replaced in place
+            new_mask = np.array([int(pid) not in self._rows for pid in person_ids], dtype=bool)
+            for pid, encoding in zip(person_ids[~new_mask], encodings[~new_mask]):
+                self.upsert(int(pid), encoding)
+            
+            new_ids = person_ids[new_mask]
+            new_encodings = encodings[new_mask]
+            count = len(new_ids)
+            if count == 0:
+                return
+            
+            while self._size + count > self._matrix.shape[0]:
+                self._grow()
+            
+            start, end = self._size, self._size + count
+            self._matrix[start:end] = new_encodings
+            self._sq_norms[start:end] = np.einsum("ij,ij->i", new_encodings, new_encodings)
+            self._ids[start:end] = new_ids
+            for offset, pid in enumerate(new_ids.tolist()):
+                self._rows[pid] = start + offset
+            self._size = end
+    
+    def clear(self):
+        """Remove all encodings (capacity is kept)"""
+        with self._lock:
+            self._rows.clear()
+            self._size = 0
+    
+    def _grow(self):
+        """Double the capacity of the backing arrays (lock must be held)"""
+        capacity = self._matrix.shape[0] * 2
+        
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        
+        self._matrix, self._sq_norms, self._ids = matrix, sq_norms, ids
+        logger.debug(f"Face gallery capacity grown to {capacity}")
+    
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest known faces for each query encoding
+        
+        Args:
+            queries: Encodings as an (M, dim) array
+            k: Number of neighbours per query
+        
+        Returns:
+            Tuple of (person IDs, Euclidean distances), each (M, k) and sorted
+            by distance. Empty (M, 0) arrays if the gallery is empty.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        
+        with self._lock:
+            size = self._size
+            if size == 0 or queries.shape[0] == 0:
+                return (np.zeros((queries.shape[0], 0), dtype=np.int64),
+                        np.zeros((queries.shape[0], 0), dtype=np.float32))
+            
+            # ||q - g||^2 = ||q||^2 + ||g||^2 - 2 q.g
+            sq_distances = queries @ self._matrix[:size].T
+            sq_distances *= -2.0
+            sq_distances += self._sq_norms[:size]
+            sq_distances += np.einsum("ij,ij->i", queries, queries)[:, None]
+            ids = self._ids[:size]
+            
+            k = min(k, size)
+            if k < size:
+                nearest = np.argpartition(sq_distances, k - 1, axis=1)[:, :k]
+            else:
+                nearest = np.broadcast_to(np.arange(size), sq_distances.shape).copy()
+            
+            nearest_sq = np.take_along_axis(sq_distances, nearest, axis=1)
+            order = np.argsort(nearest_sq, axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            nearest_sq = np.take_along_axis(nearest_sq, order, axis=1)
+            
+            return ids[nearest], np.sqrt(np.maximum(nearest_sq, 0.0))
\ No newline at end of file
@@ -0,0 +1,322 @@
+import os
+import logging
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core.face_gallery import FaceGallery
+
+logger = logging.getLogger(__name__)
+
+class FaceIndex:
+    """
+    Nearest-neighbour index over known face encodings.
+    
+    Small galleries are searched exactly. Once the gallery reaches
+    min_train_size, encodings are clustered with k-means into nlist cells
+    (an inverted-file index), and each query only scans the nprobe cells
+    nearest to it. Raising nprobe trades latency for recall; nprobe >= nlist
+    is an exact search.
+    
+    Training is never done implicitly: needs_training tells the owner to run
+    train() off the event loop, and searches stay exact (or use the previous
+    cells) until it finishes.
+    """
+    def __init__(
+        self,
+        dim: int = 128,
+        use_ivf: bool = settings.FACE_INDEX_IVF,
+        min_train_size: int = settings.FACE_INDEX_MIN_TRAIN_SIZE,
+        nlist: int = settings.FACE_INDEX_NLIST,
+        nprobe: int = settings.FACE_INDEX_NPROBE
+    ):
+        self.dim = dim
+        self.use_ivf = use_ivf
+        self.min_train_size = max(1, min_train_size)
+        self.nlist = nlist  # 0 = sqrt(gallery size)
+        self.nprobe = max(1, nprobe)
+        self._lock = threading.RLock()
+        
+        # Exact storage until the index is trained
+        self._flat = FaceGallery(dim)
+        
+        # Inverted lists once trained
+        self._centroids: Optional[np.ndarray] = None
+        self._cells: List[FaceGallery] = []
+        self._cell_of: Dict[int, int] = {}  # {person_id: cell}
+        self._trained_size = 0
+    
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+    
+    @property
+    def needs_training(self) -> bool:
+        """Whether the gallery reached min_train_size, or grew 4x since the last training"""
+        with self._lock:
+            if not self.use_ivf:
+                return False
+            if not self.trained:
+                return len(self._flat) >= self.min_train_size
+            # Centroids drift from the data as the gallery grows
+            return len(self._cell_of) > 4 * self._trained_size
+    
+    def __len__(self) -> int:
+        if self.trained:
+            return len(self._cell_of)
+        return len(self._flat)
+    
+    def __contains__(self, person_id: int) -> bool:
+        if self.trained:
+            return person_id in self._cell_of
+        return person_id in self._flat
+    
+    @property
+    def ids(self) -> np.ndarray:
+        """All person IDs in the index"""
+        with self._lock:
+            if not self.trained:
+                return self._flat.ids
+            return np.array(list(self._cell_of.keys()), dtype=np.int64)
+    
+    def _all_encodings(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Collect (ids, encodings) from wherever they are stored (lock must be held)"""
+        if not self.trained:
+            return self._flat.ids, self._flat.matrix
+        if not self._cells:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.dim), dtype=np.float32)
+        return (np.concatenate([cell.ids for cell in self._cells]),
+                np.concatenate([cell.matrix for cell in self._cells]))
+    
+    def upsert(self, person_id: int, encoding: np.ndarray):
+        """Add or replace a person's encoding"""
+        with self._lock:
+            if not self.trained:
+                self._flat.upsert(person_id, encoding)
+                return
+            
+            vector = np.asarray(encoding, dtype=np.float32).reshape(1, -1)
+            cell = int(self._nearest_centroids(vector, 1)[0, 0])
+            old_cell = self._cell_of.get(person_id)
+            if old_cell is not None and old_cell != cell:
+                self._cells[old_cell].remove(person_id)
+            self._cells[cell].upsert(person_id, vector[0])
+            self._cell_of[person_id] = cell
+    
+    def remove(self, person_id: int) -> bool:
+        """
+        Remove a person's encoding
+        
+        Returns:
+            True if the person was in the index
+        """
+        with self._lock:
+            if not self.trained:
+                return self._flat.remove(person_id)
+            cell = self._cell_of.pop(person_id, None)
+            if cell is None:
+                return False
+            return self._cells[cell].remove(person_id)
+    
+    def clear(self):
+        """Remove all encodings and drop the trained cells"""
+        with self._lock:
+            self._flat.clear()
+            self._centroids = None
+            self._cells = []
+            self._cell_of = {}
+            self._trained_size = 0
+    
+    def train(self, iterations: int = 10):
+        """
+        Cluster the encodings into cells (k-means)
+        
+        K-means runs on a snapshot without holding the lock, so searches and
+        upserts go on meanwhile; the new cells are swapped in at the end with
+        every encoding present by then. Blocking: call it from a worker thread.
+        """
+        with self._lock:
+            ids, vectors = self._all_encodings()
+            size = len(ids)
+            if size == 0:
+                return
+            
+            nlist = self.nlist or int(np.sqrt(size))
+            nlist = int(min(max(1, nlist), size))
+            
+            start = time.time()
+            rng = np.random.default_rng(0)
+            
+            # Train on a sample; 64 points per cell is plenty for the centroids
+            sample_size = min(size, nlist * 64)
+            sample = vectors[rng.choice(size, sample_size, replace=False)]
+        
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = self._assign(sample, centroids)
+            for cell in range(nlist):
+                members = sample[assignment == cell]
+                if len(members):
+                    centroids[cell] = members.mean(axis=0)
+                else:
+                    # Re-seed empty cells
+                    centroids[cell] = sample[rng.integers(sample_size)]
+        
+        with self._lock:
+            # Include encodings added, changed or removed during training
+            ids, vectors = self._all_encodings()
+            self._centroids = centroids
+            self._build_cells(ids, vectors, self._assign(vectors, centroids))
+            self._flat = FaceGallery(self.dim)
+            self._trained_size = size
+        
+        logger.info(f"Trained face index: {size} encodings in {nlist} cells ({time.time() - start:.2f}s)")
+    
+    def _build_cells(self, ids: np.ndarray, vectors: np.ndarray, assignment: np.ndarray):
+        """Fill the inverted lists from an assignment (lock must be held)"""
+        self._cells = [FaceGallery(self.dim, initial_capacity=16) for _ in range(len(self._centroids))]
+        for cell in range(len(self._cells)):
+            members = assignment == cell
+            if np.any(members):
+                self._cells[cell].extend(ids[members], vectors[members])
+        self._cell_of = dict(zip(ids.tolist(), assignment.tolist()))
+    
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Index of the nearest centroid for each vector"""
+        sq_distances = -2.0 * (vectors @ centroids.T)
+        sq_distances += np.einsum("ij,ij->i", centroids, centroids)
+        return np.argmin(sq_distances, axis=1)
+    
+    def _nearest_centroids(self, queries: np.ndarray, count: int) -> np.ndarray:
+        """Indices of the count nearest centroids for each query"""
+        sq_distances = -2.0 * (queries @ self._centroids.T)
+        sq_distances += np.einsum("ij,ij->i", self._centroids, self._centroids)
+        count = min(count, len(self._centroids))
+        if count >= len(self._centroids):
+            return np.broadcast_to(np.arange(count), (len(queries), count))
+        return np.argpartition(sq_distances, count - 1, axis=1)[:, :count]
+    
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest known faces for each query encoding
+        
+        Args:
+            queries: Encodings as an (M, dim) array
+            k: Number of neighbours per query
+        
+        Returns:
+            Tuple of (person IDs, Euclidean distances), each (M, k) and sorted
+            by distance. Missing neighbours have ID -1 and distance inf.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        
+        with self._lock:
+            if not self.trained:
+                return self._flat.search(queries, k)
+            
+            result_ids = np.full((len(queries), k), -1, dtype=np.int64)
+            result_distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+            probes = self._nearest_centroids(queries, self.nprobe)
+            
+            for row, query in enumerate(queries):
+                candidate_ids = []
+                candidate_distances = []
+                for cell in probes[row]:
+                    ids, distances = self._cells[cell].search(query[None, :], k)
+                    candidate_ids.append(ids[0])
+                    candidate_distances.append(distances[0])
+                
+                ids = np.concatenate(candidate_ids)
+                distances = np.concatenate(candidate_distances)
+                best = np.argsort(distances)[:k]
+                result_ids[row, :len(best)] = ids[best]
+                result_distances[row, :len(best)] = distances[best]
+            
+            return result_ids, result_distances
+    
+    def save(self, path: str, saved_at: Optional[float] = None):
+        """
+        Write the index to disk (atomically)
+        
+        Args:
+            path: Destination file
+            saved_at: Time the contents are current as of (defaults to now)
+        """
+        with self._lock:
+            ids, vectors = self._all_encodings()
+            centroids = self._centroids if self.trained else np.zeros((0, self.dim), dtype=np.float32)
+            trained_size = self._trained_size
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                ids=ids,
+                vectors=vectors,
+                centroids=centroids,
+                trained_size=np.int64(trained_size),
+                saved_at=np.float64(time.time() if saved_at is None else saved_at)
+            )
+        os.replace(temp_path, path)
+    
+    def load(self, path: str) -> Optional[float]:
+        """
+        Replace the contents of the index with a saved copy
+        
+        Returns:
+            Time the copy was saved, or None if there is no usable file
+        """
+        if not os.path.exists(path):
+            return None
+        
+        try:
+            with np.load(path) as data:
+                ids = data["ids"]
+                vectors = data["vectors"].astype(np.float32, copy=False)
+                centroids = data["centroids"].astype(np.float32, copy=False)
+                trained_size = int(data["trained_size"])
+                saved_at = float(data["saved_at"])
+        except Exception as e:
+            logger.error(f"Failed to load face index from {path}: {str(e)}")
+            return None
+        
+        if vectors.shape[1:] != (self.dim,):
+            logger.error(f"Face index at {path} has wrong dimension {vectors.shape}")
+            return None
+        
+        with self._lock:
+            self.clear()
+            if len(centroids) and self.use_ivf:
+                # Keep the trained cells; no k-means on startup
+                self._centroids = centroids
+                self._build_cells(ids, vectors, self._assign(vectors, centroids))
+                self._trained_size = trained_size
+            else:
+                # Trained later if needs_training says so
+                self._flat.extend(ids, vectors)
+        
+        logger.info(f"Loaded face index with {len(ids)} encodings from {path}")
+        return saved_at
+    
+    def set_nprobe(self, nprobe: int):
+        """Update the recall/latency knob"""
+        self.nprobe = max(1, int(nprobe))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics"""
+        with self._lock:
+            return {
+                "size": len(self),
+                "trained": self.trained,
+                "nlist": len(self._centroids) if self.trained else 0,
+                "nprobe": self.nprobe,
+                "trained_size": self._trained_size
+            }
\ No newline at end of file
@@ -5,12 +5,17 @@ import logging
 import asyncio
 import time
 import json
+import weakref
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional, Tuple
-from sqlalchemy import select, insert
+from sqlalchemy import select, update, func
 from app.config import settings
 from app.database import get_db
 from app.models.person import Person
-from app.models.event import Event, EventType
+from app.models.event import EventType
+from app.core.face_index import FaceIndex
+from app.core.face_tracker import FaceTrackCache
+from app.services.event_writer import get_event_writer
 
 logger = logging.getLogger(__name__)
 
@@ -22,20 +27,73 @@ except ImportError:
     FACE_RECOGNITION_AVAILABLE = False
     logger.warning("face_recognition library not available, using OpenCV for face detection")
 
+# Live recognizers, so registrations and deletions reach every camera immediately
+_live_recognizers: "weakref.WeakSet[FaceRecognizer]" = weakref.WeakSet()
+
+def encode_face_encoding(encoding: np.ndarray) -> bytes:
+    """Serialize a face encoding for the face_encoding_blob column"""
+    return np.asarray(encoding, dtype=np.float32).tobytes()
+
+def decode_face_encoding(blob: Optional[bytes], legacy: Any = None) -> Optional[np.ndarray]:
+    """Deserialize a face encoding from the blob, or from the legacy JSON column"""
+    if blob:
+        return np.frombuffer(blob, dtype=np.float32)
+    if legacy:
+        # Older rows hold a JSON string inside the JSON column
+        if isinstance(legacy, str):
+            legacy = json.loads(legacy)
+        return np.asarray(legacy, dtype=np.float32)
+    return None
+
+def publish_face(person_id: int, encoding: np.ndarray, details: Dict[str, Any]):
+    """Add or replace a person's face on all live recognizers"""
+    for recognizer in list(_live_recognizers):
+        recognizer._apply_face(person_id, encoding, details)
+
+def publish_person_details(person_id: int, details: Dict[str, Any]):
+    """Update a person's name and image path on all live recognizers"""
+    for recognizer in list(_live_recognizers):
+        if person_id in recognizer.person_details:
+            recognizer.person_details[person_id] = details
+
+def forget_person(person_id: int):
+    """Remove a person's face from all live recognizers"""
+    for recognizer in list(_live_recognizers):
+        recognizer.remove_person(person_id)
+
 class FaceRecognizer:
     """
     Handles face detection and recognition
     """
-    def __init__(self, threshold: float = 0.6):
+    def __init__(self, threshold: float = 0.6, index_path: Optional[str] = settings.FACE_INDEX_PATH):
         self.threshold = threshold
         self.face_cascade = None
-        self.face_embeddings = {}  # {person_id: face_encoding}
+        self.gallery = FaceIndex()  # Known face encodings
         self.person_details = {}   # {person_id: {"name": name, "image_path": image_path}}
         self.initialized = False
         self.last_db_load = 0
         
+        # Persisted index, so startup does not decode every encoding again
+        self.index_path = index_path
+        self.index_dirty = False
+        saved_at = self.gallery.load(index_path) if index_path else None
+        self._index_training: Optional[asyncio.Future] = None
+        
+        # Persons changed at or after the watermark are fetched on the next sync
+        self.sync_watermark: Optional[datetime] = None
+        if saved_at is not None:
+            # Timestamps come back from SQLite as naive UTC
+            self.sync_watermark = datetime.fromtimestamp(saved_at, timezone.utc).replace(tzinfo=None)
+        self.details_loaded = False
+        
+        # Per-camera face tracks; the version tells tracks when the gallery changed
+        self.track_caches: Dict[int, FaceTrackCache] = {}
+        self.gallery_version = 0
+        
         # Initialize the recognizer
         self._initialize()
+        _live_recognizers.add(self)
+        self._schedule_index_training()
     
     def _initialize(self):
         """Initialize face detection/recognition models"""
@@ -62,37 +120,127 @@ class FaceRecognizer:
             logger.exception(f"Failed to initialize face recognizer: {str(e)}")
     
     async def load_face_embeddings(self, force_reload: bool = False):
-        """Load face embeddings from the database"""
+        """
+        Sync face embeddings with the database
+        
+        Only persons changed since the last sync are fetched. Deletions are
+        detected by comparing the number of stored encodings with the gallery,
+        and only then by comparing IDs.
+        """
         # Only reload if it's been more than 60 seconds since last load or forced
         if not force_reload and time.time() - self.last_db_load < 60:
             return
         
         try:
             async for session in get_db():
-                query = select(Person)
+                full_sync = force_reload or self.sync_watermark is None
+                changed_at = func.coalesce(Person.updated_at, Person.created_at)
+                
+                # Names and image paths are cheap; fetch them all on the first sync
+                if full_sync or not self.details_loaded:
+                    result = await session.execute(
+                        select(Person.id, Person.name, Person.face_image_path)
+                    )
+                    self.person_details = {
+                        row.id: {"name": row.name, "image_path": row.face_image_path}
+                        for row in result
+                    }
+                    self.details_loaded = True
+                
+                query = select(
+                    Person.id,
+                    Person.name,
+                    Person.face_image_path,
+                    Person.face_encoding_blob,
+                    Person.face_encoding,
+                    changed_at.label("changed_at")
+                )
+                if not full_sync:
+                    # Overlap by a second; SQLite timestamps have second resolution
+                    query = query.where(changed_at >= self.sync_watermark - timedelta(seconds=1))
                 result = await session.execute(query)
-                persons = result.scalars().all()
                 
-                for person in persons:
-                    # Skip if no face encoding saved
-                    if not person.face_encoding:
+                watermark = self.sync_watermark
+                seen_ids = set()
+                legacy_encodings = {}
+                changed = 0
+                
+                for row in result:
+                    seen_ids.add(row.id)
+                    if row.changed_at is not None and (watermark is None or row.changed_at > watermark):
+                        watermark = row.changed_at
+                    
+                    face_encoding = decode_face_encoding(row.face_encoding_blob, row.face_encoding)
+                    if face_encoding is None:
+                        # No face saved (or it was cleared)
+                        self.remove_person(row.id)
                         continue
                     
-                    # Load the face encoding
-                    face_encoding = np.array(json.loads(person.face_encoding))
+                    if not row.face_encoding_blob:
+                        legacy_encodings[row.id] = face_encoding
                     
-                    # Store the encoding and person details
-                    self.face_embeddings[person.id] = face_encoding
-                    self.person_details[person.id] = {
-                        "name": person.name,
-                        "image_path": person.face_image_path
-                    }
+                    self._apply_face(row.id, face_encoding, {
+                        "name": row.name,
+                        "image_path": row.face_image_path
+                    })
+                    changed += 1
+                
+                # Drop persons that were deleted
+                if full_sync:
+                    deleted_ids = set(self.gallery.ids.tolist()) - seen_ids
+                else:
+                    deleted_ids = await self._find_deleted_persons(session)
+                for person_id in deleted_ids:
+                    self.remove_person(person_id)
+                
+                # Move legacy JSON encodings to the binary column once
+                for person_id, face_encoding in legacy_encodings.items():
+                    await session.execute(
+                        update(Person)
+                        .where(Person.id == person_id)
+                        .values(face_encoding_blob=encode_face_encoding(face_encoding), face_encoding=None)
+                    )
+                if legacy_encodings:
+                    await session.commit()
+                    logger.info(f"Converted {len(legacy_encodings)} face encodings to binary")
+                
+                self.sync_watermark = watermark
             
             self.last_db_load = time.time()
-            logger.info(f"Loaded {len(self.face_embeddings)} face embeddings from database")
+            await self.save_index()
+            if changed or deleted_ids:
+                logger.info(
+                    f"Synced face embeddings: {changed} changed, {len(deleted_ids)} removed, "
+                    f"{len(self.gallery)} total"
+                )
         except Exception as e:
             logger.exception(f"Error loading face embeddings: {str(e)}")
     
+    async def _find_deleted_persons(self, session) -> set:
+        """Find gallery entries whose person no longer has a stored encoding"""
+        stored = await session.scalar(
+            select(func.count()).select_from(Person).where(Person.face_encoding_blob.isnot(None))
+        )
+        if stored >= len(self.gallery):
+            return set()
+        
+        result = await session.execute(
+            select(Person.id).where(Person.face_encoding_blob.isnot(None))
+        )
+        return set(self.gallery.ids.tolist()) - set(result.scalars().all())
+    
+    def _apply_face(self, person_id: int, face_encoding: np.ndarray, details: Dict[str, Any]):
+        """Store a person's encoding and details in this recognizer"""
+        self.gallery.upsert(person_id, face_encoding)
+        self.person_details[person_id] = details
+        self.index_dirty = True
+        self.gallery_version += 1
+        self._schedule_index_training()
+        
+        # A replaced encoding invalidates identities found with the old one
+        for track_cache in self.track_caches.values():
+            track_cache.forget_person(person_id)
+    
     async def register_face(self, image: np.ndarray, person_id: int) -> bool:
         """
         Register a face for a person
@@ -143,15 +291,15 @@ class FaceRecognizer:
                     return False
                 
                 # Update face encoding
-                person.face_encoding = json.dumps(face_encoding.tolist())
+                person.face_encoding_blob = encode_face_encoding(face_encoding)
+                person.face_encoding = None
                 await session.commit()
                 
-                # Update local cache
-                self.face_embeddings[person_id] = face_encoding
-                self.person_details[person_id] = {
+                # Push to every live recognizer (including this one)
+                publish_face(person_id, face_encoding, {
                     "name": person.name,
                     "image_path": person.face_image_path
-                }
+                })
                 
                 logger.info(f"Registered face for person {person.name} (ID: {person_id})")
                 return True
@@ -179,7 +327,7 @@ class FaceRecognizer:
         await self.load_face_embeddings()
         
         # If we have no embeddings, just detect faces
-        if not self.face_embeddings:
+        if len(self.gallery) == 0:
             return await self._detect_faces(frame)
         
         try:
@@ -203,73 +351,108 @@ class FaceRecognizer:
         small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
         rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
         
-        # Get face locations and encodings
+        # Get face locations
         loop = asyncio.get_event_loop()
         face_locations = await loop.run_in_executor(
             None, face_recognition.face_locations, rgb_small_frame
         )
-        face_encodings = await loop.run_in_executor(
-            None, face_recognition.face_encodings, rgb_small_frame, face_locations
-        )
         
         # List to store results
         face_detections = []
         
-        # Loop through each face in the frame
-        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-            # Scale back up face locations since the frame was scaled to 1/4 size
-            scale = 4
-            scaled_location = (
-                left * scale,
-                top * scale,
-                right * scale,
-                bottom * scale
+        if not face_locations:
+            return face_detections
+        
+        # Scale back up face locations since the frame was scaled to 1/4 size
+        scale = 4
+        boxes = [
+            [left * scale, top * scale, right * scale, bottom * scale]
+            for (top, right, bottom, left) in face_locations
+        ]
+        
+        # Reuse identities of tracked faces; only new or uncertain tracks are encoded
+        track_cache = self._get_track_cache(camera_id)
+        if track_cache is not None:
+            tracked = track_cache.update(boxes, self.gallery_version)
+            encode_indices = [index for index, (_, needs_encoding) in enumerate(tracked) if needs_encoding]
+        else:
+            tracked = None
+            encode_indices = list(range(len(face_locations)))
+        
+        # Match the encoded faces against the whole gallery at once
+        matches = {}
+        if encode_indices:
+            face_encodings = await loop.run_in_executor(
+                None,
+                face_recognition.face_encodings,
+                rgb_small_frame,
+                [face_locations[index] for index in encode_indices]
             )
+            match_ids, match_distances = self.gallery.search(np.array(face_encodings), k=1)
             
-            # Check if this face matches any known face
-            best_match_id = None
-            best_match_distance = 1.0  # Lower is better, using distance not confidence
-            
-            for person_id, known_encoding in self.face_embeddings.items():
-                # Compute distance between this face and known faces
-                face_distances = face_recognition.face_distance([known_encoding], face_encoding)
-                distance = face_distances[0]
+            for row, index in enumerate(encode_indices):
+                person_id = None
+                # Convert distance to confidence (1.0 - distance)
+                confidence = 0.0
+                if match_ids.shape[1] > 0:
+                    confidence = 1.0 - float(match_distances[row, 0])
+                    person_id = int(match_ids[row, 0])
+                
+                # If confidence exceeds threshold, consider it a match
+                if confidence < self.threshold or person_id not in self.person_details:
+                    person_id = None
+                matches[index] = (person_id, confidence)
                 
-                # Update best match if this is better
-                if distance < best_match_distance:
-                    best_match_distance = distance
-                    best_match_id = person_id
+                if tracked is not None:
+                    person_name = self.person_details[person_id]["name"] if person_id is not None else "Unknown"
+                    track_cache.identify(tracked[index][0], person_id, person_name, confidence, self.gallery_version)
+        
+        # Loop through each face in the frame
+        for index, bbox in enumerate(boxes):
+            if index in matches:
+                person_id, confidence = matches[index]
+            else:
+                track = tracked[index][0]
+                person_id, confidence = track.person_id, track.match_confidence
             
-            # Convert distance to confidence (1.0 - distance)
-            confidence = 1.0 - best_match_distance
+            if person_id is None or person_id not in self.person_details:
+                continue
             
-            # If confidence exceeds threshold, consider it a match
-            if confidence >= self.threshold and best_match_id is not None:
-                person_name = self.person_details[best_match_id]["name"]
-                
-                # Add to results
-                face_detections.append({
-                    "bbox": [
-                        scaled_location[0],
-                        scaled_location[1],
-                        scaled_location[2],
-                        scaled_location[3]
-                    ],
-                    "person_id": best_match_id,
-                    "person_name": person_name,
-                    "confidence": confidence
-                })
-                
-                # Log face detection event if camera_id is provided
-                if camera_id is not None:
-                    asyncio.create_task(self._log_face_detection(
-                        camera_id=camera_id,
-                        person_id=best_match_id,
-                        confidence=confidence
-                    ))
+            person_name = self.person_details[person_id]["name"]
+            
+            # Add to results
+            face_detections.append({
+                "bbox": bbox,
+                "person_id": person_id,
+                "person_name": person_name,
+                "confidence": confidence
+            })
+            
+            # Log face detection event if camera_id is provided
+            if camera_id is not None:
+                await self._log_face_detection(
+                    camera_id=camera_id,
+                    person_id=person_id,
+                    confidence=confidence
+                )
         
         return face_detections
     
+    def _get_track_cache(self, camera_id: Optional[int]) -> Optional[FaceTrackCache]:
+        """Get the face track cache for a camera (None if tracking is off)"""
+        if camera_id is None or not settings.FACE_TRACKING:
+            return None
+        if camera_id not in self.track_caches:
+            self.track_caches[camera_id] = FaceTrackCache()
+        return self.track_caches[camera_id]
+    
+    def get_track_stats(self, camera_id: int) -> Dict[str, Any]:
+        """Get face tracking statistics for a camera"""
+        track_cache = self.track_caches.get(camera_id)
+        if track_cache is None:
+            return {"enabled": settings.FACE_TRACKING}
+        return {"enabled": settings.FACE_TRACKING, **track_cache.get_stats()}
+    
     async def _detect_faces(self, frame: np.ndarray) -> List[Dict[str, Any]]:
         """Detect faces using OpenCV Haar Cascade"""
         if self.face_cascade is None:
@@ -301,22 +484,76 @@ class FaceRecognizer:
         return face_detections
     
     async def _log_face_detection(self, camera_id: int, person_id: int, confidence: float):
-        """Log a face detection event in the database"""
+        """Queue a face detection event for the database"""
         try:
-            async for session in get_db():
-                # Create a new event for the face detection
-                await session.execute(
-                    insert(Event).values(
-                        event_type=EventType.FACE_DETECTED,
-                        camera_id=camera_id,
-                        person_id=person_id,
-                        confidence=confidence
-                    )
-                )
-                await session.commit()
+            event_writer = await get_event_writer()
+            await event_writer.write(
+                EventType.FACE_DETECTED,
+                camera_id=camera_id,
+                person_id=person_id,
+                confidence=confidence
+            )
         except Exception as e:
             logger.exception(f"Error logging face detection: {str(e)}")
     
+    def _schedule_index_training(self):
+        """Train the face index in an executor when it needs it, so k-means never blocks the event loop"""
+        if self._index_training is not None and not self._index_training.done():
+            return
+        if not self.gallery.needs_training:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not on the event loop; the next enrolment schedules it
+            return
+        self._index_training = loop.run_in_executor(None, self.gallery.train)
+        self._index_training.add_done_callback(self._index_trained)
+    
+    def _index_trained(self, future: asyncio.Future):
+        """Save the new cells with the next sync"""
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error(f"Error training face index: {str(future.exception())}")
+            return
+        self.index_dirty = True
+    
+    def remove_person(self, person_id: int) -> bool:
+        """
+        Remove a person from the known faces
+        
+        Returns:
+            True if the person was known
+        """
+        self.person_details.pop(person_id, None)
+        removed = self.gallery.remove(person_id)
+        if removed:
+            self.index_dirty = True
+            self.gallery_version += 1
+            for track_cache in self.track_caches.values():
+                track_cache.forget_person(person_id)
+        return removed
+    
+    async def save_index(self):
+        """Persist the face index if it changed since the last save"""
+        if not self.index_path or not self.index_dirty:
+            return
+        
+        try:
+            self.index_dirty = False
+            
+            # Record how current the contents are, so a restart resumes the sync from there
+            synced_at = 0.0
+            if self.sync_watermark is not None:
+                synced_at = self.sync_watermark.replace(tzinfo=timezone.utc).timestamp()
+            
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.gallery.save, self.index_path, synced_at)
+        except Exception as e:
+            self.index_dirty = True
+            logger.exception(f"Error saving face index: {str(e)}")
+    
     def set_threshold(self, threshold: float):
         """Update the face recognition threshold"""
         self.threshold = threshold
\ No newline at end of file
@@ -0,0 +1,175 @@
+import logging
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _iou(box_a: List[int], box_b: List[int]) -> float:
+    """Intersection over union of two [x1, y1, x2, y2] boxes"""
+    x1 = max(box_a[0], box_b[0])
+    y1 = max(box_a[1], box_b[1])
+    x2 = min(box_a[2], box_b[2])
+    y2 = min(box_a[3], box_b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    if intersection == 0:
+        return 0.0
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return intersection / float(area_a + area_b - intersection)
+
+def _centroid_distance(box_a: List[int], box_b: List[int]) -> float:
+    """Distance between box centres, relative to the size of box_a"""
+    ax, ay = (box_a[0] + box_a[2]) / 2, (box_a[1] + box_a[3]) / 2
+    bx, by = (box_b[0] + box_b[2]) / 2, (box_b[1] + box_b[3]) / 2
+    size = max(box_a[2] - box_a[0], box_a[3] - box_a[1], 1)
+    return ((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5 / size
+
+class FaceTrack:
+    """A face followed across frames, with the identity last found for it"""
+    def __init__(self, track_id: int, bbox: List[int]):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.person_id: Optional[int] = None
+        self.person_name = "Unknown"
+        self.match_confidence = 0.0   # Face match confidence from the last encoding
+        self.track_confidence = 0.0   # How much the cached identity is still trusted
+        self.frames_since_identified = 0
+        self.gallery_version = -1
+        self.missed = 0
+        self.identified = False
+
+class FaceTrackCache:
+    """
+    Associates faces across frames of one camera by IoU (or centroid distance)
+    so an identity found once can be reused.
+    
+    A track needs a fresh encoding when it is new, after reidentify_frames
+    frames, when its confidence has decayed below min_confidence, or when it
+    is unidentified and the gallery has changed since it was last encoded.
+    """
+    def __init__(
+        self,
+        iou_threshold: float = settings.FACE_TRACK_IOU_THRESHOLD,
+        reidentify_frames: int = settings.FACE_TRACK_REIDENTIFY_FRAMES,
+        min_confidence: float = settings.FACE_TRACK_MIN_CONFIDENCE,
+        max_missed: int = 5,
+        decay: float = 0.97
+    ):
+        self.iou_threshold = iou_threshold
+        self.reidentify_frames = max(1, reidentify_frames)
+        self.min_confidence = min_confidence
+        self.max_missed = max_missed
+        self.decay = decay
+        
+        self.tracks: Dict[int, FaceTrack] = {}
+        self.next_track_id = 0
+        
+        # Statistics
+        self.faces_seen = 0
+        self.encodings_run = 0
+        self.last_update = time.time()
+    
+    def update(self, boxes: List[List[int]], gallery_version: int) -> List[Tuple[FaceTrack, bool]]:
+        """
+        Associate this frame's face boxes with tracks
+        
+        Args:
+            boxes: Face boxes as [x1, y1, x2, y2]
+            gallery_version: Current version of the recognizer's gallery
+        
+        Returns:
+            (track, needs_encoding) for each box, in the same order
+        """
+        self.last_update = time.time()
+        
+        # Candidate pairs, best overlap first
+        candidates = []
+        for track_id, track in self.tracks.items():
+            for index, box in enumerate(boxes):
+                overlap = _iou(track.bbox, box)
+                if overlap >= self.iou_threshold:
+                    candidates.append((overlap, track_id, index))
+                elif _centroid_distance(track.bbox, box) < 0.5:
+                    # Fast motion: boxes barely overlap but the face is close by
+                    candidates.append((overlap * 0.5, track_id, index))
+        candidates.sort(reverse=True)
+        
+        assigned: Dict[int, FaceTrack] = {}
+        used_tracks = set()
+        for overlap, track_id, index in candidates:
+            if track_id in used_tracks or index in assigned:
+                continue
+            track = self.tracks[track_id]
+            track.bbox = boxes[index]
+            track.missed = 0
+            track.frames_since_identified += 1
+            # Weak associations erode trust in the cached identity faster
+            track.track_confidence *= self.decay * (0.5 + 0.5 * min(1.0, overlap / max(self.iou_threshold, 1e-6)))
+            assigned[index] = track
+            used_tracks.add(track_id)
+        
+        # Age out tracks that were not seen
+        for track_id in list(self.tracks.keys()):
+            if track_id not in used_tracks:
+                self.tracks[track_id].missed += 1
+                if self.tracks[track_id].missed > self.max_missed:
+                    del self.tracks[track_id]
+        
+        results = []
+        for index, box in enumerate(boxes):
+            track = assigned.get(index)
+            if track is None:
+                track = FaceTrack(self.next_track_id, box)
+                self.next_track_id += 1
+                self.tracks[track.track_id] = track
+            results.append((track, self._needs_encoding(track, gallery_version)))
+        
+        self.faces_seen += len(boxes)
+        return results
+    
+    def _needs_encoding(self, track: FaceTrack, gallery_version: int) -> bool:
+        if not track.identified:
+            return True
+        if track.frames_since_identified >= self.reidentify_frames:
+            return True
+        if track.track_confidence < self.min_confidence:
+            return True
+        # A new registration may now match an unknown face
+        return track.person_id is None and track.gallery_version != gallery_version
+    
+    def identify(
+        self,
+        track: FaceTrack,
+        person_id: Optional[int],
+        person_name: str,
+        match_confidence: float,
+        gallery_version: int
+    ):
+        """Record the result of encoding a track's face"""
+        track.person_id = person_id
+        track.person_name = person_name
+        track.match_confidence = match_confidence
+        track.track_confidence = 1.0
+        track.frames_since_identified = 0
+        track.gallery_version = gallery_version
+        track.identified = True
+        self.encodings_run += 1
+    
+    def forget_person(self, person_id: int):
+        """Drop a person's identity from all tracks so they are encoded again"""
+        for track in self.tracks.values():
+            if track.person_id == person_id:
+                track.identified = False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracking statistics"""
+        return {
+            "active_tracks": len(self.tracks),
+            "faces_seen": self.faces_seen,
+            "encodings_run": self.encodings_run,
+            "encoding_skip_ratio": (
+                1.0 - self.encodings_run / self.faces_seen if self.faces_seen else 0.0
+            )
+        }
\ No newline at end of file
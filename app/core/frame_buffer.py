@@ -0,0 +1,221 @@
+import logging
+import threading
+from typing import List, Optional, Tuple, Dict, Any
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class FrameRef:
+    """
+    Read-only handle to a frame held in a FrameRingBuffer slot.
+    The slot cannot be overwritten until the handle is released.
+    """
+    def __init__(
+        self,
+        ring: Optional["FrameRingBuffer"],
+        index: int,
+        generation: int,
+        seq: int,
+        timestamp: float,
+        frame: np.ndarray
+    ):
+        self._ring = ring
+        self._index = index
+        self._generation = generation
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+        self._released = False
+    
+    def release(self):
+        """Release the slot back to the ring (safe to call more than once)"""
+        if self._released:
+            return
+        self._released = True
+        if self._ring is not None:
+            self._ring.release(self._index, self._generation)
+    
+    def __enter__(self) -> "FrameRef":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+    
+    def __del__(self):
+        # Do not leak a slot if a consumer forgets to release
+        self.release()
+
+class FrameRingBuffer:
+    """
+    Preallocated ring of frame slots for one camera.
+    
+    The capture thread decodes directly into a free slot and commits it with
+    a sequence number. Consumers acquire read-only views by sequence number
+    (or the latest frame) and release them when done; referenced slots are
+    never handed out for writing.
+    """
+    def __init__(self, num_slots: int = settings.FRAME_RING_SLOTS):
+        self.num_slots = max(2, num_slots)
+        # Re-entrant so a FrameRef finalizer can never deadlock the ring
+        self._lock = threading.RLock()
+        
+        self._slots: List[Optional[np.ndarray]] = [None] * self.num_slots
+        self._seqs: List[int] = [-1] * self.num_slots
+        self._timestamps: List[float] = [0.0] * self.num_slots
+        self._refcounts: List[int] = [0] * self.num_slots
+        self._writing: List[bool] = [False] * self.num_slots
+        
+        self.shape: Optional[Tuple[int, ...]] = None
+        self.dtype = None
+        self._next_seq = 0
+        self._latest_index = -1
+        self._generation = 0
+        
+        # Statistics
+        self.frames_written = 0
+        self.frames_dropped = 0  # No free slot when a frame arrived
+    
+    @property
+    def allocated(self) -> bool:
+        """Whether frame slots have been allocated"""
+        return self.shape is not None
+    
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the most recently committed frame, -1 if none"""
+        with self._lock:
+            if self._latest_index < 0:
+                return -1
+            return self._seqs[self._latest_index]
+    
+    @property
+    def latest_timestamp(self) -> float:
+        """Capture timestamp of the most recently committed frame"""
+        with self._lock:
+            if self._latest_index < 0:
+                return 0.0
+            return self._timestamps[self._latest_index]
+    
+    def allocate(self, shape: Tuple[int, ...], dtype=np.uint8):
+        """
+        (Re)allocate all slots for a frame shape.
+        Outstanding references keep their old arrays alive until released.
+        """
+        with self._lock:
+            self._slots = [np.empty(shape, dtype=dtype) for _ in range(self.num_slots)]
+            self._seqs = [-1] * self.num_slots
+            self._timestamps = [0.0] * self.num_slots
+            self._refcounts = [0] * self.num_slots
+            self._writing = [False] * self.num_slots
+            self._latest_index = -1
+            self._generation += 1
+            self.shape = tuple(shape)
+            self.dtype = dtype
+        
+        logger.debug(f"Allocated {self.num_slots} frame slots of shape {shape}")
+    
+    def acquire_write_slot(self) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Reserve the oldest unreferenced slot for writing
+        
+        Returns:
+            Tuple of (slot index, writable array) or None if no slot is free
+        """
+        with self._lock:
+            if self.shape is None:
+                return None
+            
+            best_index = -1
+            for index in range(self.num_slots):
+                if (self._refcounts[index] > 0 or self._writing[index]
+                        or index == self._latest_index):
+                    continue
+                if best_index < 0 or self._seqs[index] < self._seqs[best_index]:
+                    best_index = index
+            
+            if best_index < 0:
+                self.frames_dropped += 1
+                return None
+            
+            self._writing[best_index] = True
+            # Invalidate the previous contents so readers cannot acquire them
+            self._seqs[best_index] = -1
+            return best_index, self._slots[best_index]
+    
+    def commit(self, index: int, timestamp: float) -> int:
+        """
+        Publish a written slot as the latest frame
+        
+        Returns:
+            Sequence number assigned to the frame
+        """
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._seqs[index] = seq
+            self._timestamps[index] = timestamp
+            self._writing[index] = False
+            self._latest_index = index
+            self.frames_written += 1
+            return seq
+    
+    def abort(self, index: int):
+        """Return a reserved slot without publishing it"""
+        with self._lock:
+            self._writing[index] = False
+    
+    def acquire(self, seq: int) -> Optional[FrameRef]:
+        """
+        Acquire a read-only view of a specific frame
+        
+        Returns:
+            FrameRef, or None if the frame has already been overwritten
+        """
+        with self._lock:
+            for index in range(self.num_slots):
+                if self._seqs[index] == seq and not self._writing[index]:
+                    return self._make_ref(index)
+            return None
+    
+    def acquire_latest(self) -> Optional[FrameRef]:
+        """Acquire a read-only view of the latest frame, or None if empty"""
+        with self._lock:
+            if self._latest_index < 0:
+                return None
+            return self._make_ref(self._latest_index)
+    
+    def release(self, index: int, generation: int):
+        """Drop one reference to a slot"""
+        with self._lock:
+            # References taken before a reallocation point at retired arrays
+            if generation != self._generation:
+                return
+            if self._refcounts[index] > 0:
+                self._refcounts[index] -= 1
+    
+    def clear(self):
+        """Forget all published frames (slots stay allocated)"""
+        with self._lock:
+            self._seqs = [-1] * self.num_slots
+            self._latest_index = -1
+    
+    def _make_ref(self, index: int) -> FrameRef:
+        """Create a reference to a slot (lock must be held)"""
+        self._refcounts[index] += 1
+        view = self._slots[index].view()
+        view.flags.writeable = False
+        return FrameRef(self, index, self._generation, self._seqs[index], self._timestamps[index], view)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get ring buffer statistics"""
+        with self._lock:
+            return {
+                "slots": self.num_slots,
+                "shape": list(self.shape) if self.shape else None,
+                "in_use": sum(1 for count in self._refcounts if count > 0),
+                "frames_written": self.frames_written,
+                "frames_dropped": self.frames_dropped
+            }
\ No newline at end of file
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class InferenceScheduler:
+    """
+    Collects frames from all stream processors that share one object detector
+    and runs them through the model as batches.
+    
+    Frames submitted within a short window are grouped into a single batch of
+    up to max_batch_size frames. Cameras are served round-robin, so a camera
+    with a backlog cannot starve the others out of a batch.
+    """
+    def __init__(
+        self,
+        detector,
+        max_batch_size: int = settings.INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms: int = settings.INFERENCE_MAX_WAIT_MS
+    ):
+        self.detector = detector
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        
+        # Pending requests per camera, in round-robin order
+        self._pending: "OrderedDict[int, Deque[Tuple[np.ndarray, asyncio.Future, float]]]" = OrderedDict()
+        self._pending_count = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        
+        # A single worker keeps forward passes on the shared model serialized
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        
+        # Statistics
+        self.batches_run = 0
+        self.frames_inferred = 0
+        self.last_batch_size = 0
+        self.avg_batch_size = 0.0
+        self.avg_batch_latency = 0.0
+        self.avg_queue_wait = 0.0
+    
+    async def start(self):
+        """Start the batching loop"""
+        if self.running:
+            return
+        
+        self._wakeup = asyncio.Event()
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Inference scheduler started (max batch {self.max_batch_size}, "
+            f"max wait {self.max_wait * 1000:.0f}ms)"
+        )
+    
+    async def stop(self):
+        """Stop the batching loop and fail any pending requests"""
+        self.running = False
+        
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        for queue in self._pending.values():
+            for _, future, _ in queue:
+                if not future.done():
+                    future.cancel()
+        self._pending.clear()
+        self._pending_count = 0
+        
+        self.executor.shutdown(wait=False)
+        logger.info("Inference scheduler stopped")
+    
+    async def detect_people(self, frame: np.ndarray, camera_id: int) -> List[Dict[str, Any]]:
+        """
+        Queue a frame for batched person detection and wait for its result
+        
+        Args:
+            frame: BGR image as numpy array
+            camera_id: ID of the camera that produced the frame
+        
+        Returns:
+            List of detections with bounding boxes and confidence scores
+        """
+        if not self.running:
+            return await self.detector.detect_people(frame)
+        
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        
+        if camera_id not in self._pending:
+            self._pending[camera_id] = deque()
+        self._pending[camera_id].append((frame, future, time.time()))
+        self._pending_count += 1
+        self._wakeup.set()
+        
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Pending requests are cancelled when the scheduler shuts down
+            if future.cancelled() and not self.running:
+                return []
+            raise
+    
+    async def _run(self):
+        """Main batching loop"""
+        loop = asyncio.get_event_loop()
+        
+        while self.running:
+            try:
+                # Sleep until at least one frame is pending
+                if self._pending_count == 0:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                
+                # Give other cameras a short window to join the batch
+                deadline = self._oldest_request_time() + self.max_wait
+                while self._pending_count < self.max_batch_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                
+                batch = self._take_batch()
+                if not batch:
+                    continue
+                
+                frames = [frame for _, frame, _, _ in batch]
+                batch_start = time.time()
+                
+                try:
+                    results = await loop.run_in_executor(
+                        self.executor, self.detector.detect_people_batch, frames
+                    )
+                except Exception as e:
+                    logger.exception(f"Error in batched person detection: {str(e)}")
+                    results = [[] for _ in frames]
+                
+                batch_latency = time.time() - batch_start
+                
+                for (_, _, future, _), detections in zip(batch, results):
+                    if not future.done():
+                        future.set_result(detections)
+                
+                self._update_stats(batch, batch_start, batch_latency)
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error in inference scheduler loop: {str(e)}")
+                await asyncio.sleep(0.1)
+    
+    def _oldest_request_time(self) -> float:
+        """Get the submit time of the oldest pending request"""
+        return min(queue[0][2] for queue in self._pending.values() if queue)
+    
+    def _take_batch(self) -> List[Tuple[int, np.ndarray, asyncio.Future, float]]:
+        """
+        Take up to max_batch_size requests, one per camera per round.
+        Cameras that were served move to the back of the order.
+        """
+        batch = []
+        
+        while len(batch) < self.max_batch_size and self._pending_count > 0:
+            for camera_id in list(self._pending.keys()):
+                if len(batch) >= self.max_batch_size:
+                    break
+                
+                queue = self._pending[camera_id]
+                frame, future, submitted = queue.popleft()
+                self._pending_count -= 1
+                
+                # Remove and re-append so this camera goes last next time
+                del self._pending[camera_id]
+                if queue:
+                    self._pending[camera_id] = queue
+                
+                if future.cancelled():
+                    continue
+                batch.append((camera_id, frame, future, submitted))
+        
+        return batch
+    
+    def _update_stats(self, batch, batch_start: float, batch_latency: float):
+        """Update running batch statistics"""
+        size = len(batch)
+        queue_wait = sum(batch_start - submitted for _, _, _, submitted in batch) / size
+        
+        self.batches_run += 1
+        self.frames_inferred += size
+        self.last_batch_size = size
+        
+        # Exponential moving averages
+        alpha = 0.1
+        self.avg_batch_size = (1 - alpha) * self.avg_batch_size + alpha * size
+        self.avg_batch_latency = (1 - alpha) * self.avg_batch_latency + alpha * batch_latency
+        self.avg_queue_wait = (1 - alpha) * self.avg_queue_wait + alpha * queue_wait
+    
+    def set_batching(self, max_batch_size: Optional[int] = None, max_wait_ms: Optional[int] = None):
+        """Update the batching knobs at runtime"""
+        if max_batch_size is not None:
+            self.max_batch_size = max(1, int(max_batch_size))
+        if max_wait_ms is not None:
+            self.max_wait = max(0, int(max_wait_ms)) / 1000.0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics"""
+        return {
+            "running": self.running,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": self._pending_count,
+            "batches_run": self.batches_run,
+            "frames_inferred": self.frames_inferred,
+            "last_batch_size": self.last_batch_size,
+            "avg_batch_size": self.avg_batch_size,
+            "avg_batch_latency": self.avg_batch_latency,
+            "avg_queue_wait": self.avg_queue_wait
+        }
\ No newline at end of file
@@ -0,0 +1,267 @@
+import logging
+import asyncio
+import subprocess
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# MPEG-TS packets are 188 bytes; relay whole packets
+TS_PACKET_SIZE = 188
+
+class IngestRelay:
+    """
+    Pulls one camera's stream once and re-serves it locally.
+    
+    A single FFmpeg process copies the camera's video (no decoding) into an
+    MPEG-TS byte stream, which is fanned out to every client of a local TCP
+    endpoint (local_url). The analytics capture (cv2.VideoCapture) and the
+    HLS/recording FFmpeg processes all read from that endpoint, so the camera
+    only ever sees one RTSP session. Each client has a bounded queue; a slow
+    client loses its oldest packets (decoders resync at the next keyframe)
+    instead of holding up the others.
+    
+    Any FFmpeg input works as a source, so a local file stands in for a
+    camera in tests (it is read in real time and looped).
+    
+    With ring_seconds > 0 the relay also keeps that much of the stream in a
+    memory ring of timestamped chunks, from which event clips are cut
+    without re-encoding.
+    """
+    def __init__(
+        self,
+        camera_id: int,
+        source_url: str,
+        client_queue_size: int = settings.INGEST_RELAY_CLIENT_QUEUE,
+        chunk_packets: int = 64,
+        ring_seconds: float = 0
+    ):
+        self.camera_id = camera_id
+        self.source_url = source_url
+        self.client_queue_size = max(1, client_queue_size)
+        self.chunk_size = TS_PACKET_SIZE * chunk_packets
+        self.ring_seconds = max(0.0, ring_seconds)
+        self._ring = deque()  # (arrival time, chunk), oldest first
+        self.ring_bytes = 0
+        
+        self.port: Optional[int] = None
+        self.running = False
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._task: Optional[asyncio.Task] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._clients: Set[asyncio.Queue] = set()
+        self._stderr_tail = deque(maxlen=20)
+        
+        # Statistics
+        self.bytes_in = 0
+        self.chunks_dropped = 0
+        self.restarts = 0
+        self.last_data_time = 0
+        self.clients_served = 0
+    
+    @property
+    def local_url(self) -> Optional[str]:
+        """URL consumers open instead of the camera URL"""
+        return f"tcp://127.0.0.1:{self.port}" if self.port else None
+    
+    async def start(self):
+        """Open the local endpoint and start pulling the source"""
+        if self.running:
+            return
+        self.running = True
+        self._server = await asyncio.start_server(self._handle_client, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Ingest relay for camera {self.camera_id} serving {self.local_url}")
+    
+    async def stop(self):
+        """Stop pulling and disconnect all clients"""
+        self.running = False
+        
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        await self._stop_process()
+        
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        
+        # Wake client writers so they close their sockets
+        for queue in list(self._clients):
+            self._offer(queue, b"")
+        self._clients.clear()
+        
+        logger.info(f"Ingest relay for camera {self.camera_id} stopped")
+    
+    def _command(self):
+        command = [settings.FFMPEG_PATH, '-loglevel', 'error', '-nostdin']
+        if self.source_url.startswith("rtsp://"):
+            command += ['-rtsp_transport', 'tcp']
+        elif "://" not in self.source_url:
+            # Local file stand-in: read at the native rate, forever
+            command += ['-re', '-stream_loop', '-1']
+        command += [
+            '-i', self.source_url,
+            '-map', '0:v:0',
+            '-c', 'copy',                 # Packets only; nothing is decoded here
+            '-an',
+            '-f', 'mpegts',
+            'pipe:1'
+        ]
+        return command
+    
+    async def _run(self):
+        """Pull loop; restarts FFmpeg with backoff when the source drops"""
+        backoff = 1.0
+        while self.running:
+            started = time.time()
+            try:
+                self._process = await asyncio.create_subprocess_exec(
+                    *self._command(),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE
+                )
+                stderr_task = asyncio.create_task(self._read_stderr(self._process.stderr))
+                
+                # Reads end anywhere; carry the partial packet over so only whole
+                # packets are queued, and dropping a chunk never cuts one in half
+                remainder = b""
+                while True:
+                    data = await self._process.stdout.read(self.chunk_size)
+                    if not data:
+                        break
+                    data = remainder + data
+                    whole = len(data) - len(data) % TS_PACKET_SIZE
+                    chunk, remainder = data[:whole], data[whole:]
+                    if not chunk:
+                        continue
+                    self.bytes_in += len(chunk)
+                    self.last_data_time = time.time()
+                    if self.ring_seconds:
+                        self._append_to_ring(self.last_data_time, chunk)
+                    for queue in list(self._clients):
+                        self._offer(queue, chunk)
+                
+                await self._process.wait()
+                await stderr_task
+                logger.warning(
+                    f"Ingest relay for camera {self.camera_id} lost its source "
+                    f"(exit {self._process.returncode}): {' | '.join(self._stderr_tail)}"
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error in ingest relay for camera {self.camera_id}: {str(e)}")
+            finally:
+                await self._stop_process()
+            
+            if not self.running:
+                break
+            
+            # Reset the backoff after a run that lasted a while
+            if time.time() - started > 30:
+                backoff = 1.0
+            self.restarts += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+    
+    def _append_to_ring(self, timestamp: float, chunk: bytes):
+        """Keep a chunk in the packet ring and drop chunks older than ring_seconds"""
+        self._ring.append((timestamp, chunk))
+        self.ring_bytes += len(chunk)
+        cutoff = timestamp - self.ring_seconds
+        while self._ring and self._ring[0][0] < cutoff:
+            self.ring_bytes -= len(self._ring.popleft()[1])
+    
+    def packets_between(self, start_time: float, end_time: float) -> bytes:
+        """
+        MPEG-TS bytes received between two times, from the packet ring
+        
+        The result may start mid-GOP; FFmpeg skips to the first keyframe
+        when remuxing it.
+        """
+        return b"".join(chunk for timestamp, chunk in self._ring if start_time <= timestamp <= end_time)
+    
+    async def _read_stderr(self, stream):
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+            self._stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+    
+    async def _stop_process(self):
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), 3)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        except ProcessLookupError:
+            pass
+    
+    def _offer(self, queue: asyncio.Queue, chunk: bytes):
+        """Queue a chunk for a client, dropping its oldest chunk when full"""
+        try:
+            queue.put_nowait(chunk)
+        except asyncio.QueueFull:
+            try:
+                queue.get_nowait()
+                self.chunks_dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+            queue.put_nowait(chunk)
+    
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Stream the relayed bytes to one local consumer"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.client_queue_size)
+        self._clients.add(queue)
+        self.clients_served += 1
+        logger.debug(f"Ingest relay for camera {self.camera_id}: client connected ({len(self._clients)} total)")
+        
+        try:
+            while self.running:
+                chunk = await queue.get()
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(queue)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get relay statistics"""
+        return {
+            "camera_id": self.camera_id,
+            "running": self.running,
+            "local_url": self.local_url,
+            "pid": self._process.pid if self._process else None,
+            "clients": len(self._clients),
+            "clients_served": self.clients_served,
+            "bytes_in": self.bytes_in,
+            "chunks_dropped": self.chunks_dropped,
+            "restarts": self.restarts,
+            "last_data_time": self.last_data_time,
+            "ring_seconds": self.ring_seconds,
+            "ring_bytes": self.ring_bytes
+        }
\ No newline at end of file
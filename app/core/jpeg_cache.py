@@ -0,0 +1,97 @@
+import logging
+import asyncio
+import uuid
+from functools import partial
+from typing import Dict, Any, Optional, Tuple, Hashable, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+class JpegCache:
+    """
+    JPEG encodings of one camera's latest frame, shared by every consumer.
+    
+    Entries are keyed by (frame key, quality, width), so each variant of a
+    frame is encoded at most once. Requests for a variant that is still being
+    encoded wait for the same result. All variants are dropped as soon as a
+    newer frame is requested.
+    
+    ETags include an epoch made per cache, because frame keys are counters
+    that restart whenever the camera's processor is recreated.
+    """
+    def __init__(self, camera_id: int):
+        self.camera_id = camera_id
+        self.epoch = uuid.uuid4().hex[:12]
+        self.frame_key: Optional[Hashable] = None
+        self._variants: Dict[Tuple[int, Optional[int]], asyncio.Task] = {}
+        
+        # Statistics
+        self.hits = 0
+        self.encodes = 0
+        self.not_modified = 0
+    
+    def etag(self, frame_key: Hashable, quality: int, width: Optional[int]) -> str:
+        """Entity tag for a variant of a frame"""
+        frame_token = "-".join(str(part) for part in frame_key)
+        return f'"{self.camera_id}-{self.epoch}-{frame_token}-q{quality}-w{width or 0}"'
+    
+    async def get(
+        self,
+        frame_key: Hashable,
+        quality: int,
+        width: Optional[int],
+        encode: Callable[[], Awaitable[bytes]]
+    ) -> Tuple[bytes, str]:
+        """
+        Get a variant of a frame, encoding it only if nobody has yet
+        
+        Args:
+            frame_key: Identifies the frame (changes whenever the frame does)
+            quality: JPEG quality
+            width: Output width, or None for the original size
+            encode: Coroutine function that produces the JPEG bytes
+        
+        Returns:
+            Tuple of (JPEG bytes, ETag)
+        """
+        if frame_key != self.frame_key:
+            self.frame_key = frame_key
+            self._variants = {}
+        
+        variant = (quality, width)
+        task = self._variants.get(variant)
+        
+        if task is not None:
+            self.hits += 1
+        else:
+            # The encode runs as its own task, so no requester owns it: a cancelled
+            # viewer (the first one included) never cancels the shared result
+            task = asyncio.create_task(encode())
+            self._variants[variant] = task
+            task.add_done_callback(partial(self._encode_done, self._variants, variant))
+            self.encodes += 1
+        
+        return await asyncio.shield(task), self.etag(frame_key, quality, width)
+    
+    @staticmethod
+    def _encode_done(variants: Dict, variant: Tuple[int, Optional[int]], task: asyncio.Task):
+        """Forget a failed encoding so the next request retries it"""
+        if not task.cancelled() and task.exception() is None:
+            return
+        if variants.get(variant) is task:
+            del variants[variant]
+    
+    def clear(self):
+        """Drop all cached variants"""
+        self.frame_key = None
+        self._variants = {}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        requests = self.hits + self.encodes
+        return {
+            "variants": len(self._variants),
+            "encodes": self.encodes,
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "hit_ratio": self.hits / requests if requests else 0.0
+        }
\ No newline at end of file
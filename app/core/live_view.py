@@ -0,0 +1,124 @@
+import logging
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MJPEG_BOUNDARY = "frame"
+
+def clamp_live_view_params(
+    fps: Optional[float] = None,
+    quality: Optional[int] = None
+) -> Tuple[float, int]:
+    """Apply the server-wide caps to a viewer's requested FPS and quality"""
+    max_fps = max(0.1, settings.MJPEG_MAX_FPS)
+    fps = max_fps if not fps else min(max(0.1, fps), max_fps)
+    quality = settings.MJPEG_QUALITY if not quality else quality
+    quality = int(min(max(10, quality), settings.MJPEG_MAX_QUALITY))
+    return fps, quality
+
+async def iter_jpeg_frames(
+    processor,
+    fps: float,
+    quality: int,
+    width: Optional[int] = None
+) -> AsyncIterator[Tuple[bytes, str]]:
+    """
+    Yield a camera's frames as JPEG for one live viewer
+    
+    Each frame is encoded once per (quality, width) variant through the
+    processor's JPEG cache, however many viewers ask for it. A viewer always
+    gets the newest frame when it is ready for one, so a slow viewer skips
+    frames instead of building up a backlog.
+    
+    Args:
+        processor: StreamProcessor of the camera
+        fps: Maximum frames per second for this viewer
+        quality: JPEG quality
+        width: Output width, or None for the original size
+    
+    Yields:
+        Tuple of (JPEG bytes, ETag)
+    """
+    interval = 1.0 / fps
+    last_seq = -1
+    last_etag = None
+    last_sent = 0.0
+    
+    processor.live_viewers += 1
+    try:
+        while processor.connected:
+            # Respect the viewer's frame rate cap
+            remaining = last_sent + interval - time.time()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            
+            # Processed frames wake the viewer; the timeout covers cameras that are not processing
+            last_seq = await processor.wait_for_processed_frame(last_seq, timeout=interval)
+            
+            snapshot = await processor.get_latest_jpeg(quality, width)
+            if snapshot is None or snapshot[1] == last_etag:
+                continue
+            
+            last_sent = time.time()
+            last_etag = snapshot[1]
+            yield snapshot
+    finally:
+        processor.live_viewers -= 1
+
+def compact_detections(results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce detection results to a small JSON-safe payload for live viewers
+    
+    Boxes become integer lists and confidences are rounded, so numpy scalars
+    never reach the JSON encoder.
+    """
+    def box(detection):
+        return [int(value) for value in detection.get("bbox", [])]
+    
+    def confidence(detection):
+        return round(float(detection.get("confidence", 0.0)), 3)
+    
+    payload = {
+        "people": [
+            {"bbox": box(person), "confidence": confidence(person)}
+            for person in results.get("people", [])
+        ],
+        "faces": [
+            {
+                "bbox": box(face),
+                "person_id": face.get("person_id"),
+                "person_name": face.get("person_name"),
+                "confidence": confidence(face)
+            }
+            for face in results.get("faces", [])
+        ],
+        "templates": [
+            {
+                "bbox": box(template),
+                "template_id": template.get("template_id"),
+                "template_name": template.get("template_name"),
+                "confidence": confidence(template)
+            }
+            for template in results.get("templates", [])
+        ]
+    }
+    
+    occupancy = results.get("occupancy")
+    if occupancy:
+        payload["occupancy"] = {
+            key: int(value) for key, value in occupancy.items() if isinstance(value, (int, float))
+        }
+    return payload
+
+def mjpeg_part(jpeg_bytes: bytes) -> bytes:
+    """Wrap a JPEG as one part of a multipart/x-mixed-replace stream"""
+    header = (
+        f"--{MJPEG_BOUNDARY}\r\n"
+        f"Content-Type: image/jpeg\r\n"
+        f"Content-Length: {len(jpeg_bytes)}\r\n\r\n"
+    ).encode()
+    return header + jpeg_bytes + b"\r\n"
\ No newline at end of file
@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+import logging
+import time
+from typing import Dict, Any, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class MotionGate:
+    """
+    Cheap per-camera activity check that decides whether a frame needs the
+    full AI pipeline.
+    
+    Frames are compared against a running-average background on a small
+    grayscale copy. A frame is active when the fraction of changed pixels
+    reaches the threshold. Inference is still forced every force_interval
+    seconds so slow changes are never missed entirely.
+    """
+    def __init__(
+        self,
+        threshold: float = settings.MOTION_THRESHOLD,
+        force_interval: float = settings.MOTION_FORCE_INTERVAL,
+        pixel_threshold: int = 25,
+        width: int = 160,
+        learning_rate: float = 0.05
+    ):
+        self.threshold = threshold
+        self.force_interval = force_interval
+        self.pixel_threshold = pixel_threshold
+        self.width = width
+        self.learning_rate = learning_rate
+        
+        self.background: Optional[np.ndarray] = None
+        self.last_inference_time = 0
+        
+        # State and statistics
+        self.motion = False
+        self.motion_score = 0.0
+        self.last_motion_time = 0
+        self.frames_checked = 0
+        self.frames_skipped = 0
+    
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        """Downscale, convert to grayscale and smooth a frame"""
+        height, width = frame.shape[:2]
+        target_height = max(1, int(height * self.width / max(1, width)))
+        small = cv2.resize(frame, (self.width, target_height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+    
+    def check(self, frame: np.ndarray) -> bool:
+        """
+        Update the background model with a frame
+        
+        Returns:
+            True if the frame should go through inference
+        """
+        current_time = time.time()
+        gray = self._prepare(frame)
+        self.frames_checked += 1
+        
+        if self.background is None or self.background.shape != gray.shape:
+            # First frame or a resolution change
+            self.background = gray.astype(np.float32)
+            self.motion = True
+            self.motion_score = 1.0
+        else:
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+            changed = np.count_nonzero(diff > self.pixel_threshold)
+            self.motion_score = changed / float(diff.size)
+            self.motion = self.motion_score >= self.threshold
+            cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+        
+        if self.motion:
+            self.last_motion_time = current_time
+        
+        if self.motion or current_time - self.last_inference_time >= self.force_interval:
+            self.last_inference_time = current_time
+            return True
+        
+        self.frames_skipped += 1
+        return False
+    
+    def reset(self):
+        """Forget the background so the next frame is treated as active"""
+        self.background = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get motion gate statistics"""
+        return {
+            "motion": self.motion,
+            "motion_score": self.motion_score,
+            "last_motion_time": self.last_motion_time,
+            "frames_checked": self.frames_checked,
+            "frames_skipped": self.frames_skipped,
+            "skip_ratio": self.frames_skipped / self.frames_checked if self.frames_checked else 0.0
+        }
\ No newline at end of file
@@ -3,6 +3,7 @@ import numpy as np
 import os
 import logging
 import asyncio
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 from app.config import settings
 
@@ -14,18 +15,167 @@ except ImportError:
     YOLO_AVAILABLE = False
     logging.warning("Ultralytics YOLO not available. Using OpenCV DNN for object detection.")
 
+# ONNX Runtime is optional (DETECTION_BACKEND=onnxruntime)
+try:
+    import onnxruntime as ort
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+def default_onnx_model_path(int8: bool = True) -> str:
+    """ONNX export of DETECTION_MODEL (INT8 quantized or FP32) in MODELS_DIR"""
+    stem = os.path.splitext(settings.DETECTION_MODEL)[0]
+    return os.path.join(settings.MODELS_DIR, f"{stem}_int8.onnx" if int8 else f"{stem}.onnx")
+
+def letterbox(frame: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize a frame into a size x size square, keeping its aspect ratio
+    
+    Returns:
+        Tuple of (padded image, scale, (pad_x, pad_y))
+    """
+    height, width = frame.shape[:2]
+    scale = min(size / width, size / height)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+    
+    resized = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    padded = cv2.copyMakeBorder(
+        resized, pad_y, size - new_height - pad_y, pad_x, size - new_width - pad_x,
+        cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+    return padded, scale, (pad_x, pad_y)
+
+def decode_yolov8_output(
+    output: np.ndarray,
+    class_id: int,
+    threshold: float,
+    nms_threshold: float,
+    scale: float = 1.0,
+    pad: Tuple[int, int] = (0, 0),
+    frame_size: Optional[Tuple[int, int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Decode one image's YOLOv8/YOLO11 ONNX output into detections of one class
+    
+    Args:
+        output: Array of shape (4 + classes, anchors) with cx, cy, w, h in input pixels
+        class_id: Class to keep
+        threshold: Minimum class score
+        nms_threshold: IoU above which overlapping boxes are suppressed
+        scale, pad: Letterbox transform to undo
+        frame_size: (width, height) to clip boxes to
+    
+    Returns:
+        Detections with bounding boxes in frame pixels
+    """
+    scores = output[4 + class_id]
+    keep = scores > threshold
+    if not np.any(keep):
+        return []
+    
+    cx, cy, w, h = output[:4, keep]
+    return _suppress_boxes(
+        (cx - w / 2 - pad[0]) / scale, (cy - h / 2 - pad[1]) / scale, w / scale, h / scale,
+        scores[keep], class_id, threshold, nms_threshold, frame_size
+    )
+
+def decode_darknet_output(
+    outputs: List[np.ndarray],
+    class_id: int,
+    threshold: float,
+    nms_threshold: float,
+    frame_size: Tuple[int, int]
+) -> List[Dict[str, Any]]:
+    """
+    Decode the YOLO layers of a darknet (YOLOv4) network into detections of one class
+    
+    Args:
+        outputs: One array per YOLO layer, shape (anchors, 5 + classes) with
+            normalized cx, cy, w, h, objectness and class scores
+        class_id: Class to keep
+        threshold: Minimum class score
+        nms_threshold: IoU above which overlapping boxes are suppressed
+        frame_size: (width, height) of the frame
+    
+    Returns:
+        Detections with bounding boxes in frame pixels
+    """
+    output = np.concatenate([layer.reshape(-1, layer.shape[-1]) for layer in outputs])
+    scores = output[:, 5 + class_id]
+    keep = scores > threshold
+    if not np.any(keep):
+        return []
+    
+    width, height = frame_size
+    cx, cy, w, h = output[keep, :4].T
+    return _suppress_boxes(
+        (cx - w / 2) * width, (cy - h / 2) * height, w * width, h * height,
+        scores[keep], class_id, threshold, nms_threshold, frame_size
+    )
+
+def _suppress_boxes(
+    x1: np.ndarray,
+    y1: np.ndarray,
+    widths: np.ndarray,
+    heights: np.ndarray,
+    scores: np.ndarray,
+    class_id: int,
+    threshold: float,
+    nms_threshold: float,
+    frame_size: Optional[Tuple[int, int]]
+) -> List[Dict[str, Any]]:
+    """Non-maximum suppression over candidate boxes, returned as detections"""
+    boxes = np.stack([x1, y1, widths, heights], axis=1)
+    indices = cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), threshold, nms_threshold)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    
+    xyxy = np.stack([x1, y1, x1 + widths, y1 + heights], axis=1)[indices]
+    if frame_size is not None:
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, frame_size[0])
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, frame_size[1])
+    
+    return [
+        {
+            "bbox": [int(value) for value in box],
+            "confidence": float(confidence),
+            "class_id": class_id,
+            "class_name": "person"
+        }
+        for box, confidence in zip(xyxy, scores[indices])
+    ]
+
 class ObjectDetector:
     """
     Handles person detection using YOLOv8 or other object detection models
     """
-    def __init__(self, model_path: Optional[str] = None, threshold: float = 0.5):
-        self.model_path = model_path or os.path.join(settings.MODELS_DIR, settings.DETECTION_MODEL)
+    def __init__(self, model_path: Optional[str] = None, threshold: float = 0.5, backend: Optional[str] = None):
+        self.backend = (backend or settings.DETECTION_BACKEND).lower()
+        if self.backend == "onnxruntime":
+            self.model_path = model_path or settings.ONNX_DETECTION_MODEL or default_onnx_model_path()
+        else:
+            self.model_path = model_path or os.path.join(settings.MODELS_DIR, settings.DETECTION_MODEL)
         self.threshold = threshold
+        self.nms_threshold = settings.DETECTION_NMS_THRESHOLD
         self.model = None
         self.initialized = False
         self.person_class_id = 0  # YOLO uses 0 for person class
+        
+        # ONNX Runtime session details
+        self.input_name = None
+        self.input_size = settings.ONNX_INPUT_SIZE
+        self.dynamic_batch = False
+        
+        # OpenCV DNN details; the net and its reused input buffers are not thread-safe
+        self.output_names = None
+        self.letterbox_input = True
+        self.dnn_layout = "yolov8"   # Or "darknet" (one output per YOLO layer)
+        self.dnn_batching = True     # Cleared if the model only accepts a batch of 1
+        self._input_blob = None
+        self._canvas = None
+        self._dnn_lock = threading.Lock()
 
         # Initialize the model
         self._initialize_model()
@@ -33,14 +183,23 @@ class ObjectDetector:
     def _initialize_model(self):
         """Initialize the object detection model"""
         try:
-            if YOLO_AVAILABLE:
+            if self.backend == "onnxruntime":
+                if ORT_AVAILABLE:
+                    self._initialize_onnxruntime()
+                    return
+                logger.warning("onnxruntime is not installed; falling back to the default backend")
+                self.model_path = os.path.join(settings.MODELS_DIR, settings.DETECTION_MODEL)
+            
+            if YOLO_AVAILABLE and self.backend != "opencv":
                 # Use YOLOv8 from ultralytics
                 logger.info(f"Loading YOLOv11 model from {self.model_path}")
                 self.model = YOLO(self.model_path)
+                self.backend = "ultralytics"
                 self.initialized = True
             else:
                 # Fallback to OpenCV DNN
                 logger.info("Using OpenCV DNN with YOLO model")
+                self.backend = "opencv"
                 self._initialize_opencv_dnn()
         except Exception as e:
             logger.exception(f"Failed to initialize object detection model: {str(e)}")
@@ -60,15 +219,53 @@ class ObjectDetector:
                         os.path.join(settings.MODELS_DIR, "yolov4.cfg"),
                         os.path.join(settings.MODELS_DIR, "yolov4.weights")
                     )
+                    # Darknet boxes are normalized to the (stretched) input
+                    self.input_size = 416
+                    self.letterbox_input = False
+                    self.dnn_layout = "darknet"
+                    self.output_names = self.model.getUnconnectedOutLayersNames()
                     self.initialized = True
                     return
             
             # Load ONNX model with OpenCV
             self.model = cv2.dnn.readNetFromONNX(onnx_path)
+            self.output_names = self.model.getUnconnectedOutLayersNames()
             self.initialized = True
         except Exception as e:
             logger.exception(f"Failed to initialize OpenCV DNN model: {str(e)}")
     
+    def _initialize_onnxruntime(self):
+        """Initialize an ONNX Runtime CPU session (FP32 or INT8 quantized model)"""
+        if not os.path.exists(self.model_path):
+            fp32_path = default_onnx_model_path(int8=False)
+            logger.warning(f"ONNX model not found at {self.model_path}, trying {fp32_path}")
+            self.model_path = fp32_path
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = max(0, settings.ONNX_INTRA_OP_THREADS)
+        options.inter_op_num_threads = max(0, settings.ONNX_INTER_OP_THREADS)
+        options.execution_mode = (
+            ort.ExecutionMode.ORT_PARALLEL if settings.ONNX_INTER_OP_THREADS > 1
+            else ort.ExecutionMode.ORT_SEQUENTIAL
+        )
+        
+        self.model = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        
+        model_input = self.model.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, _ = model_input.shape
+        self.dynamic_batch = not isinstance(batch, int)
+        if isinstance(height, int):
+            self.input_size = height
+        
+        self.initialized = True
+        logger.info(
+            f"Loaded ONNX Runtime model {self.model_path} (input {self.input_size}, "
+            f"{'dynamic' if self.dynamic_batch else 'fixed'} batch, "
+            f"threads {settings.ONNX_INTRA_OP_THREADS}/{settings.ONNX_INTER_OP_THREADS})"
+        )
+    
     async def detect_people(self, frame: np.ndarray) -> List[Dict[str, Any]]:
         """
         Detect people in the frame
@@ -85,80 +282,166 @@ class ObjectDetector:
         
         loop = asyncio.get_event_loop()
         try:
-            if YOLO_AVAILABLE and isinstance(self.model, YOLO):
-                # Use YOLOv8 from ultralytics
-                results = await loop.run_in_executor(
-                    None, 
-                    lambda: self.model(frame, classes=[self.person_class_id], conf=self.threshold)
-                )
-                
-                detections = []
-                for result in results:
-                    boxes = result.boxes.cpu().numpy()
-                    for i, box in enumerate(boxes):
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        confidence = float(box.conf[0])
-                        detections.append({
-                            "bbox": [x1, y1, x2, y2],
-                            "confidence": confidence,
-                            "class_id": self.person_class_id,
-                            "class_name": "person"
-                        })
-                
-                return detections
-            
-            else:
-                # Use OpenCV DNN
-                return await self._detect_with_opencv_dnn(frame)
+            results = await loop.run_in_executor(None, self.detect_people_batch, [frame])
+            return results[0]
         
         except Exception as e:
             logger.exception(f"Error in person detection: {str(e)}")
             return []
     
-    async def _detect_with_opencv_dnn(self, frame: np.ndarray) -> List[Dict[str, Any]]:
-        """Use OpenCV DNN for object detection"""
-        height, width = frame.shape[:2]
+    def detect_people_batch(self, frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """
+        Detect people in several frames with a single model invocation.
+        This call blocks, so run it in an executor from async code.
         
-        # Create blob from image
-        blob = cv2.dnn.blobFromImage(
-            frame, 1/255.0, (416, 416), swapRB=True, crop=False
-        )
+        Args:
+            frames: List of BGR images as numpy arrays
         
-        # Set input and run forward pass
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, lambda: self.model.setInput(blob))
-        outputs = await loop.run_in_executor(None, self.model.forward)
-        
-        # Process the outputs
-        detections = []
-        for output in outputs:
-            for detection in output:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
-                
-                # Filter for person class (class 0) and confidence threshold
-                if class_id == self.person_class_id and confidence > self.threshold:
-                    # YOLO format is center_x, center_y, width, height
-                    center_x = int(detection[0] * width)
-                    center_y = int(detection[1] * height)
-                    w = int(detection[2] * width)
-                    h = int(detection[3] * height)
-                    
-                    # Rectangle coordinates
-                    x1 = max(0, int(center_x - w/2))
-                    y1 = max(0, int(center_y - h/2))
-                    x2 = min(width, int(center_x + w/2))
-                    y2 = min(height, int(center_y + h/2))
-                    
+        Returns:
+            One list of detections per input frame, in input order
+        """
+        if not frames:
+            return []
+        
+        if not self.initialized or self.model is None:
+            return [[] for _ in frames]
+        
+        if YOLO_AVAILABLE and isinstance(self.model, YOLO):
+            # Ultralytics accepts a list of images and runs them as one batch
+            results = self.model(
+                list(frames), classes=[self.person_class_id], conf=self.threshold, verbose=False
+            )
+            
+            batch_detections = []
+            for result in results:
+                detections = []
+                boxes = result.boxes.cpu().numpy()
+                for box in boxes:
+                    x1, y1, x2, y2 = map(int, box.xyxy[0])
+                    confidence = float(box.conf[0])
                     detections.append({
                         "bbox": [x1, y1, x2, y2],
-                        "confidence": float(confidence),
-                        "class_id": class_id,
+                        "confidence": confidence,
+                        "class_id": self.person_class_id,
                         "class_name": "person"
                     })
+                batch_detections.append(detections)
+            
+            return batch_detections
+        
+        if self.backend == "onnxruntime":
+            return self._detect_with_onnxruntime(frames)
+        
+        # OpenCV DNN
+        return self._detect_with_opencv_dnn(frames)
+    
+    def _detect_with_onnxruntime(self, frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Run the ONNX Runtime session on letterboxed frames (one batch if the model allows it)"""
+        letterboxed = [letterbox(frame, self.input_size) for frame in frames]
+        blob = cv2.dnn.blobFromImages(
+            [image for image, _, _ in letterboxed], 1/255.0, (self.input_size, self.input_size), swapRB=True, crop=False
+        )
+        
+        if self.dynamic_batch:
+            outputs = self.model.run(None, {self.input_name: blob})[0]
+        else:
+            outputs = np.concatenate([
+                self.model.run(None, {self.input_name: blob[i:i + 1]})[0] for i in range(len(frames))
+            ])
+        
+        return [
+            decode_yolov8_output(
+                output, self.person_class_id, self.threshold, self.nms_threshold,
+                scale, pad, (frame.shape[1], frame.shape[0])
+            )
+            for output, frame, (_, scale, pad) in zip(outputs, frames, letterboxed)
+        ]
+    
+    def _prepare_dnn_input(self, frames: List[np.ndarray]) -> Tuple[np.ndarray, List[Tuple[float, Tuple[int, int]]]]:
+        """
+        Fill the reused input blob from a batch of frames
+        
+        The resized image and the NCHW float blob are allocated once (the blob
+        grows to the largest batch seen) and overwritten for every batch
+        instead of building a new blob each time.
+        
+        Returns:
+            Tuple of (input blob for the batch, (scale, (pad_x, pad_y)) of each frame's letterbox transform)
+        """
+        size = self.input_size
+        count = len(frames)
+        if self._input_blob is None or self._input_blob.shape[0] < count or self._input_blob.shape[2] != size:
+            self._input_blob = np.empty((count, 3, size, size), dtype=np.float32)
+            self._canvas = np.empty((size, size, 3), dtype=np.uint8)
+        
+        transforms = []
+        for index, frame in enumerate(frames):
+            scale, pad = 1.0, (0, 0)
+            if self.letterbox_input:
+                height, width = frame.shape[:2]
+                scale = min(size / width, size / height)
+                new_width, new_height = int(round(width * scale)), int(round(height * scale))
+                pad = ((size - new_width) // 2, (size - new_height) // 2)
+                self._canvas.fill(114)
+                self._canvas[pad[1]:pad[1] + new_height, pad[0]:pad[0] + new_width] = cv2.resize(
+                    frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+                )
+            else:
+                cv2.resize(frame, (size, size), dst=self._canvas, interpolation=cv2.INTER_LINEAR)
+            
+            # HWC BGR uint8 -> CHW RGB float in [0, 1], written in place
+            np.multiply(
+                self._canvas.transpose(2, 0, 1)[::-1], 1/255.0, out=self._input_blob[index], dtype=np.float32
+            )
+            transforms.append((scale, pad))
+        
+        return self._input_blob[:count], transforms
+    
+    def _detect_with_opencv_dnn(self, frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Use OpenCV DNN for object detection, one forward pass per batch when the model allows it"""
+        with self._dnn_lock:
+            if self.dnn_batching and len(frames) > 1:
+                try:
+                    return self._forward_dnn(frames)
+                except (cv2.error, ValueError) as e:
+                    # Exported with a fixed batch size of 1
+                    logger.info(f"OpenCV DNN model does not accept batches, running frames one by one: {str(e).strip()}")
+                    self.dnn_batching = False
+            
+            return [self._forward_dnn([frame])[0] for frame in frames]
+    
+    def _forward_dnn(self, frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """One forward pass over a batch and per-frame decoding (DNN lock must be held)"""
+        blob, transforms = self._prepare_dnn_input(frames)
+        self.model.setInput(blob)
+        outputs = self.model.forward(self.output_names)
+        
+        count = len(frames)
+        if self.dnn_layout != "darknet" and outputs[0].shape[0] != count:
+            raise ValueError(f"model returned a batch of {outputs[0].shape[0]} for {count} frames")
+        
+        results = []
+        for index, (frame, (scale, pad)) in enumerate(zip(frames, transforms)):
+            frame_size = (frame.shape[1], frame.shape[0])
+            
+            if self.dnn_layout == "darknet":
+                # One (anchors, 5 + classes) array per YOLO layer and image
+                layers = [layer.reshape(count, -1, layer.shape[-1])[index] for layer in outputs]
+                results.append(decode_darknet_output(
+                    layers, self.person_class_id, self.threshold, self.nms_threshold, frame_size
+                ))
+                continue
+            
+            # YOLOv8 ONNX: (batch, 4 + classes, anchors), sometimes exported transposed
+            output = outputs[0][index]
+            if output.shape[0] > output.shape[1]:
+                output = output.T
+            results.append(decode_yolov8_output(
+                output, self.person_class_id, self.threshold, self.nms_threshold,
+                scale, pad, frame_size
+            ))
         
-        return detections
+        return results
     
     def set_threshold(self, threshold: float):
         """Update the detection threshold"""
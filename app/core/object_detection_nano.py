@@ -104,36 +104,52 @@ class NanoDetector:
         
         loop = asyncio.get_event_loop()
         try:
-            # Create metadata for inference
-            img_info = {"id": 0, "file_name": None}
+            results = await loop.run_in_executor(None, self.detect_people_batch, [frame])
+            return results[0]
+        
+        except Exception as e:
+            logger.exception(f"Error in NanoDet person detection: {str(e)}")
+            return []
+    
+    def detect_people_batch(self, frames: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """
+        Detect people in several frames with a single forward pass.
+        This call blocks, so run it in an executor from async code.
+        
+        Args:
+            frames: List of BGR images as numpy arrays
+        
+        Returns:
+            One list of detections per input frame, in input order
+        """
+        if not frames:
+            return []
+        
+        if not self.initialized or self.model is None:
+            return [[] for _ in frames]
+        
+        start_time = time.time()
+        
+        # Preprocess every frame with its batch index as the image id
+        metas = []
+        for index, frame in enumerate(frames):
             height, width = frame.shape[:2]
-            img_info["height"] = height
-            img_info["width"] = width
-            
-            # Preprocess image using the same approach as in the original code
-            start_time = time.time()
+            img_info = {"id": index, "file_name": None, "height": height, "width": width}
             meta = dict(img_info=img_info, raw_img=frame, img=frame)
-            
-            # Run preprocessing in executor to avoid blocking
-            def preprocess_image():
-                meta_processed = self.pipeline(None, meta, cfg.data.val.input_size)
-                meta_processed["img"] = torch.from_numpy(meta_processed["img"].transpose(2, 0, 1)).to(self.device)
-                meta_processed = naive_collate([meta_processed])
-                meta_processed["img"] = stack_batch_img(meta_processed["img"], divisible=32)
-                return meta_processed
-            
-            # Run preprocessing
-            meta_processed = await loop.run_in_executor(None, preprocess_image)
-            
-            # Run inference
-            def run_inference():
-                with torch.no_grad():
-                    results = self.model.inference(meta_processed)
-                return results
-            
-            # Get results
-            results = await loop.run_in_executor(None, run_inference)
-            dets = results[0]  # Detections for first image in batch
+            meta_processed = self.pipeline(None, meta, cfg.data.val.input_size)
+            meta_processed["img"] = torch.from_numpy(meta_processed["img"].transpose(2, 0, 1)).to(self.device)
+            metas.append(meta_processed)
+        
+        batch = naive_collate(metas)
+        batch["img"] = stack_batch_img(batch["img"], divisible=32)
+        
+        # Run inference
+        with torch.no_grad():
+            results = self.model.inference(batch)
+        
+        batch_detections = []
+        for index in range(len(frames)):
+            dets = results[index]
             
             # Process detections
             detections = []
@@ -152,17 +168,13 @@ class NanoDetector:
                             "class_id": self.person_class_id,
                             "class_name": "person"
                         })
-            
-            # Log processing time
-            processing_time = time.time() - start_time
-            if detections:
-                logger.debug(f"NanoDet detected {len(detections)} people in {processing_time:.3f}s")
-            
-            return detections
+            batch_detections.append(detections)
         
-        except Exception as e:
-            logger.exception(f"Error in NanoDet person detection: {str(e)}")
-            return []
+        # Log processing time
+        processing_time = time.time() - start_time
+        logger.debug(f"NanoDet processed a batch of {len(frames)} frames in {processing_time:.3f}s")
+        
+        return batch_detections
     
     def set_threshold(self, threshold: float):
         """Update the detection threshold"""
@@ -1,13 +1,10 @@
-import cv2
 import numpy as np
-import asyncio
 import logging
 import time
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple
 from collections import defaultdict
-from sqlalchemy import select, insert
-from app.database import get_db
-from app.models.event import Event, EventType
+from app.models.event import EventType
+from app.services.event_writer import get_event_writer
 
 logger = logging.getLogger(__name__)
 
@@ -37,9 +34,6 @@ class PeopleCounter:
         
         # Line position (will be calculated for each frame)
         self.line_y = None
-        
-        # Tracker
-        self.tracker = cv2.TrackerKCF_create
 
         # Flag for initial frame processing
         self.initial_phase_complete = False
@@ -265,18 +259,14 @@ class PeopleCounter:
                 crossed_state["counted"] = True
     
     async def _save_count_event(self):
-        """Save a count event to the database"""
+        """Queue a count event for the database"""
         try:
-            async for session in get_db():
-                # Create a new event for the occupancy change
-                await session.execute(
-                    insert(Event).values(
-                        event_type=EventType.OCCUPANCY_CHANGED,
-                        camera_id=self.camera_id,
-                        occupancy_count=self.current_count
-                    )
-                )
-                await session.commit()
+            event_writer = await get_event_writer()
+            await event_writer.write(
+                EventType.OCCUPANCY_CHANGED,
+                camera_id=self.camera_id,
+                occupancy_count=self.current_count
+            )
         except Exception as e:
             logger.exception(f"Error saving count event: {str(e)}")
     
@@ -0,0 +1,148 @@
+import cv2
+import numpy as np
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class PersonTracker:
+    """
+    Carries person boxes forward between detector runs.
+    
+    After a detection, feature points are picked inside every box and
+    followed into later frames with sparse (pyramidal Lucas-Kanade) optical
+    flow on a small grayscale copy; each box moves by the median displacement
+    of its points. The detector runs again every detection_interval frames,
+    after motion resumes in a static scene, or as soon as a box loses too many
+    points to be trusted.
+    """
+    def __init__(
+        self,
+        detection_interval: int = settings.DETECTION_INTERVAL,
+        width: int = 320,
+        max_points: int = 20,
+        min_points: int = 4
+    ):
+        self.detection_interval = max(1, detection_interval)
+        self.width = width
+        self.max_points = max_points
+        self.min_points = min_points
+        
+        self.prev_gray: Optional[np.ndarray] = None
+        self.detections: List[Dict[str, Any]] = []
+        self.frames_since_detection = 0
+        self.lost = False
+        
+        # Statistics
+        self.detections_run = 0
+        self.frames_tracked = 0
+        self.tracks_lost = 0
+    
+    def _prepare(self, frame: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Downscaled grayscale copy of a frame and its scale factor"""
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.width / max(1, width))
+        small = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small, scale
+    
+    def needs_detection(self) -> bool:
+        """Whether the next frame should go through the detector"""
+        return (
+            self.prev_gray is None
+            or self.lost
+            or self.frames_since_detection + 1 >= self.detection_interval
+        )
+    
+    def start(self, frame: np.ndarray, detections: List[Dict[str, Any]]):
+        """Take fresh detector results as the boxes to follow"""
+        self.prev_gray, _ = self._prepare(frame)
+        self.detections = [dict(detection, tracked=False) for detection in detections]
+        self.frames_since_detection = 0
+        self.lost = False
+        self.detections_run += 1
+    
+    def invalidate(self):
+        """Force a detection on the next frame (the scene was static in between)"""
+        self.prev_gray = None
+    
+    def track(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Move the current boxes to a new frame
+        
+        Returns:
+            Detections with updated bounding boxes ("tracked": True)
+        """
+        gray, scale = self._prepare(frame)
+        prev_gray, self.prev_gray = self.prev_gray, gray
+        self.frames_since_detection += 1
+        self.frames_tracked += 1
+        
+        if not self.detections or prev_gray is None or prev_gray.shape != gray.shape:
+            self.lost = bool(self.detections)
+            return self.detections
+        
+        # Feature points inside every box, all followed in one optical flow call
+        points, owners = [], []
+        for index, detection in enumerate(self.detections):
+            x1, y1, x2, y2 = [int(value * scale) for value in detection["bbox"]]
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+            corners = cv2.goodFeaturesToTrack(
+                prev_gray[y1:y2, x1:x2], maxCorners=self.max_points, qualityLevel=0.01, minDistance=3
+            )
+            if corners is None:
+                continue
+            points.append(corners.reshape(-1, 2) + (x1, y1))
+            owners.extend([index] * len(corners))
+        
+        if not points:
+            self.lost = True
+            return self.detections
+        
+        start_points = np.concatenate(points).astype(np.float32).reshape(-1, 1, 2)
+        end_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            prev_gray, gray, start_points, None, winSize=(15, 15), maxLevel=2
+        )
+        good = status.reshape(-1) == 1
+        owners = np.asarray(owners)
+        displacement = (end_points - start_points).reshape(-1, 2) / scale
+        
+        height, width = frame.shape[:2]
+        tracked = []
+        for index, detection in enumerate(self.detections):
+            selected = good & (owners == index)
+            if np.count_nonzero(selected) < self.min_points:
+                # Too few points to trust; drop the box and re-detect next frame
+                self.lost = True
+                self.tracks_lost += 1
+                continue
+            
+            dx, dy = np.median(displacement[selected], axis=0)
+            x1, y1, x2, y2 = detection["bbox"]
+            tracked.append(dict(
+                detection,
+                bbox=[
+                    int(np.clip(x1 + dx, 0, width)), int(np.clip(y1 + dy, 0, height)),
+                    int(np.clip(x2 + dx, 0, width)), int(np.clip(y2 + dy, 0, height))
+                ],
+                tracked=True
+            ))
+        
+        self.detections = tracked
+        return tracked
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracker statistics"""
+        frames = self.detections_run + self.frames_tracked
+        return {
+            "detection_interval": self.detection_interval,
+            "tracked_boxes": len(self.detections),
+            "detections_run": self.detections_run,
+            "frames_tracked": self.frames_tracked,
+            "tracks_lost": self.tracks_lost,
+            "detector_duty_cycle": self.detections_run / frames if frames else 0.0
+        }
\ No newline at end of file
@@ -0,0 +1,218 @@
+import os
+import logging
+import asyncio
+import time
+from typing import Callable, Dict, Any, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import get_db
+from app.models.notification import NotificationTrigger
+
+logger = logging.getLogger(__name__)
+
+class ProcessingRateController:
+    """
+    Adapts each camera's effective processing FPS to host load.
+    
+    Every interval the controller looks at host CPU utilisation over that
+    interval and each camera's pipeline latency. Under pressure it cuts the rate of the
+    lowest-priority cameras first (multiplicative decrease, never below the
+    floor). When there is headroom it raises the highest-priority cameras
+    first (additive increase, never above the camera's configured
+    processing_fps). Cameras with recent detections or active notification
+    triggers have priority.
+    """
+    def __init__(
+        self,
+        get_processors: Callable[[], Dict[int, Any]],
+        min_fps: float = settings.RATE_CONTROL_MIN_FPS,
+        interval: float = settings.RATE_CONTROL_INTERVAL,
+        high_load: float = settings.RATE_CONTROL_HIGH_LOAD,
+        low_load: float = settings.RATE_CONTROL_LOW_LOAD,
+        activity_window: float = 30.0
+    ):
+        self.get_processors = get_processors
+        self.min_fps = max(0.1, min_fps)
+        self.interval = interval
+        self.high_load = high_load
+        self.low_load = low_load
+        self.activity_window = activity_window
+        
+        self.cpu_count = os.cpu_count() or 1
+        self.trigger_cameras: Set[int] = set()
+        self.triggers_all_cameras = False
+        self.last_trigger_refresh = 0
+        self._cpu_times: Optional[Tuple[int, int]] = self._read_cpu_times()
+        
+        self.running = False
+        self._task: Optional[asyncio.Task] = None
+        
+        # Last measurements
+        self.load = 0.0
+        self.state = "steady"
+    
+    async def start(self):
+        """Start the control loop"""
+        if self.running:
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Processing rate controller started (floor {self.min_fps} FPS)")
+    
+    async def stop(self):
+        """Stop the control loop"""
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while self.running:
+            try:
+                await asyncio.sleep(self.interval)
+                
+                if time.time() - self.last_trigger_refresh > 30:
+                    await self._refresh_trigger_cameras()
+                
+                self.adjust()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error in processing rate controller: {str(e)}")
+    
+    async def _refresh_trigger_cameras(self):
+        """Find cameras covered by active notification triggers"""
+        self.last_trigger_refresh = time.time()
+        async for session in get_db():
+            result = await session.execute(
+                select(NotificationTrigger.camera_id).where(NotificationTrigger.active == True)
+            )
+            camera_ids = result.scalars().all()
+            # A trigger without a camera applies to all cameras
+            self.triggers_all_cameras = any(camera_id is None for camera_id in camera_ids)
+            self.trigger_cameras = {camera_id for camera_id in camera_ids if camera_id is not None}
+    
+    @staticmethod
+    def _read_cpu_times() -> Optional[Tuple[int, int]]:
+        """(busy, total) jiffies of all cores from /proc/stat, None if unavailable"""
+        try:
+            with open("/proc/stat") as f:
+                fields = [int(value) for value in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        # idle + iowait are not busy time
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+        total = sum(fields)
+        return total - idle, total
+    
+    def _host_load(self) -> float:
+        """
+        Busy fraction of all cores since the previous step (0 if unavailable)
+        
+        The 1-minute load average lags tens of seconds behind, which made the
+        controller keep cutting after the load had gone. It is only used where
+        /proc/stat does not exist.
+        """
+        cpu_times = self._read_cpu_times()
+        if cpu_times is None:
+            try:
+                return os.getloadavg()[0] / self.cpu_count
+            except (AttributeError, OSError):
+                return 0.0
+        
+        previous, self._cpu_times = self._cpu_times, cpu_times
+        if previous is None or cpu_times[1] <= previous[1]:
+            return self.load
+        return (cpu_times[0] - previous[0]) / (cpu_times[1] - previous[1])
+    
+    def _priority(self, camera_id: int, processor, current_time: float) -> int:
+        priority = 0
+        if current_time - processor.last_activity_time < self.activity_window:
+            priority += 2
+        if self.triggers_all_cameras or camera_id in self.trigger_cameras:
+            priority += 1
+        return priority
+    
+    def adjust(self):
+        """Run one control step"""
+        processors = {
+            camera_id: processor for camera_id, processor in self.get_processors().items()
+            if processor.processing
+        }
+        if not processors:
+            return
+        
+        current_time = time.time()
+        self.load = self._host_load()
+        
+        behind = set()
+        for camera_id, processor in processors.items():
+            ceiling = max(self.min_fps, float(processor.processing_fps))
+            processor.rate_priority = self._priority(camera_id, processor, current_time)
+            
+            # Keep targets inside [floor, configured rate]
+            processor.target_fps = min(max(processor.target_fps, self.min_fps), ceiling)
+            
+            # The pipeline alone takes longer than the frame budget
+            if processor.avg_pipeline_latency * processor.target_fps > 1.0:
+                behind.add(camera_id)
+        
+        by_priority = sorted(processors.items(), key=lambda item: item[1].rate_priority)
+        
+        if self.load > self.high_load or behind:
+            self.state = "overloaded"
+            
+            # Cameras that cannot keep up drop to what their pipeline can sustain
+            for camera_id in behind:
+                processor = processors[camera_id]
+                sustainable = 0.9 / max(processor.avg_pipeline_latency, 1e-3)
+                processor.target_fps = max(self.min_fps, min(processor.target_fps, sustainable))
+            
+            # Shed load from the lowest priority tier that can still give some up
+            if self.load > self.high_load:
+                for tier in sorted({processor.rate_priority for _, processor in by_priority}):
+                    tier_processors = [
+                        processor for _, processor in by_priority
+                        if processor.rate_priority == tier and processor.target_fps > self.min_fps
+                    ]
+                    if tier_processors:
+                        for processor in tier_processors:
+                            processor.target_fps = max(self.min_fps, processor.target_fps * 0.7)
+                        break
+        
+        elif self.load < self.low_load:
+            self.state = "recovering"
+            
+            # Give rate back to the highest priority tier that is below its ceiling
+            for tier in sorted({processor.rate_priority for _, processor in by_priority}, reverse=True):
+                tier_processors = [
+                    processor for _, processor in by_priority
+                    if processor.rate_priority == tier
+                    and processor.target_fps < max(self.min_fps, float(processor.processing_fps))
+                    # Do not raise a camera past what its pipeline can sustain
+                    and processor.avg_pipeline_latency * (processor.target_fps + 1.0) <= 1.0
+                ]
+                if tier_processors:
+                    for processor in tier_processors:
+                        ceiling = max(self.min_fps, float(processor.processing_fps))
+                        processor.target_fps = min(ceiling, processor.target_fps + 1.0)
+                    break
+        else:
+            self.state = "steady"
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get controller statistics"""
+        return {
+            "running": self.running,
+            "state": self.state,
+            "load_per_core": self.load,
+            "min_fps": self.min_fps,
+            "trigger_cameras": sorted(self.trigger_cameras),
+            "triggers_all_cameras": self.triggers_all_cameras
+        }
\ No newline at end of file
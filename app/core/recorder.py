@@ -0,0 +1,210 @@
+import logging
+import asyncio
+import os
+import subprocess
+import time
+from collections import deque
+from typing import Callable, Dict, Any, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Segment files are named after their wall-clock start time
+SEGMENT_NAME_FORMAT = "%Y%m%d-%H%M%S"
+SEGMENT_SUFFIX = ".mp4"
+
+def segment_start_time(filename: str) -> Optional[float]:
+    """Start time (epoch seconds) encoded in a segment file name, None if it is not a segment"""
+    if not filename.endswith(SEGMENT_SUFFIX):
+        return None
+    try:
+        return time.mktime(time.strptime(filename[:-len(SEGMENT_SUFFIX)], SEGMENT_NAME_FORMAT))
+    except ValueError:
+        return None
+
+class SegmentRecorder:
+    """
+    Continuous recording of one camera into fixed-length segment files.
+    
+    A single FFmpeg process stream-copies the camera's encoded video (no
+    decoding or encoding) into fragmented MP4 files of segment_seconds each,
+    cut at keyframes and aligned to the wall clock. FFmpeg reports every
+    finished segment on stdout (CSV segment list), which is passed to
+    on_segment so the caller can index it.
+    
+    The source is resolved on every (re)start, so the recorder follows the
+    camera's ingest relay when one is running.
+    """
+    def __init__(
+        self,
+        camera_id: int,
+        get_source: Callable[[], str],
+        directory: str,
+        on_segment: Callable[[int, str, float, float, int], None],
+        segment_seconds: int = settings.RECORDING_SEGMENT_SECONDS
+    ):
+        self.camera_id = camera_id
+        self.get_source = get_source
+        self.directory = directory
+        self.on_segment = on_segment
+        self.segment_seconds = max(1, segment_seconds)
+        
+        self.running = False
+        self.source_url: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._stderr_tail = deque(maxlen=20)
+        
+        # Statistics
+        self.segments_written = 0
+        self.bytes_written = 0
+        self.restarts = 0
+        self.last_segment_time = 0
+    
+    async def start(self):
+        """Start recording"""
+        if self.running:
+            return
+        self.running = True
+        os.makedirs(self.directory, exist_ok=True)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Recording camera {self.camera_id} into {self.directory}")
+    
+    async def stop(self):
+        """Stop recording; FFmpeg closes the current segment"""
+        self.running = False
+        
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        await self._stop_process()
+        logger.info(f"Recording of camera {self.camera_id} stopped")
+    
+    def _command(self, source_url: str):
+        command = [settings.FFMPEG_PATH, '-loglevel', 'error', '-nostdin']
+        if source_url.startswith("rtsp://"):
+            command += ['-rtsp_transport', 'tcp']
+        command += [
+            '-i', source_url,
+            '-map', '0:v:0',
+            '-c', 'copy',                 # Packets only; nothing is decoded or encoded
+            '-an',
+            '-f', 'segment',
+            '-segment_time', str(self.segment_seconds),
+            '-segment_atclocktime', '1',  # Cut on wall-clock boundaries
+            '-reset_timestamps', '1',     # Every file starts at 0
+            '-strftime', '1',
+            '-segment_format', 'mp4',
+            # Fragmented MP4 stays playable if FFmpeg is killed mid-segment
+            '-segment_format_options', 'movflags=+frag_keyframe+empty_moov+default_base_moof',
+            '-segment_list', 'pipe:1',    # One CSV line per finished segment
+            '-segment_list_type', 'csv',
+            '-segment_list_flags', 'live',
+            os.path.join(self.directory, f"{SEGMENT_NAME_FORMAT}{SEGMENT_SUFFIX}")
+        ]
+        return command
+    
+    async def _run(self):
+        """Recording loop; restarts FFmpeg with backoff when the source drops"""
+        backoff = 1.0
+        while self.running:
+            started = time.time()
+            try:
+                self.source_url = self.get_source()
+                self._process = await asyncio.create_subprocess_exec(
+                    *self._command(self.source_url),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE
+                )
+                stderr_task = asyncio.create_task(self._read_stderr(self._process.stderr))
+                
+                while True:
+                    line = await self._process.stdout.readline()
+                    if not line:
+                        break
+                    self._segment_finished(line.decode("utf-8", errors="replace").strip())
+                
+                await self._process.wait()
+                await stderr_task
+                logger.warning(
+                    f"Recording of camera {self.camera_id} interrupted "
+                    f"(exit {self._process.returncode}): {' | '.join(self._stderr_tail)}"
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error recording camera {self.camera_id}: {str(e)}")
+            finally:
+                await self._stop_process()
+            
+            if not self.running:
+                break
+            
+            # Reset the backoff after a run that lasted a while
+            if time.time() - started > 30:
+                backoff = 1.0
+            self.restarts += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+    
+    def _segment_finished(self, line: str):
+        """Handle one segment list entry: "filename,start,end" (stream time)"""
+        parts = line.rsplit(",", 2)
+        if len(parts) != 3:
+            return
+        filename = os.path.basename(parts[0])
+        start_time = segment_start_time(filename)
+        if start_time is None:
+            return
+        try:
+            duration = max(0.0, float(parts[2]) - float(parts[1]))
+            size = os.path.getsize(os.path.join(self.directory, filename))
+        except (ValueError, OSError):
+            return
+        
+        self.segments_written += 1
+        self.bytes_written += size
+        self.last_segment_time = time.time()
+        self.on_segment(self.camera_id, filename, start_time, start_time + duration, size)
+    
+    async def _read_stderr(self, stream):
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+            self._stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+    
+    async def _stop_process(self):
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        try:
+            # SIGTERM lets FFmpeg finish the current segment
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), 5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        except ProcessLookupError:
+            pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get recorder statistics"""
+        return {
+            "camera_id": self.camera_id,
+            "running": self.running,
+            "source_url": self.source_url,
+            "pid": self._process.pid if self._process else None,
+            "segment_seconds": self.segment_seconds,
+            "segments_written": self.segments_written,
+            "bytes_written": self.bytes_written,
+            "restarts": self.restarts,
+            "last_segment_time": self.last_segment_time
+        }
\ No newline at end of file
@@ -18,9 +18,17 @@ from app.utils.frame_utils import (
     overlay_timestamp, save_frame
 )
 from app.utils.event_emitter import EventEmitter
+from app.core.frame_buffer import FrameRingBuffer, FrameRef
+from app.core.motion_gate import MotionGate
+from app.core.person_tracker import PersonTracker
+from app.core.jpeg_cache import JpegCache
 
 logger = logging.getLogger(__name__)
 
+# Ring slots beyond the fifo queue: the frame being captured, the one being
+# processed and two held by snapshot/stream readers of the latest frame
+FIFO_RING_HEADROOM = 4
+
 class StreamProcessor:
     """
     Processes RTSP camera streams with AI components for detection, 
@@ -36,7 +44,8 @@ class StreamProcessor:
         detect_people: bool = True,
         count_people: bool = True,
         recognize_faces: bool = False,
-        template_matching: bool = False
+        template_matching: bool = False,
+        capture_mode: str = settings.CAPTURE_MODE
     ):
         self.camera_id = camera_id
         self.name = name
@@ -55,6 +64,15 @@ class StreamProcessor:
         self.face_recognizer = None
         self.template_matcher = None
         self.people_counter = None
+        self.inference_scheduler = None  # Shared batched detector, if enabled
+        self.capture_pool = None  # Capture worker pool, if decoding runs out of process
+        self.ingest_relay = None  # Local re-serve of the camera stream, if enabled
+        
+        # Skips inference on static frames
+        self.motion_gate = MotionGate() if settings.MOTION_GATING else None
+        
+        # Follows people between detector runs when detecting every N frames
+        self.person_tracker = PersonTracker() if settings.DETECTION_INTERVAL > 1 else None
         
         # Video settings
         self.record_video = False
@@ -65,8 +83,22 @@ class StreamProcessor:
         self.draw_count_line = True
         self.draw_timestamps = True
         
-        # Frame buffers with Thread-safe Queue
-        self.raw_frame_queue = Queue(maxsize=30)
+        # Frame buffers with Thread-safe Queue (raw queue holds (seq, timestamp) of ring frames).
+        # In "latest" mode the raw queue is a single slot the capture thread overwrites, so
+        # analysis always sees the freshest frame; "fifo" keeps every frame up to the queue size.
+        if capture_mode not in ("latest", "fifo"):
+            logger.warning(f"Unknown capture mode '{capture_mode}' for camera {camera_id}, using 'latest'")
+            capture_mode = "latest"
+        self.capture_mode = capture_mode
+        raw_queue_size = 1 if capture_mode == "latest" else max(1, settings.RAW_FRAME_QUEUE_SIZE)
+        self.raw_frame_queue = Queue(maxsize=raw_queue_size)
+        
+        # Preallocated frame slots the capture thread decodes into. In fifo mode every
+        # queued frame keeps its slot until processed, so the ring must outsize the queue
+        ring_slots = settings.FRAME_RING_SLOTS
+        if capture_mode == "fifo":
+            ring_slots = max(ring_slots, raw_queue_size + FIFO_RING_HEADROOM)
+        self.frame_ring = FrameRingBuffer(ring_slots)
         self.processed_frame_queue = Queue(maxsize=30)
         self.max_buffer_size = 30
         
@@ -74,6 +106,14 @@ class StreamProcessor:
         self._frame_lock = asyncio.Lock()
         self._cv_lock = threading.RLock()
         
+        # New-frame signal from the capture thread to the processing loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._frame_event: Optional[asyncio.Event] = None
+        
+        # Replaced on every processed frame; live viewers wait on the current one
+        self._processed_frame_event: Optional[asyncio.Event] = None
+        self.live_viewers = 0
+        
         # State variables
         self.connected = False
         self.running = False
@@ -86,6 +126,16 @@ class StreamProcessor:
         self.frames_captured = 0
         self.frames_processed = 0
         self.processing_fps_actual = 0
+        self.frames_overwritten = 0  # Replaced by a newer frame before analysis ("latest" mode)
+        self.frames_dropped = 0      # Lost to a full queue or a recycled ring slot
+        self.capture_latency = 0.0   # Capture-to-analysis delay of the last analysed frame
+        self.avg_capture_latency = 0.0
+        
+        # Rate control (target_fps is adjusted by the camera manager under load)
+        self.target_fps = float(processing_fps)
+        self.avg_pipeline_latency = 0.0
+        self.last_activity_time = 0
+        self.rate_priority = 0
         self.last_frame_time = 0
         self.last_processed_time = 0
         self.processing_start_time = 0
@@ -93,10 +143,13 @@ class StreamProcessor:
         self.consecutive_errors = 0
         
         # Cache of latest successful frame (to return when stream has issues)
-        self.latest_raw_frame = None
         self.latest_raw_timestamp = 0
         self.latest_processed_frame = None
         self.latest_processed_timestamp = 0
+        self.processed_frame_seq = 0  # Bumped for every published processed frame
+        
+        # JPEG encodings of the latest frame, shared by all snapshot consumers
+        self.jpeg_cache = JpegCache(camera_id)
         
         # OpenCV capture object and thread
         self.capture = None
@@ -132,6 +185,11 @@ class StreamProcessor:
             
             logger.info(f"Connecting to RTSP stream: {self.rtsp_url} for camera {self.camera_id}")
             
+            # Loop the capture thread hands frames (and reconnect requests) to
+            self._loop = asyncio.get_running_loop()
+            if self._frame_event is None:
+                self._frame_event = asyncio.Event()
+            
             # Connect in a background thread to avoid blocking asyncio
             success = await self._connect_rtsp()
             
@@ -161,6 +219,13 @@ class StreamProcessor:
             await self.disconnect()
             return False
     
+    @property
+    def source_url(self) -> str:
+        """URL frames are decoded from: the ingest relay if there is one, else the camera"""
+        if self.ingest_relay is not None and self.ingest_relay.local_url:
+            return self.ingest_relay.local_url
+        return self.rtsp_url
+    
     async def _connect_rtsp(self) -> bool:
         """
         Establish connection to RTSP stream using OpenCV
@@ -175,14 +240,21 @@ class StreamProcessor:
                     self.capture.release()
                 
                 # Create a new capture with optimized parameters
-                self.capture = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG)
+                source_url = self.source_url
+                if self.capture_pool is not None:
+                    # Decoding happens in a worker process; frames arrive via shared memory
+                    self.capture = self.capture_pool.open_capture(
+                        self.camera_id, source_url, self.processing_fps
+                    )
+                else:
+                    self.capture = cv2.VideoCapture(source_url, cv2.CAP_FFMPEG)
                 
                 # Set additional parameters for more reliable streaming
                 self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 3)  # Increase internal buffer
                 
                 # Check if connection was successful
                 if not self.capture.isOpened():
-                    logger.error(f"Failed to open RTSP stream: {self.rtsp_url}")
+                    logger.error(f"Failed to open RTSP stream: {source_url}")
                     return False
                 
                 # Get video properties
@@ -255,6 +327,9 @@ class StreamProcessor:
                 except Empty:
                     break
             
+            # Forget published frames; outstanding references stay valid
+            self.frame_ring.clear()
+            
             # Emit event
             self.events.emit("disconnected", {
                 "camera_id": self.camera_id
@@ -282,19 +357,36 @@ class StreamProcessor:
                     time.sleep(0.001)  # Small sleep to prevent CPU hogging
                     continue
                 
+                # Reserve a ring slot to decode into (None until the first frame sizes the ring)
+                write_slot = self.frame_ring.acquire_write_slot()
+                slot_index, slot_buffer = write_slot if write_slot else (None, None)
+                
                 # Check if capture is valid
                 with self._cv_lock:
                     if self.capture is None or not self.capture.isOpened():
                         logger.warning(f"Camera {self.camera_id} connection lost in capture thread")
                         self.connection_errors += 1
                         self.consecutive_errors += 1
+                        if slot_index is not None:
+                            self.frame_ring.abort(slot_index)
                         time.sleep(0.1)  # Wait a bit before retry
                         continue
                     
-                    # Capture frame
-                    ret, frame = self.capture.read()
+                    # Capture frame straight into the slot when one is available
+                    if slot_buffer is not None:
+                        ret, frame = self.capture.read(slot_buffer)
+                    elif self.frame_ring.allocated:
+                        # Every slot is referenced by a consumer: drain the stream and drop this frame
+                        self.capture.grab()
+                        last_capture_time = current_time
+                        continue
+                    else:
+                        ret, frame = self.capture.read()
                 
                 if not ret or frame is None:
+                    if slot_index is not None:
+                        self.frame_ring.abort(slot_index)
+                    
                     logger.warning(f"Failed to read frame from camera {self.camera_id}")
                     self.connection_errors += 1
                     self.consecutive_errors += 1
@@ -315,33 +407,31 @@ class StreamProcessor:
                 if frames_count % 100 == 0:
                     logger.debug(f"Successfully grabbed frame #{frames_count} from camera {self.camera_id}")
                 
-                # Add frame to the queue
-                try:
-                    # Add frame with timestamp
-                    timestamp = time.time()
-                    self.raw_frame_queue.put_nowait((frame.copy(), timestamp))
-                    
-                    # Update latest frame cache (thread-safe access)
-                    self.latest_raw_frame = frame.copy()
-                    self.latest_raw_timestamp = timestamp
-                    
-                    # Update metrics
-                    self.last_frame_time = timestamp
-                    frames_count += 1
-                    self.frames_captured += 1
-                    
-                    # Record frame if enabled
-                    if self.record_video and self.video_writer:
-                        self.video_writer.write(frame)
-                    
-                except Full:
-                    # Queue is full, remove oldest frame
-                    try:
-                        self.raw_frame_queue.get_nowait()
-                        # Now add the new frame
-                        self.raw_frame_queue.put_nowait((frame.copy(), time.time()))
-                    except:
-                        pass  # In case of race condition
+                # First frame, or the stream changed resolution: size the ring to match
+                if slot_buffer is None or frame.ctypes.data != slot_buffer.ctypes.data:
+                    if slot_index is not None:
+                        self.frame_ring.abort(slot_index)
+                    self.frame_ring.allocate(frame.shape, frame.dtype)
+                    slot_index, slot_buffer = self.frame_ring.acquire_write_slot()
+                    np.copyto(slot_buffer, frame)
+                    frame = slot_buffer
+                
+                # Publish the slot and queue its sequence number
+                timestamp = time.time()
+                seq = self.frame_ring.commit(slot_index, timestamp)
+                self.latest_raw_timestamp = timestamp
+                
+                self._queue_raw_frame(seq, timestamp)
+                self._notify_frame()
+                
+                # Update metrics
+                self.last_frame_time = timestamp
+                frames_count += 1
+                self.frames_captured += 1
+                
+                # Record frame if enabled
+                if self.record_video and self.video_writer:
+                    self.video_writer.write(frame)
                 
                 # Calculate FPS every second
                 if current_time - start_time >= 1.0:
@@ -356,12 +446,96 @@ class StreamProcessor:
                 logger.exception(f"Error in capture thread for camera {self.camera_id}: {str(e)}")
                 time.sleep(0.1)  # Wait a bit before continuing
     
+    def _queue_raw_frame(self, seq: int, timestamp: float):
+        """Hand a committed frame to the processing loop (called from capture thread)"""
+        try:
+            self.raw_frame_queue.put_nowait((seq, timestamp))
+            return
+        except Full:
+            pass
+        
+        # Replace the oldest pending frame with this one
+        try:
+            self.raw_frame_queue.get_nowait()
+            if self.capture_mode == "latest":
+                self.frames_overwritten += 1
+            else:
+                self.frames_dropped += 1
+        except Empty:
+            pass  # Consumed in the meantime
+        
+        try:
+            self.raw_frame_queue.put_nowait((seq, timestamp))
+        except Full:
+            self.frames_dropped += 1  # In case of race condition
+    
+    def _notify_frame(self):
+        """Wake the processing loop (called from capture thread)"""
+        loop, event = self._loop, self._frame_event
+        if loop is None or event is None or event.is_set():
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # Event loop already closed
+    
+    async def _wait_for_frame(self, timeout: float) -> bool:
+        """
+        Wait until the capture thread signals a new frame
+        
+        Returns:
+            True if a frame is available, False on timeout
+        """
+        if not self.raw_frame_queue.empty():
+            return True
+        
+        # Clear, then re-check, so a frame committed in between is not missed
+        self._frame_event.clear()
+        if not self.raw_frame_queue.empty():
+            return True
+        
+        try:
+            await asyncio.wait_for(self._frame_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    def _signal_processed_frame(self):
+        """Wake every live viewer waiting for a processed frame"""
+        event = self._processed_frame_event
+        if event is not None:
+            self._processed_frame_event = None
+            event.set()
+    
+    async def wait_for_processed_frame(self, last_seq: int, timeout: float) -> int:
+        """
+        Wait until a processed frame newer than last_seq is published
+        
+        Args:
+            last_seq: processed_frame_seq the caller has already seen
+            timeout: Maximum time to wait in seconds
+        
+        Returns:
+            Current processed_frame_seq (unchanged on timeout)
+        """
+        if self.processed_frame_seq != last_seq:
+            return self.processed_frame_seq
+        
+        if self._processed_frame_event is None:
+            self._processed_frame_event = asyncio.Event()
+        
+        try:
+            await asyncio.wait_for(self._processed_frame_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.processed_frame_seq
+    
     def _trigger_reconnect(self):
         """Trigger camera reconnection (called from capture thread)"""
-        if not self.reconnecting:
+        if not self.reconnecting and self._loop is not None:
             self.reconnecting = True
             # Create asyncio task to reconnect (properly from event loop)
-            asyncio.run_coroutine_threadsafe(self._attempt_reconnect(), asyncio.get_event_loop())
+            asyncio.run_coroutine_threadsafe(self._attempt_reconnect(), self._loop)
     
     async def _attempt_reconnect(self):
         """Attempt to reconnect to camera (runs in asyncio event loop)"""
@@ -437,7 +611,6 @@ class StreamProcessor:
     
     async def _process_frames(self):
         """Process frames through the AI pipelines"""
-        process_interval = 1.0 / max(1, self.processing_fps)
         last_process_time = 0
         frames_processed_count = 0
         processing_errors = 0
@@ -447,46 +620,71 @@ class StreamProcessor:
         
         while self.processing and self.connected:
             try:
-                current_time = time.time()
-                
                 # Skip if processing is paused
                 if self.paused:
                     await asyncio.sleep(0.1)
                     continue
                 
-                # Throttle processing to desired FPS
-                if current_time - last_process_time < process_interval:
-                    await asyncio.sleep(0.001)
+                # Sleep out the rest of the FPS budget (never above the configured rate)
+                process_interval = 1.0 / max(0.1, min(self.target_fps, self.processing_fps))
+                remaining = last_process_time + process_interval - time.time()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                
+                # Sleep until the capture thread signals a frame; the timeout notices stalls
+                if not await self._wait_for_frame(timeout=1.0):
+                    if processing_errors % 10 == 0:  # Only log every 10 errors to avoid spam
+                        logger.warning(f"No frames available for processing from camera {self.camera_id}")
+                    processing_errors += 1
                     continue
                 
-                # Get latest frame from queue
-                frame_data = None
+                current_time = time.time()
+                
+                # Get next frame from queue as a read-only view of its ring slot
+                frame_ref = None
                 try:
-                    # Non-blocking get with timeout
-                    frame_data = self.raw_frame_queue.get_nowait()
+                    # Non-blocking get
+                    seq, _ = self.raw_frame_queue.get_nowait()
+                    frame_ref = self.frame_ring.acquire(seq)
                 except Empty:
-                    # If queue is empty, use cached latest frame if available and recent
-                    if (self.latest_raw_frame is not None and 
-                        current_time - self.latest_raw_timestamp < 5.0):
-                        frame_data = (self.latest_raw_frame.copy(), self.latest_raw_timestamp)
-                    else:
-                        if processing_errors % 10 == 0:  # Only log every 10 errors to avoid spam
-                            logger.warning(f"No frames available for processing from camera {self.camera_id}")
+                    pass
+                
+                if frame_ref is None:
+                    self.frames_dropped += 1
+                    
+                    # Frame already recycled: in latest mode use the latest frame if it is
+                    # recent; fifo must not substitute a frame out of order
+                    if self.capture_mode == "latest" and current_time - self.frame_ring.latest_timestamp < 5.0:
+                        frame_ref = self.frame_ring.acquire_latest()
+                    
+                    if frame_ref is None:
                         processing_errors += 1
-                        await asyncio.sleep(0.1)
                         continue
                 
                 # Reset error counter on successful frame retrieval
                 processing_errors = 0
                 
-                frame, timestamp = frame_data
+                frame, timestamp = frame_ref.frame, frame_ref.timestamp
+                
+                # How stale the frame is by the time analysis starts
+                self.capture_latency = max(0.0, current_time - timestamp)
+                self.avg_capture_latency = 0.9 * self.avg_capture_latency + 0.1 * self.capture_latency
                 
                 # Log frame shape to debug if frames are valid
                 if frames_processed_count == 0:
                     logger.info(f"Processing first frame from camera {self.camera_id}, shape: {frame.shape}")
                 
-                # Process frame through AI pipeline
-                processed_frame, results = await self._process_frame_pipeline(frame)
+                # Process frame through AI pipeline, holding the slot until done
+                pipeline_start = time.time()
+                try:
+                    processed_frame, results = await self._process_frame_pipeline(frame)
+                finally:
+                    frame_ref.release()
+                
+                pipeline_latency = time.time() - pipeline_start
+                self.avg_pipeline_latency = 0.9 * self.avg_pipeline_latency + 0.1 * pipeline_latency
+                if not results.get("gated") and (results.get("people") or results.get("faces") or results.get("templates")):
+                    self.last_activity_time = current_time
                 
                 # Log the results occasionally
                 if frames_processed_count % 50 == 0:
@@ -494,15 +692,17 @@ class StreamProcessor:
                     faces_count = len(results.get("faces", []))
                     logger.debug(f"Camera {self.camera_id} frame #{frames_processed_count} - detected: {people_count} people, {faces_count} faces")
                 
+                # Update cached latest processed frame (thread-safe access)
+                self.latest_processed_frame = processed_frame
+                self.latest_processed_timestamp = current_time
+                self.processed_frame_seq += 1
+                self._signal_processed_frame()
+                
                 # Update processed frame queue
                 try:
                     # Store processed frame
                     self.processed_frame_queue.put_nowait((processed_frame, current_time))
                     
-                    # Update cached latest processed frame (thread-safe access)
-                    self.latest_processed_frame = processed_frame
-                    self.latest_processed_timestamp = current_time
-                    
                 except Full:
                     # If queue is full, remove oldest
                     try:
@@ -548,9 +748,14 @@ class StreamProcessor:
         logger.info(f"Processing loop exited for camera {self.camera_id}")
     
     async def _process_frame_pipeline(self, frame: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
-        """Process a frame through all enabled AI components and check for triggers"""
+        """
+        Process a frame through all enabled AI components and check for triggers
+        
+        The input frame is a read-only ring slot view; the returned frame is
+        always an owned array that can outlive the slot.
+        """
         results = {}
-        processed_frame = frame.copy()
+        processed_frame = frame
         processing_start = time.time()
         
         try:
@@ -558,17 +763,39 @@ class StreamProcessor:
             logger.debug(f"Processing frame for camera {self.camera_id}", 
                         extra={"camera_id": self.camera_id})
             
+            # Static scene: reuse the previous results instead of running inference.
+            # The check resizes and blurs the full frame, so keep it off the loop
+            if self.motion_gate is not None and not await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.motion_gate.check, frame
+            ):
+                # Tracked boxes go stale while skipped; detect again when motion resumes
+                if self.person_tracker is not None:
+                    self.person_tracker.invalidate()
+                # Marked so the repeated results do not count as new activity
+                return self._render_previous_results(frame), dict(self.detection_results, gated=True)
+            
             # Run object detection first if enabled
             if self.detect_people and self.object_detector:
                 detection_start = time.time()
                 
-                # Detect people
-                people = await self.object_detector.detect_people(frame)
+                if self.person_tracker is None or self.person_tracker.needs_detection():
+                    # Detect people (batched with other cameras when a scheduler is available)
+                    if self.inference_scheduler:
+                        people = await self.inference_scheduler.detect_people(frame, self.camera_id)
+                    else:
+                        people = await self.object_detector.detect_people(frame)
+                    if self.person_tracker is not None:
+                        self.person_tracker.start(frame, people)
+                    source = "Detected"
+                else:
+                    # Between detector runs, move the last boxes with optical flow
+                    people = self.person_tracker.track(frame)
+                    source = "Tracked"
                 results["people"] = people
                 
                 detection_time = time.time() - detection_start
                 logger.info(
-                    f"Camera {self.camera_id}: Detected {len(people)} people in {detection_time:.3f}s",
+                    f"Camera {self.camera_id}: {source} {len(people)} people in {detection_time:.3f}s",
                     extra={"camera_id": self.camera_id, "detection": True, "people_count": len(people)}
                 )
                 
@@ -666,6 +893,10 @@ class StreamProcessor:
             if self.draw_timestamps:
                 processed_frame = overlay_timestamp(processed_frame)
             
+            # Nothing was drawn: take the single copy needed to outlive the slot
+            if processed_frame is frame:
+                processed_frame = frame.copy()
+            
             # Check notification triggers for the results
             # This needs to be done in a non-blocking way to avoid slowing down the pipeline
             if self.check_notification_triggers:
@@ -709,7 +940,33 @@ class StreamProcessor:
                 f"(after {total_time:.3f}s)",
                 extra={"camera_id": self.camera_id, "error": True, "processing_time": total_time}
             )
-            return frame, {}
+            return frame.copy(), {}
+    
+    def _render_previous_results(self, frame: np.ndarray) -> np.ndarray:
+        """Draw the last inference results on a frame that skipped inference"""
+        processed_frame = frame
+        results = self.detection_results
+        
+        if self.draw_detections:
+            if results.get("people"):
+                processed_frame = draw_bounding_boxes(
+                    processed_frame, results["people"], color=(0, 255, 0), label_key="class_name"
+                )
+            if results.get("faces"):
+                processed_frame = draw_bounding_boxes(
+                    processed_frame, results["faces"], color=(255, 0, 0), label_key="person_name"
+                )
+            if results.get("templates"):
+                processed_frame = draw_bounding_boxes(
+                    processed_frame, results["templates"], color=(0, 255, 255), label_key="template_name"
+                )
+        
+        if self.draw_timestamps:
+            processed_frame = overlay_timestamp(processed_frame)
+        
+        if processed_frame is frame:
+            processed_frame = frame.copy()
+        return processed_frame
     
     async def get_latest_frame(self) -> Optional[Tuple[np.ndarray, float]]:
         """Get the latest processed frame or raw frame if processing is disabled"""
@@ -718,16 +975,15 @@ class StreamProcessor:
             if not self.processed_frame_queue.empty():
                 return self.processed_frame_queue.queue[-1]
             
-            # If no processed frames, try raw frames
-            if not self.raw_frame_queue.empty():
-                return self.raw_frame_queue.queue[-1]
-            
-            # If both queues empty, use cached frames
+            # If no processed frames, use cached frames
             if self.latest_processed_frame is not None:
                 return (self.latest_processed_frame, self.latest_processed_timestamp)
             
-            if self.latest_raw_frame is not None:
-                return (self.latest_raw_frame, self.latest_raw_timestamp)
+            # Fall back to the latest raw frame; copy it since the slot will be recycled
+            frame_ref = self.frame_ring.acquire_latest()
+            if frame_ref is not None:
+                with frame_ref:
+                    return (frame_ref.frame.copy(), frame_ref.timestamp)
             
             # No frames available
             return None
@@ -736,39 +992,108 @@ class StreamProcessor:
             logger.exception(f"Error getting latest frame for camera {self.camera_id}: {str(e)}")
             return None
     
-    async def get_latest_frame_jpeg(self, quality: int = 90) -> Optional[bytes]:
+    def acquire_latest_frame(self) -> Optional[FrameRef]:
         """
-        Get the latest frame as JPEG bytes
+        Get the latest processed frame, or the latest raw frame, without copying
         
-        Note: This is only used for snapshot functionality and debugging,
-        not for streaming to frontend.
+        The caller must release the returned reference once done with it.
+        """
+        if self.latest_processed_frame is not None:
+            return FrameRef(
+                None, -1, 0, self.processed_frame_seq,
+                self.latest_processed_timestamp, self.latest_processed_frame
+            )
+        
+        return self.frame_ring.acquire_latest()
+    
+    def _latest_frame_key(self) -> Optional[Tuple[str, int]]:
+        """Identity of the frame acquire_latest_frame would return, or None"""
+        if self.latest_processed_frame is not None:
+            return ("p", self.processed_frame_seq)
+        
+        seq = self.frame_ring.latest_seq
+        return ("r", seq) if seq >= 0 else None
+    
+    def match_jpeg_etag(
+        self,
+        if_none_match: Optional[str],
+        quality: int = 90,
+        width: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Check a client's If-None-Match against the latest frame, without encoding it
+        
+        Returns:
+            The ETag if the client's copy is still current, otherwise None
         """
-        frame_data = await self.get_latest_frame()
-        if not frame_data:
+        frame_key = self._latest_frame_key()
+        if not if_none_match or frame_key is None:
             return None
         
-        frame, _ = frame_data
+        etag = self.jpeg_cache.etag(frame_key, quality, width)
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        if etag in candidates or f"W/{etag}" in candidates or "*" in candidates:
+            self.jpeg_cache.not_modified += 1
+            return etag
+        return None
+    
+    async def get_latest_jpeg(
+        self,
+        quality: int = 90,
+        width: Optional[int] = None
+    ) -> Optional[Tuple[bytes, str]]:
+        """
+        Get the latest frame as JPEG bytes, encoding each frame variant at most once
         
-        try:
+        Args:
+            quality: JPEG quality
+            width: Resize to this width (keeping the aspect ratio), None for full size
+        
+        Returns:
+            Tuple of (JPEG bytes, ETag) or None if no frame is available
+        """
+        frame_ref = self.acquire_latest_frame()
+        if frame_ref is None:
+            return None
+        
+        if frame_ref.frame is self.latest_processed_frame:
+            frame_key = ("p", frame_ref.seq)
+        else:
+            frame_key = ("r", frame_ref.seq)
+        frame = frame_ref.frame
+        
+        # Need to define this as a separate function for the executor
+        def encode_frame():
+            image = frame
+            if width and width < image.shape[1]:
+                height = max(1, int(image.shape[0] * width / image.shape[1]))
+                image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+            _, jpeg_data = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+            return jpeg_data.tobytes()
+        
+        async def encode():
             # Run the JPEG encoding in the executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
-            
-            # Need to define this as a separate function for the executor
-            def encode_frame(frame, encode_param):
-                _, jpeg_data = cv2.imencode('.jpg', frame, encode_param)
-                return jpeg_data.tobytes()
-            
-            # Run in executor
-            jpeg_bytes = await loop.run_in_executor(
-                self.executor, encode_frame, frame, encode_param
-            )
-            
-            return jpeg_bytes
-            
+            return await asyncio.get_running_loop().run_in_executor(self.executor, encode_frame)
+        
+        try:
+            return await self.jpeg_cache.get(frame_key, quality, width, encode)
+        
         except Exception as e:
             logger.exception(f"Error encoding JPEG for camera {self.camera_id}: {str(e)}")
             return None
+        
+        finally:
+            frame_ref.release()
+    
+    async def get_latest_frame_jpeg(self, quality: int = 90) -> Optional[bytes]:
+        """
+        Get the latest frame as JPEG bytes
+        
+        Note: This is only used for snapshot functionality and debugging,
+        not for streaming to frontend.
+        """
+        result = await self.get_latest_jpeg(quality)
+        return result[0] if result else None
     
     def get_detection_results(self) -> Dict[str, Any]:
         """Get the latest detection results"""
@@ -822,14 +1147,33 @@ class StreamProcessor:
             "processing": self.processing,
             "fps": self.fps,
             "processing_fps": self.processing_fps_actual,
+            "target_fps": min(self.target_fps, self.processing_fps),
+            "configured_fps": self.processing_fps,
+            "pipeline_latency": self.avg_pipeline_latency,
+            "rate_priority": self.rate_priority,
             "frames_captured": self.frames_captured,
             "frames_processed": self.frames_processed,
             "connection_errors": self.connection_errors,
             "consecutive_errors": self.consecutive_errors,
             "last_frame_time": self.last_frame_time,
             "last_processed_time": self.last_processed_time,
+            "capture_mode": self.capture_mode,
+            "frames_overwritten": self.frames_overwritten,
+            "frames_dropped": self.frames_dropped,
+            "capture_latency": self.capture_latency,
+            "avg_capture_latency": self.avg_capture_latency,
             "raw_frame_queue_size": self.raw_frame_queue.qsize(),
             "processed_frame_queue_size": self.processed_frame_queue.qsize(),
+            "frame_ring": self.frame_ring.get_stats(),
+            "ingest_relay": self.ingest_relay.get_stats() if self.ingest_relay else None,
+            "jpeg_cache": self.jpeg_cache.get_stats(),
+            "live_viewers": self.live_viewers,
+            "motion": self.motion_gate.get_stats() if self.motion_gate else None,
+            "person_tracking": self.person_tracker.get_stats() if self.person_tracker else None,
+            "face_tracking": (
+                self.face_recognizer.get_track_stats(self.camera_id)
+                if self.face_recognizer else None
+            ),
             "features": {
                 "detect_people": self.detect_people,
                 "count_people": self.count_people,
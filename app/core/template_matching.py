@@ -7,11 +7,12 @@ import logging
 import asyncio
 import time
 from typing import List, Dict, Any, Optional, Tuple
-from sqlalchemy import select, insert
+from sqlalchemy import select
 from app.config import settings
 from app.database import get_db
 from app.models.template import Template
-from app.models.event import Event, EventType
+from app.models.event import EventType
+from app.services.event_writer import get_event_writer
 
 logger = logging.getLogger(__name__)
 
@@ -261,10 +262,10 @@ class TemplateMatcher:
                         })
                         
                         # Log template match event
-                        asyncio.create_task(self._log_template_match(
+                        await self._log_template_match(
                             template_id=template_id,
                             confidence=confidence
-                        ))
+                        )
             
             # Sort matches by confidence (descending)
             matches.sort(key=lambda x: x["confidence"], reverse=True)
@@ -304,19 +305,15 @@ class TemplateMatcher:
         return overlap_percentage > 0.5
     
     async def _log_template_match(self, template_id: int, confidence: float):
-        """Log a template match event in the database"""
+        """Queue a template match event for the database"""
         try:
-            async for session in get_db():
-                # Create a new event for the template match
-                await session.execute(
-                    insert(Event).values(
-                        event_type=EventType.TEMPLATE_MATCHED,
-                        camera_id=self.camera_id,
-                        template_id=template_id,
-                        confidence=confidence
-                    )
-                )
-                await session.commit()
+            event_writer = await get_event_writer()
+            await event_writer.write(
+                EventType.TEMPLATE_MATCHED,
+                camera_id=self.camera_id,
+                template_id=template_id,
+                confidence=confidence
+            )
         except Exception as e:
             logger.exception(f"Error logging template match: {str(e)}")
     
@@ -6,10 +6,12 @@ import logging
 from app.config import settings
 from app.database import init_db, get_db
 from app.api import cameras, templates, people_counting, face_recognition, settings as app_settings
-from app.api import notifications, hls
+from app.api import notifications, hls, live, recordings
 from app.models.camera import Camera
 from app.utils.logging_config import setup_logging
 from app.services.notification_service import get_notification_service
+from app.services.event_writer import get_event_writer
+from app.services.recording_manager import get_recording_manager
 from starlette.responses import FileResponse
 
 # Setup detailed logging
@@ -44,6 +46,8 @@ app.include_router(face_recognition.router, prefix="/api/faces", tags=["face-rec
 app.include_router(app_settings.router, prefix="/api/settings", tags=["settings"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["notifications"])
 app.include_router(hls.router, prefix="/api/hls", tags=["hls"])
+app.include_router(live.router, prefix="/api", tags=["live"])
+app.include_router(recordings.router, prefix="/api/recordings", tags=["recordings"])
 
 # Use regular StaticFiles instead of custom StaticFilesCORS
 # The global CORS middleware will handle the CORS headers
@@ -69,6 +73,11 @@ async def startup_event():
         camera_manager = await get_camera_manager()
         await camera_manager.initialize()
         
+        # Start batched event writer
+        logger.info("Starting event writer")
+        event_writer = await get_event_writer()
+        await event_writer.start()
+        
         # Initialize notification service
         logger.info("Initializing notification service")
         notification_service = await get_notification_service()
@@ -78,6 +87,11 @@ async def startup_event():
         from app.api.hls import start_cleanup_task
         await start_cleanup_task()
         
+        # Load the recording index and start quota enforcement
+        logger.info("Starting recording manager")
+        recording_manager = await get_recording_manager()
+        await recording_manager.start()
+        
         # Start processing for all enabled cameras
         logger.info("Starting processing for enabled cameras")
         async for session in get_db():
@@ -102,6 +116,9 @@ async def startup_event():
                     # Add camera to manager and start AI processing
                     logger.info(f"Starting processing for camera {camera.id}: {camera.name}")
                     await camera_manager.add_camera(camera, start_processing=True)
+                
+                # Continuous recording does not depend on AI processing
+                await recording_manager.sync_camera(camera)
         
         # Debug log of available cameras
         logger.info(f"Available Cameras: {camera_manager.cameras.keys()}")
@@ -117,10 +134,18 @@ async def shutdown_event():
     """Release resources on shutdown"""
     logger.info("Application shutting down")
     try:
+        # Stop recorders before the ingest relays they read from
+        recording_manager = await get_recording_manager()
+        await recording_manager.stop()
+        
         from app.core.camera_manager import get_camera_manager
         camera_manager = await get_camera_manager()
         await camera_manager.shutdown()
         logger.info("Camera manager shutdown complete")
+        
+        # Flush queued events after the cameras have stopped producing them
+        event_writer = await get_event_writer()
+        await event_writer.stop()
     except Exception as e:
         logger.exception(f"Error during shutdown: {str(e)}")
     logger.info("Application shutdown complete")
@@ -21,12 +21,14 @@ class Camera(Base):
     enabled = Column(Boolean, default=True)
     processing_fps = Column(Integer, default=5)
     streaming_fps = Column(Integer, default=30)
+    hls_renditions = Column(Integer, default=1)  # HLS qualities; more than one enables the ABR ladder
     
     # Feature flags
     detect_people = Column(Boolean, default=True)
     count_people = Column(Boolean, default=True)
     recognize_faces = Column(Boolean, default=False)
     template_matching = Column(Boolean, default=False)
+    continuous_recording = Column(Boolean, default=False)
     
     # Relationships
     templates = relationship("Template", back_populates="camera", cascade="all, delete-orphan")
@@ -46,10 +48,12 @@ class CameraBase(BaseModel):
     description: Optional[str] = None
     processing_fps: int = 5
     streaming_fps: int = 30
+    hls_renditions: Optional[int] = 1
     detect_people: bool = True
     count_people: bool = True
     recognize_faces: bool = False
     template_matching: bool = False
+    continuous_recording: Optional[bool] = False
 
 class CameraCreate(CameraBase):
     """Camera creation schema"""
@@ -64,10 +68,12 @@ class CameraUpdate(BaseModel):
     enabled: Optional[bool] = None
     processing_fps: Optional[int] = None
     streaming_fps: Optional[int] = None
+    hls_renditions: Optional[int] = None
     detect_people: Optional[bool] = None
     count_people: Optional[bool] = None
     recognize_faces: Optional[bool] = None
     template_matching: Optional[bool] = None
+    continuous_recording: Optional[bool] = None
 
 class CameraResponse(CameraBase):
     """Camera response schema"""
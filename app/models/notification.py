@@ -87,6 +87,9 @@ class NotificationEvent(Base):
     
     # Snapshot of the event
     snapshot_path = Column(String, nullable=True)
+    
+    # Video from before to after the event (attached once the post-event part is recorded)
+    clip_path = Column(String, nullable=True)
 
 # Pydantic models for API
 class ConditionParamsBase(BaseModel):
@@ -231,6 +234,7 @@ class NotificationEventResponse(BaseModel):
     sent_successfully: bool
     delivery_error: Optional[str] = None
     snapshot_path: Optional[str] = None
+    clip_path: Optional[str] = None
     
     class Config:
         orm_mode = True
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Table, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Table, JSON, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from typing import Optional, List, Dict, Any
@@ -16,7 +16,8 @@ class Person(Base):
     
     # Face recognition data
     face_image_path = Column(String, nullable=False)
-    face_encoding = Column(JSON, nullable=True)  # Stored as JSON
+    face_encoding = Column(JSON, nullable=True)  # Legacy JSON encoding, migrated to the blob on load
+    face_encoding_blob = Column(LargeBinary, nullable=True)  # float32 bytes
     
     # Events related to this person
     events = relationship("Event", back_populates="person", cascade="all, delete-orphan")
@@ -0,0 +1,77 @@
+import logging
+import asyncio
+import os
+import subprocess
+import time
+from typing import Optional
+
+from app.config import settings
+from app.core.camera_manager import get_camera_manager
+
+logger = logging.getLogger(__name__)
+
+async def capture_event_clip(camera_id: int, event_time: float, filename: str) -> Optional[str]:
+    """
+    Cut a clip around an event from the camera's ingest relay packet ring
+    
+    Waits until EVENT_CLIP_POST_SECONDS after the event, then remuxes the
+    buffered MPEG-TS from EVENT_CLIP_PRE_SECONDS before it (plus the keyframe
+    margin) into an MP4 with FFmpeg. Nothing is decoded or encoded.
+    
+    Args:
+        camera_id: ID of the camera
+        event_time: Time of the event (epoch seconds)
+        filename: Name of the clip file in CLIPS_DIR
+    
+    Returns:
+        Path of the clip, or None if the camera has no packet ring or muxing failed
+    """
+    camera_manager = await get_camera_manager()
+    relay = camera_manager.ingest_relays.get(camera_id)
+    if relay is None or not relay.ring_seconds:
+        logger.debug(f"No packet ring for camera {camera_id}; event clip skipped")
+        return None
+    
+    # Wait for the post-event part to arrive
+    delay = event_time + settings.EVENT_CLIP_POST_SECONDS - time.time()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    
+    data = relay.packets_between(
+        event_time - settings.EVENT_CLIP_PRE_SECONDS - settings.EVENT_CLIP_KEYFRAME_MARGIN,
+        event_time + settings.EVENT_CLIP_POST_SECONDS
+    )
+    if not data:
+        logger.warning(f"Packet ring of camera {camera_id} has no video around the event")
+        return None
+    
+    os.makedirs(settings.CLIPS_DIR, exist_ok=True)
+    path = os.path.join(settings.CLIPS_DIR, filename)
+    
+    process = await asyncio.create_subprocess_exec(
+        settings.FFMPEG_PATH,
+        '-loglevel', 'error',
+        '-f', 'mpegts',
+        '-i', 'pipe:0',
+        '-c', 'copy',                 # Remux only; leading non-keyframes are dropped
+        '-movflags', '+faststart',
+        '-y', path,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    _, stderr = await process.communicate(data)
+    
+    if process.returncode != 0:
+        logger.error(
+            f"Failed to write event clip for camera {camera_id}: "
+            f"{stderr.decode('utf-8', errors='replace').strip()}"
+        )
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    
+    logger.info(f"Saved event clip for camera {camera_id}: {path} ({len(data) / 1024:.0f} KB of video)")
+    return path
\ No newline at end of file
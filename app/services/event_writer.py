@@ -0,0 +1,209 @@
+import logging
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple
+from sqlalchemy import insert
+
+from app.models.event import Event, EventType
+from app.config import settings
+from app.database import get_db
+
+logger = logging.getLogger(__name__)
+
+# Event types that repeat every frame while a detection persists
+COALESCED_EVENT_TYPES = {EventType.FACE_DETECTED, EventType.TEMPLATE_MATCHED}
+
+# Queued by stop(): the flush loop writes the batch it holds and exits
+_STOP = object()
+
+class EventWriter:
+    """
+    Central sink for Event rows.
+    
+    Rows are queued and written in bulk transactions when either batch_size
+    rows are waiting or flush_interval has passed. The queue is bounded, so
+    producers wait when the database falls behind. Repeated detections of the
+    same person or template on the same camera within coalesce_seconds are
+    written once.
+    """
+    def __init__(
+        self,
+        max_queue_size: int = settings.EVENT_QUEUE_SIZE,
+        batch_size: int = settings.EVENT_BATCH_SIZE,
+        flush_interval: float = settings.EVENT_FLUSH_INTERVAL,
+        coalesce_seconds: float = settings.EVENT_COALESCE_SECONDS
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.coalesce_seconds = coalesce_seconds
+        
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queue_size))
+        self._last_written: Dict[Tuple, float] = {}  # {coalescing key: time}
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        
+        # Statistics
+        self.events_written = 0
+        self.events_coalesced = 0
+        self.events_failed = 0
+        self.batches_written = 0
+        self.last_batch_size = 0
+    
+    async def start(self):
+        """Start the flush loop"""
+        if self.running:
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Event writer started (batch {self.batch_size}, every {self.flush_interval}s, "
+            f"coalescing {self.coalesce_seconds}s)"
+        )
+    
+    async def stop(self):
+        """Stop the flush loop and write whatever is still queued"""
+        if not self.running:
+            return
+        # New rows are written directly from here on
+        self.running = False
+        
+        if self._task:
+            # Not cancelled: the loop may be holding dequeued rows or be mid-write
+            await self.queue.put(_STOP)
+            await self._task
+            self._task = None
+        
+        # Rows from producers that were waiting for queue space
+        rows = []
+        while not self.queue.empty():
+            row = self.queue.get_nowait()
+            if row is not _STOP:
+                rows.append(row)
+        if rows:
+            await self._write_rows(rows)
+        
+        logger.info(f"Event writer stopped ({self.events_written} events written)")
+    
+    async def write(
+        self,
+        event_type: EventType,
+        camera_id: int,
+        person_id: Optional[int] = None,
+        template_id: Optional[int] = None,
+        confidence: Optional[float] = None,
+        occupancy_count: Optional[int] = None,
+        snapshot_path: Optional[str] = None
+    ):
+        """
+        Queue an event row
+        
+        Waits for space when the queue is full. Before the writer is started,
+        the row is inserted directly.
+        """
+        current_time = time.time()
+        
+        if event_type in COALESCED_EVENT_TYPES and self.coalesce_seconds > 0:
+            key = (event_type, camera_id, person_id, template_id)
+            last_time = self._last_written.get(key)
+            if last_time is not None and current_time - last_time < self.coalesce_seconds:
+                self.events_coalesced += 1
+                return
+            self._last_written[key] = current_time
+        
+        row = {
+            "event_type": event_type,
+            "camera_id": camera_id,
+            "person_id": person_id,
+            "template_id": template_id,
+            "confidence": confidence,
+            "occupancy_count": occupancy_count,
+            "snapshot_path": snapshot_path,
+            # Time of the detection, not of the flush
+            "timestamp": datetime.now(timezone.utc)
+        }
+        
+        if not self.running:
+            await self._write_rows([row])
+            return
+        
+        await self.queue.put(row)
+    
+    async def _run(self):
+        """Flush loop; returns after writing its batch once stop() queues _STOP"""
+        stopping = False
+        while not stopping:
+            try:
+                # Wait for the first row, then collect until the batch fills or the interval ends
+                row = await self.queue.get()
+                if row is _STOP:
+                    return
+                rows = [row]
+                deadline = time.time() + self.flush_interval
+                
+                while len(rows) < self.batch_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        row = await asyncio.wait_for(self.queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    if row is _STOP:
+                        stopping = True
+                        break
+                    rows.append(row)
+                
+                await self._write_rows(rows)
+                self._prune_coalescing()
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error in event writer loop: {str(e)}")
+                await asyncio.sleep(1.0)
+    
+    async def _write_rows(self, rows: List[Dict[str, Any]]):
+        """Insert rows in a single transaction"""
+        try:
+            async for session in get_db():
+                await session.execute(insert(Event), rows)
+                await session.commit()
+            
+            self.events_written += len(rows)
+            self.batches_written += 1
+            self.last_batch_size = len(rows)
+        except Exception as e:
+            self.events_failed += len(rows)
+            logger.exception(f"Error writing {len(rows)} events: {str(e)}")
+    
+    def _prune_coalescing(self):
+        """Forget coalescing keys whose window has passed"""
+        if len(self._last_written) < 1000:
+            return
+        cutoff = time.time() - self.coalesce_seconds
+        self._last_written = {
+            key: last_time for key, last_time in self._last_written.items() if last_time >= cutoff
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get writer statistics"""
+        return {
+            "running": self.running,
+            "queue_size": self.queue.qsize(),
+            "events_written": self.events_written,
+            "events_coalesced": self.events_coalesced,
+            "events_failed": self.events_failed,
+            "batches_written": self.batches_written,
+            "last_batch_size": self.last_batch_size
+        }
+
+# Singleton instance
+_event_writer = None
+
+async def get_event_writer() -> EventWriter:
+    """Get or create the event writer singleton"""
+    global _event_writer
+    if _event_writer is None:
+        _event_writer = EventWriter()
+    return _event_writer
\ No newline at end of file
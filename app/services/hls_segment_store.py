@@ -0,0 +1,146 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Union
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_SUFFIXES = (".m3u8", ".mpd")
+
+def stream_prefix(filename: str) -> str:
+    """Segment name without its number, one per rendition ("chunk-stream1-", "1_", "")"""
+    return re.sub(r"\d+\.\w+$", "", filename)
+
+class HlsSegmentStore:
+    """
+    In-memory playlists and segments for HLS sessions.
+    
+    FFmpeg uploads each file over HTTP PUT instead of writing to disk, and
+    the API serves them straight from memory. Playlists are kept until the
+    session ends. Segments of each rendition are evicted oldest first once it
+    holds max_segments, or its playlist window + 2 if that is larger, so
+    memory per camera is bounded even if FFmpeg never sends its DELETE
+    requests, and segments still listed in a playlist are never evicted.
+    """
+    def __init__(self, max_segments: int = settings.HLS_MEMORY_MAX_SEGMENTS):
+        self.max_segments = max(2, max_segments)
+        self._playlists: Dict[str, Dict[str, bytes]] = {}
+        # Segments still being uploaded are bytearrays that grow in place
+        self._segments: Dict[str, "OrderedDict[str, Tuple[Union[bytes, bytearray], float]]"] = {}
+        self._limits: Dict[str, int] = {}  # Segments kept per rendition
+        
+        # Statistics
+        self.segments_evicted = 0
+    
+    def open_session(self, session_id: str, playlist_window: int = 0):
+        """
+        Start accepting files for a session
+        
+        Args:
+            session_id: ID of the session
+            playlist_window: Segments FFmpeg keeps listed per playlist
+        """
+        self._playlists.setdefault(session_id, {})
+        self._segments.setdefault(session_id, OrderedDict())
+        # Listed segments, one being written and one a player may still be fetching
+        self._limits[session_id] = max(self.max_segments, playlist_window + 2)
+    
+    def close_session(self, session_id: str):
+        """Drop all files of a session"""
+        self._playlists.pop(session_id, None)
+        self._segments.pop(session_id, None)
+        self._limits.pop(session_id, None)
+    
+    def has_session(self, session_id: str) -> bool:
+        return session_id in self._segments
+    
+    def put(self, session_id: str, filename: str, data: Union[bytes, bytearray]) -> bool:
+        """
+        Store an uploaded file
+        
+        Returns:
+            True if stored, False if the session is not open
+        """
+        if session_id not in self._segments:
+            return False
+        
+        if filename.endswith(PLAYLIST_SUFFIXES):
+            self._playlists[session_id][filename] = data
+            return True
+        
+        segments = self._segments[session_id]
+        segments.pop(filename, None)
+        segments[filename] = (data, time.time())
+        
+        # Init segments (fMP4) are needed for the whole session
+        if filename.startswith("init"):
+            return True
+        prefix = stream_prefix(filename)
+        rendition = [name for name in segments if not name.startswith("init") and stream_prefix(name) == prefix]
+        for oldest in rendition[:max(0, len(rendition) - self._limits[session_id])]:
+            del segments[oldest]
+            self.segments_evicted += 1
+        return True
+    
+    def append(self, session_id: str, filename: str, chunk: bytes) -> bool:
+        """
+        Extend a segment that is still being uploaded, creating it on the first chunk
+        
+        Returns:
+            True if stored, False if the session is not open
+        """
+        segments = self._segments.get(session_id)
+        if segments is None:
+            return False
+        entry = segments.get(filename)
+        if entry is None or not isinstance(entry[0], bytearray):
+            return self.put(session_id, filename, bytearray(chunk))
+        entry[0].extend(chunk)
+        return True
+    
+    def finalize(self, session_id: str, filename: str) -> bool:
+        """
+        Freeze a segment whose upload has finished
+        
+        Returns:
+            True if the segment is stored, False if the session is not open
+        """
+        segments = self._segments.get(session_id)
+        if segments is None:
+            return False
+        entry = segments.get(filename)
+        if entry is None:
+            # Evicted during the upload, or nothing was sent
+            return True
+        if isinstance(entry[0], bytearray):
+            segments[filename] = (bytes(entry[0]), entry[1])
+        return True
+    
+    def get(self, session_id: str, filename: str) -> Optional[Union[bytes, bytearray]]:
+        """Get a stored playlist or segment (a live bytearray while it is being uploaded)"""
+        if filename.endswith(PLAYLIST_SUFFIXES):
+            return self._playlists.get(session_id, {}).get(filename)
+        entry = self._segments.get(session_id, {}).get(filename)
+        return entry[0] if entry else None
+    
+    def delete(self, session_id: str, filename: str):
+        """Remove a file FFmpeg no longer lists"""
+        self._playlists.get(session_id, {}).pop(filename, None)
+        self._segments.get(session_id, {}).pop(filename, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get store statistics"""
+        return {
+            "sessions": len(self._segments),
+            "segments": sum(len(segments) for segments in self._segments.values()),
+            "bytes": sum(
+                len(data) for segments in self._segments.values() for data, _ in segments.values()
+            ) + sum(
+                len(data) for playlists in self._playlists.values() for data in playlists.values()
+            ),
+            "max_segments_per_rendition": self.max_segments,
+            "segments_evicted": self.segments_evicted
+        }
\ No newline at end of file
@@ -0,0 +1,274 @@
+import logging
+import struct
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Parts stay listed for this many of the newest complete segments
+PART_SEGMENTS = 3
+
+# Fragments end on the first frame after the part time, so parts run up to a
+# frame over it; PART-TARGET leaves this much headroom (seconds) for that
+PART_TARGET_HEADROOM = 0.2
+
+# ISO BMFF sample flag: sample_is_non_sync_sample
+NON_SYNC_SAMPLE = 0x10000
+
+class Part(NamedTuple):
+    """One fMP4 fragment (moof + mdat) of a segment, addressed by byte range"""
+    offset: int
+    length: int
+    duration: float
+    independent: bool
+
+class PlaylistState(NamedTuple):
+    """What a media playlist currently lists, for blocking playlist reload"""
+    last_msn: int       # Last complete segment, -1 if none
+    partial_msn: int    # Segment still being written, -1 if none
+    partial_parts: int  # Complete parts of that segment
+
+def _boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[bytes, int, int]]:
+    """(type, payload start, box end) of the complete boxes in data[start:end]"""
+    end = len(data) if end is None else end
+    position = start
+    while position + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, position)
+        header = 8
+        if size == 1:
+            if position + 16 > end:
+                break
+            size = struct.unpack_from(">Q", data, position + 8)[0]
+            header = 16
+        if size < header or position + size > end:
+            # Still being written (or size 0, "until end of file")
+            break
+        yield box_type, position + header, position + size
+        position += size
+
+def _find_box(data: bytes, path: Tuple[bytes, ...], start: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """Payload range of the first box along a path of box types"""
+    for box_type, payload, box_end in _boxes(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload, box_end
+            return _find_box(data, path[1:], payload, box_end)
+    return None
+
+def _uint32(data: bytes, position: int) -> int:
+    return struct.unpack_from(">I", data, position)[0]
+
+def init_timescale(data: bytes) -> Optional[int]:
+    """Media timescale of the (single) track in an fMP4 init segment"""
+    mdhd = _find_box(data, (b"moov", b"trak", b"mdia", b"mdhd"))
+    if mdhd is None:
+        return None
+    version = data[mdhd[0]]
+    return _uint32(data, mdhd[0] + (20 if version == 1 else 12))
+
+def _fragment_info(data: bytes, start: int, end: int) -> Tuple[int, bool]:
+    """Duration (timescale units) of a moof and whether it starts with a sync sample"""
+    traf = _find_box(data, (b"traf",), start, end)
+    if traf is None:
+        return 0, False
+    
+    default_duration = 0
+    default_flags = 0
+    tfhd = _find_box(data, (b"tfhd",), *traf)
+    if tfhd is not None:
+        flags = _uint32(data, tfhd[0]) & 0xFFFFFF
+        position = tfhd[0] + 8  # version/flags, track_ID
+        if flags & 0x01:
+            position += 8       # base_data_offset
+        if flags & 0x02:
+            position += 4       # sample_description_index
+        if flags & 0x08:
+            default_duration = _uint32(data, position)
+            position += 4
+        if flags & 0x10:
+            position += 4       # default_sample_size
+        if flags & 0x20:
+            default_flags = _uint32(data, position)
+    
+    duration = 0
+    first_sample_flags = None
+    for box_type, payload, _ in _boxes(data, *traf):
+        if box_type != b"trun":
+            continue
+        flags = _uint32(data, payload) & 0xFFFFFF
+        count = _uint32(data, payload + 4)
+        position = payload + 8
+        if flags & 0x001:
+            position += 4       # data_offset
+        if flags & 0x004 and first_sample_flags is None:
+            first_sample_flags = _uint32(data, position)
+        if flags & 0x004:
+            position += 4
+        
+        sample_size = 4 * bin(flags & 0xF00).count("1")
+        for index in range(count):
+            field = position + index * sample_size
+            if flags & 0x100:
+                duration += _uint32(data, field)
+                field += 4
+            else:
+                duration += default_duration
+            if index == 0 and first_sample_flags is None and flags & 0x400:
+                first_sample_flags = _uint32(data, field + (4 if flags & 0x200 else 0))
+    
+    if first_sample_flags is None:
+        first_sample_flags = default_flags
+    return duration, not first_sample_flags & NON_SYNC_SAMPLE
+
+def segment_parts(data: bytes, timescale: int) -> List[Part]:
+    """
+    Complete parts of an fMP4 segment, which may still be growing
+    
+    A part runs from the end of the previous one (the segment start for the
+    first, so it includes styp) to the end of its mdat.
+    """
+    parts = []
+    part_start = 0
+    duration, independent = 0, False
+    for box_type, payload, box_end in _boxes(data):
+        if box_type == b"moof":
+            duration, independent = _fragment_info(data, payload, box_end)
+        elif box_type == b"mdat":
+            parts.append(Part(part_start, box_end - part_start, duration / timescale, independent))
+            part_start = box_end
+    return parts
+
+class LowLatencyPlaylist:
+    """
+    Turns the DASH muxer's LHLS media playlists into LL-HLS.
+    
+    FFmpeg (-lhls) rewrites a media playlist once per segment and announces
+    the segment being written with #EXT-X-PREFETCH. On every request this
+    adds what players need for LL-HLS: EXT-X-SERVER-CONTROL (blocking
+    reload), EXT-X-PART-INF and one EXT-X-PART per fMP4 fragment, as a byte
+    range of its segment file, for the newest segments and the one in
+    progress. Parts of complete segments are cached.
+    
+    PART-TARGET may not change during a session, so it is fixed up front from
+    the configured part time; longer parts are clamped to it and logged.
+    """
+    def __init__(self, part_time: float):
+        self.part_target = round(part_time + PART_TARGET_HEADROOM, 3)
+        self._overlong_logged = False
+        self._timescales: Dict[str, int] = {}
+        self._parts: Dict[str, List[Part]] = {}
+    
+    def _segment_parts(self, filename: str, init: Optional[str], read: Callable[[str], Optional[bytes]], complete: bool) -> List[Part]:
+        if filename in self._parts:
+            return self._parts[filename]
+        if init is None:
+            return []
+        
+        timescale = self._timescales.get(init)
+        if timescale is None:
+            init_data = read(init)
+            timescale = init_timescale(init_data) if init_data else None
+            if not timescale:
+                return []
+            self._timescales[init] = timescale
+        
+        data = read(filename)
+        if data is None:
+            return []
+        parts = segment_parts(data, timescale)
+        longest = max((part.duration for part in parts), default=0.0)
+        if longest > self.part_target:
+            if not self._overlong_logged:
+                logger.warning(
+                    f"Part of {filename} lasts {longest:.3f}s, over PART-TARGET {self.part_target:.3f}s; "
+                    f"clamping part durations (lower the keyframe interval or raise HLS_PART_TIME)"
+                )
+                self._overlong_logged = True
+            parts = [part._replace(duration=min(part.duration, self.part_target)) for part in parts]
+        if complete:
+            self._parts[filename] = parts
+        return parts
+    
+    def render(self, playlist: str, read: Callable[[str], Optional[bytes]]) -> Tuple[str, PlaylistState]:
+        """
+        Rewrite an LHLS media playlist as LL-HLS
+        
+        Args:
+            playlist: Playlist written by FFmpeg
+            read: Returns the current contents of a file of the session
+        
+        Returns:
+            Tuple of (LL-HLS playlist, what it lists)
+        """
+        header: List[str] = []
+        segments: List[Tuple[List[str], str]] = []
+        tags: List[str] = []
+        init = None
+        prefetch = None
+        media_sequence = 0
+        ended = False
+        
+        for line in playlist.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("#EXT-X-PREFETCH:"):
+                prefetch = line.split(":", 1)[1]
+            elif line.startswith("#EXT-X-PREFETCH-DISCONTINUITY"):
+                continue
+            elif line.startswith("#EXT-X-ENDLIST"):
+                ended = True
+            elif line.startswith(("#EXTINF", "#EXT-X-PROGRAM-DATE-TIME", "#EXT-X-DISCONTINUITY")):
+                tags.append(line)
+            elif line.startswith("#"):
+                if line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+                    media_sequence = int(line.split(":", 1)[1])
+                elif line.startswith("#EXT-X-MAP:") and 'URI="' in line:
+                    init = line.split('URI="', 1)[1].split('"', 1)[0]
+                elif line.startswith("#EXT-X-VERSION:"):
+                    line = "#EXT-X-VERSION:9"
+                header.append(line)
+            else:
+                segments.append((tags, line))
+                tags = []
+        
+        body: List[str] = []
+        for index, (segment_tags, uri) in enumerate(segments):
+            if index >= len(segments) - PART_SEGMENTS:
+                body.extend(self._part_tags(uri, self._segment_parts(uri, init, read, complete=True)))
+            body.extend(segment_tags)
+            body.append(uri)
+        
+        partial_parts: List[Part] = []
+        if prefetch and not ended:
+            partial_parts = self._segment_parts(prefetch, init, read, complete=False)
+            body.extend(self._part_tags(prefetch, partial_parts))
+        if ended:
+            body.append("#EXT-X-ENDLIST")
+        
+        # Forget segments that left the playlist
+        listed = {uri for _, uri in segments}
+        self._parts = {name: parts for name, parts in self._parts.items() if name in listed}
+        
+        server_control = [
+            f"#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,PART-HOLD-BACK={3 * self.part_target:.3f}",
+            f"#EXT-X-PART-INF:PART-TARGET={self.part_target:.3f}"
+        ]
+        # Right after #EXTM3U / #EXT-X-VERSION
+        insert_at = next((i + 1 for i, line in enumerate(header) if line.startswith("#EXT-X-VERSION")), min(1, len(header)))
+        header[insert_at:insert_at] = server_control
+        
+        last_msn = media_sequence + len(segments) - 1 if segments else -1
+        state = PlaylistState(
+            last_msn=last_msn,
+            partial_msn=media_sequence + len(segments) if prefetch and not ended else -1,
+            partial_parts=len(partial_parts)
+        )
+        return "\n".join(header + body) + "\n", state
+    
+    @staticmethod
+    def _part_tags(uri: str, parts: List[Part]) -> List[str]:
+        return [
+            f'#EXT-X-PART:DURATION={part.duration:.5f},URI="{uri}",BYTERANGE="{part.length}@{part.offset}"'
+            + (",INDEPENDENT=YES" if part.independent else "")
+            for part in parts
+        ]
\ No newline at end of file
@@ -15,6 +15,7 @@ from jinja2 import Template
 from app.models.notification import NotificationType, TriggerConditionType, TimeRestrictedTrigger
 from app.models.notification import NotificationTrigger, NotificationEvent
 from app.utils.frame_utils import save_frame
+from app.services.event_clips import capture_event_clip
 from app.config import settings
 from app.database import get_db
 
@@ -155,6 +156,7 @@ class NotificationService:
         Returns:
             bool: True if notification was sent, False otherwise
         """
+        event_time = datetime.now().timestamp()
         try:
             # Re-fetch the trigger to ensure we have the latest state
             async for session in get_db():
@@ -215,12 +217,35 @@ class NotificationService:
                 else:
                     logger.error(f"Failed to send notification for trigger {fresh_trigger.id}: {error}")
                 
+                # Attach a pre/post-event clip once the post-event video is in
+                if settings.EVENT_CLIPS_ENABLED:
+                    timestamp = datetime.fromtimestamp(event_time).strftime("%Y%m%d_%H%M%S")
+                    asyncio.create_task(self._attach_event_clip(
+                        notification_event.id, camera_id, event_time,
+                        f"trigger_{fresh_trigger.id}_{camera_id}_{timestamp}.mp4"
+                    ))
+                
                 return success
                 
         except Exception as e:
             logger.exception(f"Error processing trigger {trigger.id}: {str(e)}")
             return False
             
+    async def _attach_event_clip(self, event_id: int, camera_id: int, event_time: float, filename: str):
+        """Capture an event clip and store its path on the notification event"""
+        try:
+            clip_path = await capture_event_clip(camera_id, event_time, filename)
+            if clip_path is None:
+                return
+            
+            async for session in get_db():
+                notification_event = await session.get(NotificationEvent, event_id)
+                if notification_event is not None:
+                    notification_event.clip_path = clip_path
+                    await session.commit()
+        except Exception as e:
+            logger.exception(f"Error attaching clip to notification event {event_id}: {str(e)}")
+    
     async def send_notification(
         self, 
         trigger: NotificationTrigger, 
@@ -0,0 +1,275 @@
+import logging
+import asyncio
+import heapq
+import os
+import shutil
+import time
+from bisect import bisect_right, insort
+from typing import Dict, Any, Optional, List, Tuple
+
+from app.config import settings
+from app.core.camera_manager import get_camera_manager
+from app.core.recorder import SegmentRecorder, segment_start_time
+
+logger = logging.getLogger(__name__)
+
+# Index entry: (start time, end time, size in bytes, file name)
+Segment = Tuple[float, float, int, str]
+
+class RecordingManager:
+    """
+    Continuous recording for all cameras with a global disk quota.
+    
+    Each recording camera has a SegmentRecorder writing stream-copied
+    segment files to RECORDINGS_DIR/camera_<id>. Finished segments are kept
+    in a per-camera time index (sorted by start time), rebuilt from the file
+    names at startup. The retention loop deletes the oldest segments across
+    all cameras first whenever the total exceeds the quota, free disk space
+    drops below the minimum, or a segment passes the maximum age.
+    """
+    def __init__(
+        self,
+        directory: str = settings.RECORDINGS_DIR,
+        quota_gb: float = settings.RECORDING_QUOTA_GB,
+        min_free_gb: float = settings.RECORDING_MIN_FREE_GB,
+        max_age_days: float = settings.RECORDING_MAX_AGE_DAYS,
+        retention_interval: float = settings.RECORDING_RETENTION_INTERVAL
+    ):
+        self.directory = directory
+        self.quota_bytes = int(quota_gb * 1024 ** 3)
+        self.min_free_bytes = int(min_free_gb * 1024 ** 3)
+        self.max_age_seconds = max_age_days * 86400
+        self.retention_interval = max(1.0, retention_interval)
+        
+        self.recorders: Dict[int, SegmentRecorder] = {}
+        self.recorder_urls: Dict[int, str] = {}  # {camera_id: rtsp_url being recorded}
+        self.index: Dict[int, List[Segment]] = {}
+        self.total_bytes = 0
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        
+        # Statistics
+        self.segments_deleted = 0
+        self.bytes_deleted = 0
+        self.last_retention_time = 0
+    
+    def camera_directory(self, camera_id: int) -> str:
+        return os.path.join(self.directory, f"camera_{camera_id}")
+    
+    async def start(self):
+        """Load the segment index from disk and start the retention loop"""
+        if self.running:
+            return
+        self.running = True
+        os.makedirs(self.directory, exist_ok=True)
+        
+        loop = asyncio.get_running_loop()
+        self.index = await loop.run_in_executor(None, self._scan_directory)
+        self.total_bytes = sum(segment[2] for segments in self.index.values() for segment in segments)
+        
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Recording manager started ({sum(len(s) for s in self.index.values())} segments, "
+            f"{self.total_bytes / 1024 ** 3:.2f} of {self.quota_bytes / 1024 ** 3:.2f} GB)"
+        )
+    
+    async def stop(self):
+        """Stop all recorders and the retention loop"""
+        self.running = False
+        
+        for camera_id in list(self.recorders.keys()):
+            await self.stop_camera(camera_id)
+        
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        logger.info("Recording manager stopped")
+    
+    def _scan_directory(self) -> Dict[int, List[Segment]]:
+        """Build the index from the segment files on disk"""
+        index = {}
+        for camera_entry in os.scandir(self.directory):
+            if not camera_entry.is_dir() or not camera_entry.name.startswith("camera_"):
+                continue
+            try:
+                camera_id = int(camera_entry.name[len("camera_"):])
+            except ValueError:
+                continue
+            
+            segments = []
+            for entry in os.scandir(camera_entry.path):
+                start_time = segment_start_time(entry.name)
+                if start_time is None:
+                    continue
+                stat = entry.stat()
+                segments.append((start_time, max(start_time, stat.st_mtime), stat.st_size, entry.name))
+            segments.sort()
+            index[camera_id] = segments
+        return index
+    
+    async def sync_camera(self, camera) -> bool:
+        """
+        Start, restart or stop a camera's recorder to match its settings
+        
+        Args:
+            camera: Camera model
+        
+        Returns:
+            True if the camera is being recorded
+        """
+        if not (camera.enabled and camera.continuous_recording):
+            await self.stop_camera(camera.id)
+            return False
+        
+        if camera.id in self.recorders and self.recorder_urls.get(camera.id) == camera.rtsp_url:
+            return True
+        
+        await self.stop_camera(camera.id)
+        
+        camera_manager = await get_camera_manager()
+        camera_id, rtsp_url = camera.id, camera.rtsp_url
+        recorder = SegmentRecorder(
+            camera_id,
+            # Read the ingest relay when the camera has one
+            lambda: camera_manager.get_stream_source(camera_id, rtsp_url),
+            self.camera_directory(camera_id),
+            self._add_segment
+        )
+        await recorder.start()
+        self.recorders[camera_id] = recorder
+        self.recorder_urls[camera_id] = rtsp_url
+        return True
+    
+    async def stop_camera(self, camera_id: int):
+        """Stop recording a camera; its segments stay until retention removes them"""
+        recorder = self.recorders.pop(camera_id, None)
+        self.recorder_urls.pop(camera_id, None)
+        if recorder:
+            await recorder.stop()
+    
+    def _add_segment(self, camera_id: int, filename: str, start_time: float, end_time: float, size: int):
+        """Index a segment a recorder has finished"""
+        insort(self.index.setdefault(camera_id, []), (start_time, end_time, size, filename))
+        self.total_bytes += size
+    
+    def find_segments(self, camera_id: int, start_time: float, end_time: float) -> List[Segment]:
+        """Segments of a camera that overlap [start_time, end_time), oldest first"""
+        segments = self.index.get(camera_id, [])
+        # The segment starting before start_time may still cover it
+        i = max(0, bisect_right(segments, (start_time,)) - 1)
+        result = []
+        while i < len(segments) and segments[i][0] < end_time:
+            if segments[i][1] > start_time:
+                result.append(segments[i])
+            i += 1
+        return result
+    
+    def find_segment_at(self, camera_id: int, timestamp: float) -> Optional[Segment]:
+        """Segment of a camera that contains timestamp"""
+        segments = self.find_segments(camera_id, timestamp, timestamp + 1e-3)
+        return segments[0] if segments else None
+    
+    async def _run(self):
+        """Retention loop"""
+        while self.running:
+            try:
+                await self.enforce_retention()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error enforcing recording retention: {str(e)}")
+            await asyncio.sleep(self.retention_interval)
+    
+    async def enforce_retention(self) -> int:
+        """
+        Delete the oldest segments across all cameras until the quota, free
+        space and age limits are met
+        
+        Returns:
+            Number of segments deleted
+        """
+        self.last_retention_time = time.time()
+        
+        bytes_to_free = max(0, self.total_bytes - self.quota_bytes)
+        try:
+            free_bytes = shutil.disk_usage(self.directory).free
+            bytes_to_free = max(bytes_to_free, self.min_free_bytes - free_bytes)
+        except OSError:
+            pass
+        age_cutoff = time.time() - self.max_age_seconds if self.max_age_seconds > 0 else None
+        
+        # Walk all cameras' segments in start order; what is deleted per camera is a prefix
+        oldest_first = heapq.merge(*(
+            ((segment[0], camera_id, segment) for segment in segments)
+            for camera_id, segments in self.index.items()
+        ))
+        deleted: Dict[int, int] = {}
+        paths = []
+        freed = 0
+        for _, camera_id, segment in oldest_first:
+            if freed >= bytes_to_free and (age_cutoff is None or segment[1] >= age_cutoff):
+                break
+            deleted[camera_id] = deleted.get(camera_id, 0) + 1
+            paths.append(os.path.join(self.camera_directory(camera_id), segment[3]))
+            freed += segment[2]
+        
+        if not paths:
+            return 0
+        
+        for camera_id, count in deleted.items():
+            del self.index[camera_id][:count]
+        self.total_bytes -= freed
+        self.segments_deleted += len(paths)
+        self.bytes_deleted += freed
+        
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._delete_files, paths)
+        logger.info(f"Recording retention deleted {len(paths)} segments ({freed / 1024 ** 2:.1f} MB)")
+        return len(paths)
+    
+    def _delete_files(self, paths: List[str]):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not delete recording {path}: {str(e)}")
+    
+    def segment_url(self, camera_id: int, filename: str) -> str:
+        """Static URL of a segment file"""
+        relative = os.path.relpath(os.path.join(self.camera_directory(camera_id), filename), settings.STATIC_DIR)
+        return f"/static/{relative.replace(os.sep, '/')}"
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get recording statistics"""
+        try:
+            free_bytes = shutil.disk_usage(self.directory).free
+        except OSError:
+            free_bytes = None
+        return {
+            "running": self.running,
+            "total_bytes": self.total_bytes,
+            "quota_bytes": self.quota_bytes,
+            "free_bytes": free_bytes,
+            "min_free_bytes": self.min_free_bytes,
+            "max_age_seconds": self.max_age_seconds,
+            "segments": {camera_id: len(segments) for camera_id, segments in self.index.items()},
+            "segments_deleted": self.segments_deleted,
+            "bytes_deleted": self.bytes_deleted,
+            "last_retention_time": self.last_retention_time,
+            "recorders": {camera_id: recorder.get_stats() for camera_id, recorder in self.recorders.items()}
+        }
+
+# Singleton instance
+_recording_manager = None
+
+async def get_recording_manager() -> RecordingManager:
+    """Get or create the recording manager singleton"""
+    global _recording_manager
+    if _recording_manager is None:
+        _recording_manager = RecordingManager()
+    return _recording_manager
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Compare person detector backends on the same frames.
+
+Runs each available backend (ultralytics, OpenCV DNN, ONNX Runtime FP32 and
+INT8) over a set of frames and reports per-frame latency and agreement with a
+reference backend (precision/recall of boxes matched at IoU >= 0.5):
+
+    python -m app.utils.benchmark_detector --frames static/snapshots --reference ultralytics
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.core.object_detection import ObjectDetector, default_onnx_model_path
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+def load_frames(source: str, count: int) -> List[np.ndarray]:
+    """Frames from a directory of images or a video file"""
+    frames = []
+    if os.path.isdir(source):
+        paths = sorted(path for pattern in IMAGE_PATTERNS for path in glob.glob(os.path.join(source, pattern)))
+        for path in paths[:count]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+    else:
+        capture = cv2.VideoCapture(source)
+        while len(frames) < count:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(frame)
+        capture.release()
+    return frames
+
+def box_iou(a: List[int], b: List[int]) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+def match_detections(
+    detections: List[Dict[str, Any]],
+    reference: List[Dict[str, Any]],
+    iou_threshold: float = 0.5
+) -> Tuple[int, int, int]:
+    """
+    Greedily match boxes to reference boxes, highest confidence first
+    
+    Returns:
+        Tuple of (matched, unmatched detections, missed reference boxes)
+    """
+    unmatched_reference = list(range(len(reference)))
+    matched = 0
+    for detection in sorted(detections, key=lambda d: d["confidence"], reverse=True):
+        best, best_iou = None, iou_threshold
+        for index in unmatched_reference:
+            iou = box_iou(detection["bbox"], reference[index]["bbox"])
+            if iou >= best_iou:
+                best, best_iou = index, iou
+        if best is not None:
+            unmatched_reference.remove(best)
+            matched += 1
+    return matched, len(detections) - matched, len(unmatched_reference)
+
+def run_backend(detector: ObjectDetector, frames: List[np.ndarray], warmup: int) -> Tuple[List[float], List[List[Dict[str, Any]]]]:
+    """Per-frame latency (ms) and detections of one backend"""
+    for frame in frames[:warmup]:
+        detector.detect_people_batch([frame])
+    
+    latencies, results = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        results.append(detector.detect_people_batch([frame])[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, results
+
+def benchmark(frames: List[np.ndarray], backends: Dict[str, ObjectDetector], reference: str, warmup: int) -> Dict[str, Any]:
+    """Latency and accuracy (against the reference backend) of every backend"""
+    runs = {}
+    for name, detector in backends.items():
+        if not detector.initialized:
+            print(f"Skipping {name}: model not available")
+            continue
+        print(f"Running {name} ({detector.model_path})...")
+        runs[name] = run_backend(detector, frames, warmup)
+    
+    if reference not in runs:
+        reference = next(iter(runs), None)
+    
+    report = {"frames": len(frames), "reference": reference, "backends": {}}
+    for name, (latencies, results) in runs.items():
+        latencies_sorted = sorted(latencies)
+        entry = {
+            "model": backends[name].model_path,
+            "mean_ms": statistics.mean(latencies),
+            "median_ms": statistics.median(latencies),
+            "p95_ms": latencies_sorted[min(len(latencies_sorted) - 1, int(len(latencies_sorted) * 0.95))],
+            "fps": 1000 / statistics.mean(latencies),
+            "detections": sum(len(result) for result in results)
+        }
+        
+        if reference is not None:
+            matched = extra = missed = 0
+            for result, reference_result in zip(results, runs[reference][1]):
+                m, e, s = match_detections(result, reference_result)
+                matched, extra, missed = matched + m, extra + e, missed + s
+            entry["precision"] = matched / (matched + extra) if matched + extra else 1.0
+            entry["recall"] = matched / (matched + missed) if matched + missed else 1.0
+        
+        report["backends"][name] = entry
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark person detector backends on the same frames')
+    parser.add_argument('--frames', type=str, required=True,
+                        help='Directory of images or a video file')
+    parser.add_argument('--count', type=int, default=200,
+                        help='Maximum number of frames (default: 200)')
+    parser.add_argument('--warmup', type=int, default=5,
+                        help='Untimed frames per backend (default: 5)')
+    parser.add_argument('--reference', type=str, default='ultralytics',
+                        help='Backend whose detections count as ground truth (default: ultralytics)')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='Detection confidence threshold (default: 0.5)')
+    parser.add_argument('--json', action='store_true',
+                        help='Print the report as JSON')
+    args = parser.parse_args()
+    
+    frames = load_frames(args.frames, args.count)
+    if not frames:
+        parser.error(f"No frames found in {args.frames}")
+    
+    backends = {
+        "ultralytics": ObjectDetector(threshold=args.threshold, backend="ultralytics"),
+        "opencv": ObjectDetector(
+            model_path=default_onnx_model_path(int8=False), threshold=args.threshold, backend="opencv"
+        ),
+        "onnxruntime_fp32": ObjectDetector(
+            model_path=default_onnx_model_path(int8=False), threshold=args.threshold, backend="onnxruntime"
+        ),
+        "onnxruntime_int8": ObjectDetector(
+            model_path=settings.ONNX_DETECTION_MODEL or default_onnx_model_path(), threshold=args.threshold,
+            backend="onnxruntime"
+        ),
+    }
+    # Backends fall back to another one when their runtime is missing; keep only real ones
+    backends = {name: detector for name, detector in backends.items() if name.startswith(detector.backend)}
+    
+    report = benchmark(frames, backends, args.reference, args.warmup)
+    
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n{len(frames)} frames, reference: {report['reference']}")
+        print(f"{'backend':<18}{'mean ms':>9}{'p95 ms':>9}{'fps':>8}{'boxes':>8}{'precision':>11}{'recall':>8}")
+        for name, entry in report["backends"].items():
+            print(
+                f"{name:<18}{entry['mean_ms']:>9.1f}{entry['p95_ms']:>9.1f}{entry['fps']:>8.1f}"
+                f"{entry['detections']:>8}{entry.get('precision', 1.0):>11.3f}{entry.get('recall', 1.0):>8.3f}"
+            )
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+Offline INT8 quantization of the person detector for the onnxruntime backend.
+
+Exports settings.DETECTION_MODEL to ONNX (when it is a .pt model) and
+quantizes it statically with ONNX Runtime, calibrating activations on sample
+frames. Run once on the deployment box, then set DETECTION_BACKEND=onnxruntime:
+
+    python -m app.utils.quantize_detector --calibration static/snapshots
+
+The detection head (box decoding, class sigmoid and the final Concat of
+coordinates and scores) stays in float: one UInt8 range cannot hold both
+0-640 pixel coordinates and 0-1 scores. Quantization still costs accuracy,
+so confirm INT8 recall against the FP32 model before deploying:
+
+    python -m app.utils.benchmark_detector --frames static/snapshots --reference onnxruntime_fp32
+"""
+import argparse
+import glob
+import logging
+import os
+import random
+import re
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.core.object_detection import default_onnx_model_path, letterbox
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+def export_onnx(model_path: str, output_path: str, input_size: int) -> str:
+    """
+    Export an ultralytics .pt model to ONNX with a dynamic batch dimension
+    
+    Returns:
+        Path of the ONNX model
+    """
+    from ultralytics import YOLO
+    
+    exported = YOLO(model_path).export(format="onnx", imgsz=input_size, dynamic=True, simplify=True)
+    if os.path.abspath(exported) != os.path.abspath(output_path):
+        os.replace(exported, output_path)
+    logger.info(f"Exported {model_path} to {output_path}")
+    return output_path
+
+def load_calibration_frames(source: str, count: int, input_size: int) -> List[np.ndarray]:
+    """
+    Letterboxed calibration inputs from a directory of images or a video file
+    
+    Frames should come from the cameras the model will run on, so activation
+    ranges match real traffic.
+    """
+    frames = []
+    if os.path.isdir(source):
+        paths = [path for pattern in IMAGE_PATTERNS for path in glob.glob(os.path.join(source, pattern))]
+        random.shuffle(paths)
+        for path in paths[:count]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+    else:
+        capture = cv2.VideoCapture(source)
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) or count
+        step = max(1, total // count)
+        index = 0
+        while len(frames) < count:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if index % step == 0:
+                frames.append(frame)
+            index += 1
+        capture.release()
+    
+    return [
+        cv2.dnn.blobFromImage(letterbox(frame, input_size)[0], 1/255.0, swapRB=True, crop=False)
+        for frame in frames
+    ]
+
+def head_nodes(model_path: str) -> Optional[List[str]]:
+    """
+    Non-convolution nodes of the model's last block (the YOLOv8/YOLO11 Detect head)
+    
+    Returns:
+        Node names, or None if the graph does not use ultralytics node naming
+    """
+    import onnx
+    
+    model = onnx.load(model_path, load_external_data=False)
+    blocks = {}
+    for node in model.graph.node:
+        match = re.match(r"/model\.(\d+)/", node.name)
+        if match:
+            blocks.setdefault(int(match.group(1)), []).append(node)
+    if not blocks:
+        return None
+    
+    # The head's Convs quantize fine; what follows them mixes value ranges
+    return [node.name for node in blocks[max(blocks)] if node.op_type != "Conv"]
+
+def quantize_model(
+    fp32_path: str,
+    int8_path: str,
+    calibration: Optional[List[np.ndarray]] = None,
+    per_channel: bool = True
+) -> str:
+    """
+    Quantize an FP32 ONNX detector to INT8
+    
+    With calibration inputs, weights and activations are quantized statically
+    (QDQ format, which the CPU provider fuses into integer kernels). Without
+    them only weights are quantized dynamically, which is much less effective
+    for convolutional models. The detection head is excluded either way; if
+    it cannot be located, only Conv nodes are quantized.
+    
+    Returns:
+        Path of the INT8 model
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    
+    # Shape inference and graph optimization make more nodes quantizable
+    prepared_path = fp32_path.replace(".onnx", "_prepared.onnx")
+    try:
+        quant_pre_process(fp32_path, prepared_path)
+    except Exception as e:
+        logger.warning(f"Pre-processing failed, quantizing the raw export: {str(e)}")
+        prepared_path = fp32_path
+    
+    try:
+        excluded = head_nodes(prepared_path)
+        if excluded is None:
+            logger.warning("Detection head not found by name; quantizing Conv nodes only")
+            exclusion_args = {"op_types_to_quantize": ["Conv"]}
+        else:
+            logger.info(f"Keeping {len(excluded)} detection head nodes in float")
+            exclusion_args = {"nodes_to_exclude": excluded}
+        
+        if not calibration:
+            logger.warning("No calibration frames; falling back to dynamic (weight-only) quantization")
+            quantize_dynamic(
+                prepared_path, int8_path, weight_type=QuantType.QInt8, per_channel=per_channel, **exclusion_args
+            )
+            return int8_path
+        
+        class FrameReader(CalibrationDataReader):
+            def __init__(self, input_name: str, blobs: List[np.ndarray]):
+                self.input_name = input_name
+                self._blobs: Iterator[np.ndarray] = iter(blobs)
+            
+            def get_next(self):
+                blob = next(self._blobs, None)
+                return None if blob is None else {self.input_name: blob}
+        
+        import onnxruntime as ort
+        input_name = ort.InferenceSession(prepared_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+        
+        quantize_static(
+            prepared_path,
+            int8_path,
+            FrameReader(input_name, calibration),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            **exclusion_args
+        )
+        return int8_path
+    finally:
+        if prepared_path != fp32_path and os.path.exists(prepared_path):
+            os.remove(prepared_path)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    
+    parser = argparse.ArgumentParser(description='Quantize the person detector to INT8 for ONNX Runtime')
+    parser.add_argument('--model', type=str, default=os.path.join(settings.MODELS_DIR, settings.DETECTION_MODEL),
+                        help='Source model (.pt or FP32 .onnx, default: DETECTION_MODEL)')
+    parser.add_argument('--output', type=str, default=default_onnx_model_path(),
+                        help='INT8 model path (default: <DETECTION_MODEL>_int8.onnx)')
+    parser.add_argument('--calibration', type=str,
+                        help='Directory of camera images or a video file for calibration')
+    parser.add_argument('--frames', type=int, default=200,
+                        help='Number of calibration frames (default: 200)')
+    parser.add_argument('--input-size', type=int, default=settings.ONNX_INPUT_SIZE,
+                        help=f'Model input size (default: {settings.ONNX_INPUT_SIZE})')
+    parser.add_argument('--per-tensor', action='store_true',
+                        help='Quantize weights per tensor instead of per channel')
+    args = parser.parse_args()
+    
+    fp32_path = args.model
+    if not fp32_path.endswith(".onnx"):
+        fp32_path = export_onnx(args.model, default_onnx_model_path(int8=False), args.input_size)
+    
+    calibration = load_calibration_frames(args.calibration, args.frames, args.input_size) if args.calibration else None
+    output = quantize_model(fp32_path, args.output, calibration, per_channel=not args.per_tensor)
+    
+    print(f"FP32 model: {fp32_path} ({os.path.getsize(fp32_path) / 1024 ** 2:.1f} MB)")
+    print(f"INT8 model: {output} ({os.path.getsize(output) / 1024 ** 2:.1f} MB)")
+    print(
+        "Confirm INT8 recall before deploying: "
+        "python -m app.utils.benchmark_detector --frames <images or video> --reference onnxruntime_fp32"
+    )
\ No newline at end of file